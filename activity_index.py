@@ -0,0 +1,138 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# ----------------------------------------------------
+# --- Record-Time Activity Index (sidecar files) ---
+# ----------------------------------------------------
+# While record-pi.py records, ActivityIndexer runs a very low-rate detection
+# pass (one frame per interval, small imgsz) on a background thread. Each
+# finished video gets a sidecar next to it, <video>.activity.json:
+#
+#   {"video": "video_x.mp4", "start_ts": 1760000000.0, "interval": 1.0,
+#    "activity": [[], ["person"], ["person", "bottle"], null, ...]}
+#
+# Entry i covers seconds [i * interval, (i + 1) * interval) of the video:
+# the classes seen there, [] for quiet, null when no sample was taken (the
+# detector fell behind). process-video-pi.py turns the sidecar into frame
+# ranges with active_frame_ranges() and runs full-rate inference only there.
+# Unsampled seconds count as active, so a slow indexer never hides activity.
+
+SIDECAR_SUFFIX = ".activity.json"
+
+
+class ActivityIndexer:
+    """
+    detect_fn(frame) -> list of class names. start(frame_fn) samples
+    frame_fn() -> (frame, ts) every interval seconds on its own thread.
+    write_sidecar(video_path, start_ts, end_ts) writes the index for one
+    video, waiting briefly for the sample that covers end_ts.
+    """
+
+    def __init__(self, detect_fn, interval=1.0):
+        self.detect_fn = detect_fn
+        self.interval = interval
+        self.samples = []           # (ts, [class names]) in time order
+        self.inference_ms = 0.0     # Last detection time, for the log
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def start(self, frame_fn):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(frame_fn,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self, frame_fn):
+        next_sample = time.time()
+        while self._running:
+            time.sleep(max(0.0, next_sample - time.time()))
+            next_sample += self.interval
+            frame, ts = frame_fn()
+            if frame is None:
+                continue
+            try:
+                started = time.time()
+                names = sorted(set(self.detect_fn(frame)))
+                self.inference_ms = (time.time() - started) * 1000.0
+            except Exception as e:
+                print(f"Activity indexer error: {e}")
+                continue
+            with self._lock:
+                self.samples.append((ts, names))
+            next_sample = max(next_sample, time.time()) # Fall behind gracefully on a busy CPU
+
+    def write_sidecar(self, video_path, start_ts, end_ts, wait_s=None):
+        deadline = time.time() + (2 * self.interval if wait_s is None else wait_s)
+        while self._running and time.time() < deadline:
+            with self._lock:
+                if self.samples and self.samples[-1][0] >= end_ts:
+                    break
+            time.sleep(0.05)
+
+        seconds = max(1, int((end_ts - start_ts) / self.interval) + 1)
+        activity = [None] * seconds
+        with self._lock:
+            times = [ts for ts, _ in self.samples]
+            first = bisect.bisect_left(times, start_ts)
+            window = self.samples[first:bisect.bisect_right(times, end_ts)]
+            # Older samples are never needed again (segments finish in order)
+            del self.samples[:first]
+        for ts, names in window:
+            index = min(seconds - 1, int((ts - start_ts) / self.interval))
+            activity[index] = sorted(set(activity[index] or []) | set(names))
+
+        sidecar = {
+            "video": os.path.basename(video_path),
+            "start_ts": start_ts,
+            "interval": self.interval,
+            "activity": activity
+        }
+        with open(video_path + SIDECAR_SUFFIX, "w") as f:
+            json.dump(sidecar, f)
+        active = sum(1 for entry in activity if entry is None or entry)
+        print(f"[ACTIVITY] {sidecar['video']}: {active}/{seconds} intervals active "
+              f"(detector {self.inference_ms:.0f} ms)")
+        return sidecar
+
+
+def load_sidecar(video_path):
+    try:
+        with open(video_path + SIDECAR_SUFFIX) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def active_frame_ranges(sidecar, fps, frame_offsets_ms=None, pad_s=1.0):
+    """
+    [(first_frame, end_frame), ...] covering the active intervals, padded by
+    pad_s and merged. frame_offsets_ms (from a segment manifest) maps times
+    to frame indices exactly; otherwise frames are assumed evenly spaced.
+    """
+    interval = sidecar["interval"]
+    spans = []
+    for index, entry in enumerate(sidecar["activity"]):
+        if entry is not None and not entry:
+            continue
+        start, end = index * interval - pad_s, (index + 1) * interval + pad_s
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+
+    def to_frame(seconds):
+        seconds = max(0.0, seconds)
+        if frame_offsets_ms:
+            return bisect.bisect_left(frame_offsets_ms, seconds * 1000.0)
+        return int(seconds * fps)
+
+    return [(to_frame(start), to_frame(end)) for start, end in spans]
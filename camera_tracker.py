@@ -0,0 +1,793 @@
+import json
+import math
+import os
+import queue
+import time
+
+import cv2
+
+from correlation_tracker import CorrelationTracker
+from multi_object_tracker import MultiObjectTracker, detections_from_results
+from reid_gallery import ReIDGallery, batch_descriptors
+from latency_telemetry import LatencyTelemetry
+from duty_cycle import AdaptiveScheduler, MotionDetector
+from roi_inference import CropBatch, RegionOfInterest, load_rois, save_rois
+from telemetry_codec import MoveEncoder
+from detection_stream import DetectionStream
+
+# ----------------------------------------------------
+# --- Per-Camera Object Locking State ---
+# ----------------------------------------------------
+# Everything the locking loop used to keep in module globals (focus, lost/seek
+# state, ROI, hybrid tracker, track IDs, re-ID gallery, telemetry) lives in one
+# CameraTracker per camera, so one process can drive several cameras against
+# a single loaded YOLO model. The detector itself is not called in here:
+#
+#   detector_input = camera.begin_frame(frame, capture_ts)   # None = skip detection
+#   images, roi_imgsz = detector_input                         # roi_imgsz is None for full frames
+#   results = model(images, imgsz=roi_imgsz or 640)
+#   camera.finish_frame(results)
+#
+# which lets a multi-camera loop batch the inputs of all cameras into one call.
+# With ROIs active, images is the list of padded ROI crops (roi_inference.py).
+# begin_frame() also returns None while the idle duty cycle skips detection.
+
+# --- MQTT Topics (prefixed per camera with topic_prefix) ---
+MQTT_STATUS_TOPIC = "tracker/move"
+MQTT_TRACKING_TOPIC = "tracker/status"
+MQTT_DIAGNOSTICS_TOPIC = "tracker/diagnostics"
+MQTT_CONTROL_TOPIC = "tracker/control"
+MQTT_DETECTIONS_TOPIC = "tracker/detections"
+
+# --- Default Settings (same names as the script globals they replace) ---
+DEFAULT_SETTINGS = {
+    "TARGET_CLASSES": ["person", "bottle", "tv"],
+    "MIN_CONFIDENCE": 0.4,
+    "AUTO_FOCUS_ON_BIGGEST": False,
+    "MAX_PIXEL_SHIFT": 150,
+    "MAX_LOST_FRAMES": 150,
+    "HYBRID_MODE": True,
+    "DETECT_EVERY_N_FRAMES": 4,
+    "TRACKER_TYPE": "KCF",
+    "MIN_TRACKER_CONFIDENCE": 0.5,
+    "TRACK_LOW_CONFIDENCE": 0.1,
+    "TRACK_IOU_THRESHOLD": 0.3,
+    "TRACK_MAX_AGE": 30,
+    "TRACK_MIN_HITS": 2,
+    "MIN_SIMILARITY_MATCH": 0.80,
+    "REID_GALLERY_SIZE": 16,
+    "REID_UPDATE_INTERVAL": 5,
+    "REID_NOVELTY_THRESHOLD": 0.95,
+    "LATENCY_REPORT_INTERVAL": 10.0,
+    "HEADLESS_MODE": False,
+    "ROI_CONTROLS": False,          # Middle-click / ROI commands restrict detection to regions
+    "ROI_CONFIG": None,             # JSON file with saved ROIs (loaded at start, written by ROI_SAVE)
+    "FRAME_LOG": False,             # Print the focus match result on every frame
+    "DUTY_CYCLE": True,             # Slow the detector down while the scene is idle
+    "IDLE_AFTER_S": 15.0,           # Seconds without targets/motion before going IDLE
+    "IDLE_DETECT_INTERVAL_S": 2.0,  # Seconds between detector passes while IDLE
+    "MOTION_PRECHECK": True,        # Cheap frame-difference check on IDLE frames
+    "MOTION_THRESHOLD": 25,         # Gray-level change that counts as motion
+    "MOTION_MIN_AREA": 0.005,       # Fraction of changed pixels that wakes the detector
+    "MOVE_COALESCE": True,          # Only publish tracker/move on change or heartbeat
+    "MOVE_DEADBAND_PX": 4,          # Offset change (px) that counts as a change
+    "MOVE_HEARTBEAT_S": 0.25,       # Resend an unchanged position after this long
+    "MOVE_MAX_RATE_HZ": 20.0,       # Upper bound on tracker/move messages per second
+    "MOVE_BINARY": False,           # Compact struct payload instead of JSON (telemetry_codec.py)
+    "DETECTION_STREAM": False,      # Publish all tracks of each detector pass (detection_stream.py)
+    "DETECTION_STREAM_EVERY_N": 1,  # Detector passes per message
+    "DETECTION_STREAM_CLASSES": None,   # None = every class in TARGET_CLASSES
+    "DETECTION_STREAM_MIN_CONFIDENCE": 0.0,
+    "DETECTION_STREAM_PER_CLASS": False,    # Also publish tracker/detections/<class>
+    "DETECTION_STREAM_COMPACT": False       # Rows instead of objects
+}
+
+
+class CameraTracker:
+    """
+    Object locking for one camera: focus/seek state machine, ROI, hybrid
+    detect+track, persistent track IDs and re-ID, MQTT output under
+    topic_prefix, and an optional viewer window.
+    publish_fn(topic, payload_json) sends one MQTT message.
+    """
+
+    def __init__(self, name, class_names, publish_fn=None, topic_prefix="",
+                 frame_size=(640, 480), settings=None, window_name=None):
+        self.name = name
+        self.class_names = class_names
+        self.publish_fn = publish_fn
+        self.cfg = dict(DEFAULT_SETTINGS)
+        self.cfg.update(settings or {})
+
+        self.move_topic = topic_prefix + MQTT_STATUS_TOPIC
+        self.tracking_topic = topic_prefix + MQTT_TRACKING_TOPIC
+        self.diagnostics_topic = topic_prefix + MQTT_DIAGNOSTICS_TOPIC
+        self.control_topic = topic_prefix + MQTT_CONTROL_TOPIC
+        self.detections_topic = topic_prefix + MQTT_DETECTIONS_TOPIC
+
+        self.frame_width, self.frame_height = frame_size
+        self.center_x = self.frame_width // 2
+        self.center_y = self.frame_height // 2
+
+        # --- Focus State ---
+        self.auto_focus_on_biggest = self.cfg["AUTO_FOCUS_ON_BIGGEST"]
+        self.auto_focus_active = False
+        self.focus_mode = False
+        self.object_recently_lost = False
+        self.focused_object_cls = -1
+        self.focused_object_box = None
+        self.focused_object_conf = 0.0
+        self.focused_track_id = None
+        self.lost_frames_counter = 0
+        self.frames_since_detection = 0
+        self.reid_update_counter = 0
+
+        # --- ROI State ---
+        self.roi_mode = False       # True while the user is drawing the ROI
+        self.roi_active = False     # True if detection runs on self.rois only
+        self.roi_start_point = None # Corners of the rectangle being drawn with the mouse
+        self.roi_end_point = None
+        self.rois = []              # RegionOfInterest list (boxes or polygons)
+
+        # --- Viewer / Control ---
+        self.viewer_attached = False
+        self.overlays_enabled = True  # The quality governor turns drawing off under load
+        self.base_detect_every = self.cfg["DETECT_EVERY_N_FRAMES"] # Stride the governor scales from
+        self.preview = None           # preview_server.PreviewStream, see attach_preview()
+        self.window_name = window_name or f"YOLOv8 Object Detection ({name})"
+        self.window_open = False
+        self.control_queue = queue.Queue()
+        self.current_boxes_data = []
+
+        self.box_tracker = CorrelationTracker(self.cfg["TRACKER_TYPE"], frame_size)
+        self.object_tracker = MultiObjectTracker(
+            iou_threshold=self.cfg["TRACK_IOU_THRESHOLD"],
+            high_confidence=self.cfg["MIN_CONFIDENCE"],
+            max_age=self.cfg["TRACK_MAX_AGE"],
+            min_hits=self.cfg["TRACK_MIN_HITS"],
+            max_center_shift=self.cfg["MAX_PIXEL_SHIFT"]
+        )
+        self.move_encoder = MoveEncoder(self.cfg["MOVE_DEADBAND_PX"], self.cfg["MOVE_HEARTBEAT_S"],
+                                        self.cfg["MOVE_MAX_RATE_HZ"], self.cfg["MOVE_BINARY"], self.cfg["MOVE_COALESCE"])
+        self.reid_gallery = ReIDGallery(self.cfg["REID_GALLERY_SIZE"], self.cfg["REID_NOVELTY_THRESHOLD"])
+        self.latency_telemetry = LatencyTelemetry(f"tracker:{name}" if topic_prefix else "tracker",
+                                                  self.cfg["LATENCY_REPORT_INTERVAL"])
+
+        self.detection_stream = None
+        if self.cfg["DETECTION_STREAM"]:
+            self.detection_stream = DetectionStream(
+                self._publish, self.detections_topic, name, class_names, frame_size,
+                every_n=self.cfg["DETECTION_STREAM_EVERY_N"],
+                classes=self.cfg["DETECTION_STREAM_CLASSES"],
+                min_confidence=self.cfg["DETECTION_STREAM_MIN_CONFIDENCE"],
+                per_class_topics=self.cfg["DETECTION_STREAM_PER_CLASS"],
+                compact=self.cfg["DETECTION_STREAM_COMPACT"]
+            )
+
+        # --- Adaptive Duty Cycle ---
+        self.scheduler = None
+        self.motion_detector = None
+        if self.cfg["DUTY_CYCLE"]:
+            self.scheduler = AdaptiveScheduler(self.cfg["IDLE_AFTER_S"], self.cfg["IDLE_DETECT_INTERVAL_S"],
+                                               on_change=self._on_duty_mode_change)
+            self.latency_telemetry.set_gauge("duty_mode", self.scheduler.mode)
+            if self.cfg["MOTION_PRECHECK"]:
+                self.motion_detector = MotionDetector(self.cfg["MOTION_THRESHOLD"], self.cfg["MOTION_MIN_AREA"])
+
+        # Per-frame state between begin_frame() and end_frame()
+        self.frame = None
+        self.capture_ts = None
+        self.tracked_box = None
+        self.tracker_score = 0.0
+        self.detection_skipped = False
+        self._crop_batch = None
+
+        roi_config = self.cfg["ROI_CONFIG"]
+        if self.cfg["ROI_CONTROLS"] and roi_config and os.path.exists(roi_config):
+            self.set_rois(load_rois(roi_config))
+
+    @property
+    def window_visible(self):
+        return not self.cfg["HEADLESS_MODE"] or self.viewer_attached
+
+    @property
+    def draw_overlays(self):
+        # Nothing is drawn while neither the window nor an HTTP preview viewer can see it
+        preview_watched = self.preview is not None and self.preview.has_viewers
+        return (self.window_visible or preview_watched) and self.overlays_enabled
+
+    def attach_preview(self, stream):
+        """Sends the annotated frames to an HTTP MJPEG stream while it has viewers."""
+        self.preview = stream
+
+    def apply_quality(self, level):
+        """Applies a thermal_governor quality level (detection stride and overlay drawing)."""
+        self.cfg["DETECT_EVERY_N_FRAMES"] = max(1, int(self.base_detect_every * level["detect_every_scale"] + 0.5))
+        self.overlays_enabled = level["overlays"]
+
+    # ----------------------------------------------------
+    # --- MQTT Output ---
+    # ----------------------------------------------------
+
+    def _publish(self, topic, payload_json):
+        if self.publish_fn is None:
+            return False
+        self.publish_fn(topic, payload_json)
+        return True
+
+    def publish_move_status(self, offset_x, offset_y, pan_cmd, tilt_cmd, capture_ts=None):
+        """
+        Publishes the object position and gimbal instructions via MQTT, unless
+        the move encoder coalesces it away (no change since the last message).
+        capture_ts is the time.time() stamp of the frame the offsets came from.
+        """
+        payload = self.move_encoder.encode(offset_x, offset_y, pan_cmd, tilt_cmd, capture_ts)
+        if payload is None:
+            self.latency_telemetry.increment("move_suppressed")
+            return
+
+        try:
+            if self._publish(self.move_topic, payload):
+                self.latency_telemetry.record_since("capture_to_publish", capture_ts)
+                self.latency_telemetry.increment("move_published")
+        except Exception as e:
+            print(f"Error publishing MOVE message: {e}")
+
+    def publish_tracking_status(self, status):
+        payload = {
+            "timestamp": time.time(),
+            "status": status
+        }
+
+        try:
+            print(f"-> MQTT TRACKING STATUS ({self.name}): {status}")
+            self._publish(self.tracking_topic, json.dumps(payload))
+        except Exception as e:
+            print(f"Error publishing TRACKING status: {e}")
+
+    def publish_diagnostics(self, payload_json):
+        self._publish(self.diagnostics_topic, payload_json)
+
+    # ----------------------------------------------------
+    # --- Focus & ROI Control (shared by mouse and MQTT control) ---
+    # ----------------------------------------------------
+
+    def start_focus(self, x1, y1, x2, y2, class_id, conf, track_id):
+        self.object_recently_lost = False
+        self.lost_frames_counter = 0
+
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(self.frame_width, x2), min(self.frame_height, y2)
+
+        if x2 <= x1 or y2 <= y1:
+            print("Error: Cropped area for focus is empty.")
+            return False
+
+        self.focused_object_box = (x1, y1, x2, y2)
+        self.focused_object_cls = class_id
+        self.focused_object_conf = conf
+        self.focused_track_id = track_id
+        self.focus_mode = True
+        self.move_encoder.reset()
+        self.box_tracker.reset()  # Both are seeded from the next detector pass
+        self.reid_gallery.reset()
+        print(f"\n[FOCUS ACQUIRED] {self.name}: tracking {self.class_names[class_id]} (track #{track_id}).")
+        return True
+
+    def _drop_focus(self):
+        self.focus_mode = False
+        self.object_recently_lost = False
+        self.focused_object_cls = -1
+        self.focused_object_box = None
+        self.focused_track_id = None
+        self.lost_frames_counter = 0
+        self.box_tracker.reset()
+
+    def clear_focus(self):
+        self._drop_focus()
+        print(f"\n[FOCUS CLEARED] {self.name}: returning to General Tracking.")
+        self.publish_tracking_status("MANUAL_STOP")
+
+    def set_roi(self, start_point, end_point):
+        """Activates the ROI spanned by two corner points if it is larger than 10x10."""
+        # Ensure x1 < x2 and y1 < y2 for proper ROI definition
+        x1 = min(start_point[0], end_point[0])
+        y1 = min(start_point[1], end_point[1])
+        x2 = max(start_point[0], end_point[0])
+        y2 = max(start_point[1], end_point[1])
+
+        self.roi_start_point = None
+        self.roi_end_point = None
+
+        # Check if the ROI is a reasonable size (e.g., > 10x10)
+        if (x2 - x1) > 10 and (y2 - y1) > 10:
+            return self.set_rois([RegionOfInterest("roi", box=(x1, y1, x2, y2))])
+
+        self.rois = []
+        self.roi_active = False
+        print("[ROI CANCELED] Area too small.")
+        return False
+
+    def set_rois(self, rois, append=False):
+        """Replaces (or extends) the ROIs detection is restricted to."""
+        self.rois = (self.rois if append else []) + list(rois)
+        self.roi_active = len(self.rois) > 0
+        for roi in rois:
+            print(f"[ROI ACTIVE] {self.name}: '{roi.name}' {'polygon' if roi.polygon is not None else 'box'} {roi.box}.")
+        return self.roi_active
+
+    def clear_roi(self):
+        self.rois = []
+        self.roi_active = False
+        self.roi_mode = False
+        self.roi_start_point = None
+        self.roi_end_point = None
+        print(f"[ROI CLEARED] {self.name}: full frame detection resumed.")
+
+    def save_rois(self):
+        if not self.cfg["ROI_CONFIG"]:
+            print(f"[ROI] {self.name}: no ROI_CONFIG file set, ROIs not saved.")
+            return False
+        save_rois(self.cfg["ROI_CONFIG"], self.rois)
+        print(f"[ROI] {self.name}: {len(self.rois)} ROIs saved to {self.cfg['ROI_CONFIG']}.")
+        return True
+
+    def lock_at_point(self, x, y, current_boxes):
+        """Starts focus on the object under (x, y), if any (inside the ROI when one is active)."""
+        min_dist_to_click = float('inf')
+        best_match_at_click = None
+
+        for box_data in current_boxes:
+            x1, y1, x2, y2, class_id, conf, class_name, track_id = box_data
+
+            # Filter: Check if the click is inside an active ROI
+            if self.roi_active and not any(roi.contains(x, y) for roi in self.rois):
+                continue
+
+            if x1 <= x <= x2 and y1 <= y <= y2 and class_name in self.cfg["TARGET_CLASSES"] and conf > self.cfg["MIN_CONFIDENCE"]:
+                obj_center_x = (x1 + x2) // 2
+                obj_center_y = (y1 + y2) // 2
+                distance = math.sqrt((obj_center_x - x)**2 + (obj_center_y - y)**2)
+
+                if distance < min_dist_to_click:
+                    min_dist_to_click = distance
+                    best_match_at_click = box_data
+
+        if best_match_at_click:
+            x1, y1, x2, y2, class_id, conf, _, track_id = best_match_at_click
+            return self.start_focus(x1, y1, x2, y2, class_id, conf, track_id)
+        return False
+
+    def lock_track_id(self, track_id):
+        """Starts focus on a track ID seen on the latest detector pass."""
+        for track in self.object_tracker.visible_tracks():
+            if track.track_id == track_id:
+                x1, y1, x2, y2 = track.int_box()
+                return self.start_focus(x1, y1, x2, y2, track.class_id, track.conf, track.track_id)
+        print(f"[CONTROL] {self.name}: track #{track_id} is not visible. Lock ignored.")
+        return False
+
+    def track_boxes_data(self, tracks):
+        """Box tuples (x1, y1, x2, y2, class_id, conf, class_name, track_id) for point locking."""
+        return [(*track.int_box(), track.class_id, track.conf, self.class_names[track.class_id], track.track_id)
+                for track in tracks]
+
+    # ----------------------------------------------------
+    # --- Mouse Callback (L-Click FOCUS, M-Click ROI) ---
+    # ----------------------------------------------------
+
+    def mouse_callback(self, event, x, y, flags, param=None):
+        # --- ROI Handling (Middle-Click) ---
+        if self.cfg["ROI_CONTROLS"]:
+            if event == cv2.EVENT_MBUTTONDOWN:
+                # If ROI is active, middle-click clears it
+                if self.roi_active or self.roi_mode:
+                    self.clear_roi()
+                else:
+                    # Start drawing a new ROI
+                    self.roi_mode = True
+                    self.roi_start_point = (x, y)
+                    print("[ROI MODE] Middle-click to start drawing. Release to finalize.")
+
+                # Clear any active FOCUS mode when changing ROI
+                if self.focus_mode:
+                    self.clear_focus()
+
+            elif event == cv2.EVENT_MOUSEMOVE:
+                if self.roi_mode:
+                    self.roi_end_point = (x, y) # Update the end point for live drawing
+
+            elif event == cv2.EVENT_MBUTTONUP:
+                if self.roi_mode and self.roi_start_point is not None:
+                    self.roi_mode = False
+                    self.set_roi(self.roi_start_point, (x, y))
+
+        # --- FOCUS Handling (Left-Click) ---
+        if event == cv2.EVENT_LBUTTONDOWN:
+            self.auto_focus_active = False
+
+            # 1. Clear Focus/Seeking state
+            self.clear_focus()
+
+            # 2. If the click lands on an object, start focus on that object
+            self.lock_at_point(x, y, self.current_boxes_data)
+
+    # ----------------------------------------------------
+    # --- MQTT Control (Headless Mode) ---
+    # ----------------------------------------------------
+    # Commands arrive on the paho network thread and are queued; the main loop
+    # applies them between frames so tracker state is only touched from one thread.
+    #   {"command": "LOCK", "track_id": 7}      {"command": "LOCK", "x": 320, "y": 240}
+    #   {"command": "UNLOCK"}                    {"command": "AUTO_FOCUS", "enabled": true}
+    #   {"command": "ROI", "x1": 100, "y1": 80, "x2": 500, "y2": 400}
+    #   {"command": "ROI", "rois": [{"name": "door", "polygon": [[100, 80], [500, 90], [480, 400]]}, ...]}
+    #   {"command": "ROI_ADD", "name": "desk", "box": [400, 200, 630, 470]}
+    #   {"command": "ROI_CLEAR"}                 {"command": "ROI_SAVE"}
+    #   {"command": "VIEW", "enabled": true}
+
+    def on_control_message(self, client, userdata, msg):
+        try:
+            self.control_queue.put(json.loads(msg.payload.decode()))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            print(f"⚠️ Invalid control message: {msg.payload!r}")
+
+    def apply_pending_commands(self):
+        while not self.control_queue.empty():
+            self.apply_control_command(self.control_queue.get_nowait())
+
+    def apply_control_command(self, command):
+        name = str(command.get("command", "")).upper()
+        print(f"[CONTROL] {self.name}: {command}")
+
+        if name == "LOCK":
+            self.auto_focus_active = False
+            if self.focus_mode:
+                self.clear_focus()
+            if command.get("track_id") is not None:
+                self.lock_track_id(int(command["track_id"]))
+            elif command.get("x") is not None and command.get("y") is not None:
+                self.lock_at_point(int(command["x"]), int(command["y"]),
+                                   self.track_boxes_data(self.object_tracker.visible_tracks()))
+        elif name == "UNLOCK":
+            self.auto_focus_active = False
+            self.clear_focus()
+        elif name == "AUTO_FOCUS":
+            self.auto_focus_on_biggest = bool(command.get("enabled", True))
+            self.auto_focus_active = False
+        elif name.startswith("ROI") and not self.cfg["ROI_CONTROLS"]:
+            print(f"[CONTROL] {self.name}: ROI control is not enabled.")
+        elif name in ("ROI", "ROI_ADD"):
+            self.roi_mode = False
+            if self.focus_mode:
+                self.clear_focus()
+            try:
+                if "rois" in command:
+                    self.set_rois([RegionOfInterest.from_dict(roi) for roi in command["rois"]], append=name == "ROI_ADD")
+                elif "box" in command or "polygon" in command:
+                    self.set_rois([RegionOfInterest.from_dict(command)], append=name == "ROI_ADD")
+                else:
+                    self.set_roi((int(command["x1"]), int(command["y1"])), (int(command["x2"]), int(command["y2"])))
+            except (KeyError, TypeError, ValueError):
+                print("[CONTROL] ROI needs integer x1, y1, x2, y2, a box, a polygon or a rois list.")
+        elif name == "ROI_SAVE":
+            self.save_rois()
+        elif name == "ROI_CLEAR":
+            self.clear_roi()
+            if self.focus_mode:
+                self.clear_focus()
+        elif name == "VIEW":
+            self.viewer_attached = bool(command.get("enabled", True))
+        else:
+            print(f"[CONTROL] Unknown command: {name}")
+
+    # ----------------------------------------------------
+    # --- Adaptive Duty Cycle ---
+    # ----------------------------------------------------
+
+    def _on_duty_mode_change(self, mode, reason):
+        print(f"[DUTY CYCLE] {self.name}: {mode} ({reason})")
+        self.latency_telemetry.set_gauge("duty_mode", mode)
+        self.latency_telemetry.increment("duty_mode_changes")
+        if self.motion_detector is not None:
+            self.motion_detector.reset() # Fresh background for the next idle period
+
+    def _idle_skip(self, frame, capture_ts):
+        """True if the idle duty cycle skips the detector on this frame."""
+        if self.scheduler is None:
+            return False
+        motion = False
+        if self.scheduler.mode == AdaptiveScheduler.IDLE and self.motion_detector is not None:
+            motion = self.motion_detector.update(frame)
+        return not self.scheduler.should_detect(capture_ts, focus_active=self.focus_mode, motion=motion)
+
+    # ----------------------------------------------------
+    # --- Per-Frame Processing ---
+    # ----------------------------------------------------
+
+    def begin_frame(self, frame, capture_ts):
+        """
+        Runs the hybrid tracker on a new frame. Returns (images, roi_imgsz) to
+        run the detector on: (frame, None), or the list of padded ROI crops and
+        their imgsz bucket. Returns None when the tracker carries the lock on
+        this frame or the idle duty cycle skips detection.
+        """
+        self.frame = frame
+        self.capture_ts = capture_ts
+        self.tracked_box = None
+        self.tracker_score = 0.0
+        self.detection_skipped = False
+
+        # --- HYBRID: Let the fast tracker carry the lock between detector passes ---
+        if (self.cfg["HYBRID_MODE"] and self.focus_mode and not self.object_recently_lost and self.box_tracker.active
+                and self.frames_since_detection < self.cfg["DETECT_EVERY_N_FRAMES"] - 1):
+            tracker_ok, tracker_box, self.tracker_score = self.box_tracker.update(frame)
+            if tracker_ok and self.tracker_score >= self.cfg["MIN_TRACKER_CONFIDENCE"]:
+                self.tracked_box = tracker_box
+            self.latency_telemetry.record_since("tracker_update", capture_ts)
+        self.frames_since_detection = self.frames_since_detection + 1 if self.tracked_box is not None else 0
+
+        if self.tracked_box is not None:
+            return None
+
+        # --- DUTY CYCLE: Only the occasional detector pass while nothing is happening ---
+        if self._idle_skip(frame, capture_ts):
+            self.detection_skipped = True
+            return None
+
+        # --- Crop to the ROIs if any are active (one padded crop per ROI) ---
+        self._crop_batch = None
+        if self.roi_active and not self.roi_mode:
+            crop_batch = CropBatch(frame, self.rois)
+            if len(crop_batch) > 0:
+                self._crop_batch = crop_batch
+                return crop_batch.images, crop_batch.imgsz
+        return frame, None
+
+    def finish_frame(self, results=None):
+        """
+        Updates tracks from the detector results for the image returned by
+        begin_frame() (None on tracker frames), runs the focus state machine,
+        publishes MQTT and draws the overlays. Returns the frame.
+        """
+        capture_ts = self.capture_ts
+        tracked_box = self.tracked_box
+        draw_overlays = self.draw_overlays
+        if draw_overlays and not self.frame.flags.writeable:
+            # Frame-bus frames are shared read-only views; draw on a private copy
+            self.frame = self.frame.copy()
+        frame = self.frame
+
+        if self.detection_skipped:
+            # Idle frame without a detector pass; tracks keep their last state
+            visible_tracks = []
+        elif tracked_box is None:
+            if self._crop_batch is not None:
+                # Detections come back relative to the ROI crops; map them to full-frame coordinates
+                det_boxes, det_classes, det_confs = self._crop_batch.detections(
+                    results, self.class_names, self.cfg["TARGET_CLASSES"], self.cfg["TRACK_LOW_CONFIDENCE"]
+                )
+            else:
+                det_boxes, det_classes, det_confs = detections_from_results(
+                    results or [], self.class_names, self.cfg["TARGET_CLASSES"], self.cfg["TRACK_LOW_CONFIDENCE"]
+                )
+            visible_tracks = self.object_tracker.update(det_boxes, det_classes, det_confs)
+            self.latency_telemetry.record_since("capture_to_detection", capture_ts)
+            self.latency_telemetry.increment("detector_passes")
+            if self.detection_stream is not None:
+                self.detection_stream.publish(visible_tracks, capture_ts)
+            if self.scheduler is not None:
+                self.scheduler.detection_done(capture_ts, bool((det_confs >= self.cfg["MIN_CONFIDENCE"]).any()))
+        else:
+            # Detector skipped on tracker frames; keep the focused track in step
+            focused_track = self.object_tracker.get(self.focused_track_id)
+            if focused_track is not None:
+                focused_track.correct(tracked_box)
+            visible_tracks = []
+
+        self.current_boxes_data = []
+
+        self._auto_select(visible_tracks)
+        self._check_seek_timeout()
+        if self.focus_mode and self.focused_track_id is not None:
+            self._update_focus(visible_tracks, draw_overlays)
+
+        # --- General Tracking Mode (Draw all tracks with their IDs) ---
+        if not self.focus_mode:
+            for track in visible_tracks:
+                x1, y1, x2, y2 = track.int_box()
+                class_name = self.class_names[track.class_id]
+                self.current_boxes_data.append((x1, y1, x2, y2, track.class_id, track.conf, class_name, track.track_id))
+                if not draw_overlays:
+                    continue
+
+                offset_x = (x1 + x2) // 2 - self.center_x
+                offset_y = (y1 + y2) // 2 - self.center_y
+                position_text = f"X:{offset_x}, Y:{offset_y}"
+
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
+                cv2.putText(frame, f"#{track.track_id} {class_name} {track.conf:.2f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+                cv2.putText(frame, position_text, (x1, y2 + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+        if draw_overlays:
+            self._draw_roi()
+            self._draw_crosshair()
+            if self.scheduler is not None and self.scheduler.mode == AdaptiveScheduler.IDLE:
+                cv2.putText(frame, "IDLE (low detection rate)", (10, self.frame_height - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (128, 128, 128), 1)
+        return frame
+
+    def _auto_select(self, visible_tracks):
+        # --- AUTO-SELECTION LOGIC (Picks the biggest track) ---
+        if not self.auto_focus_on_biggest or self.auto_focus_active or self.focus_mode:
+            return
+
+        best_area = 0
+        best_track = None
+        for track in visible_tracks:
+            x1, y1, x2, y2 = track.int_box()
+            area = (x2 - x1) * (y2 - y1)
+            if area > best_area:
+                best_area = area
+                best_track = track
+
+        if best_track is not None:
+            x1, y1, x2, y2 = best_track.int_box()
+            if self.start_focus(x1, y1, x2, y2, best_track.class_id, best_track.conf, best_track.track_id):
+                self.auto_focus_active = True
+
+    def _check_seek_timeout(self):
+        # --- Check for Seeking Mode Timeout ---
+        if not self.object_recently_lost:
+            return
+        self.lost_frames_counter += 1
+        if self.lost_frames_counter > self.cfg["MAX_LOST_FRAMES"]:
+            self._drop_focus()
+            print(f"[TIMEOUT] {self.name}: seeking timeout. Returning to general track.")
+            self.publish_tracking_status("TIMEOUT")
+
+    def _update_focus(self, visible_tracks, draw_overlays):
+        frame = self.frame
+        tracked_box = self.tracked_box
+        match_score = -1.0
+        best_match_box = None
+
+        if tracked_box is not None:
+            # --- HYBRID: The tracker result stands in for the detector on skipped frames ---
+            match_score = self.tracker_score
+            best_match_box = tracked_box
+        else:
+            focused_track = self.object_tracker.get(self.focused_track_id)
+            if focused_track is not None and focused_track.time_since_update == 0:
+                # The locked track ID was matched on this detector pass
+                match_score = focused_track.conf
+                best_match_box = focused_track.int_box()
+            elif self.object_recently_lost and len(self.reid_gallery) > 0:
+                # --- Re-acquisition: Appearance Re-ID against same-class tracks (LOST only) ---
+                candidates = [t for t in visible_tracks if t.class_id == self.focused_object_cls]
+                if candidates:
+                    similarities = self.reid_gallery.match(batch_descriptors(frame, [t.box for t in candidates]))
+                    best_index = int(similarities.argmax())
+
+                    if similarities[best_index] > self.cfg["MIN_SIMILARITY_MATCH"]:
+                        self.focused_track_id = candidates[best_index].track_id # Lock onto the re-identified track
+                        match_score = float(similarities[best_index])
+                        best_match_box = candidates[best_index].int_box()
+
+        if self.cfg["FRAME_LOG"]:
+            print(f"Frame {int(time.time() * 10) % 100} ({self.name}): Track={self.focused_track_id}, Score={match_score:.3f}, "
+                  f"Found={best_match_box is not None}, Lost_Mode={self.object_recently_lost}")
+
+        if best_match_box is None:
+            # Handle temporary loss (start seeking)
+            if not self.object_recently_lost:
+                self.object_recently_lost = True
+                self.publish_tracking_status("LOST")
+                self.box_tracker.reset()
+                # Publish STOP MOVE command only once when entering LOST state
+                self.publish_move_status(0, 0, "PAN STOP", "TILT STOP", self.capture_ts)
+
+            if draw_overlays:
+                color = (0, 165, 255)
+                if self.focused_object_box is not None:
+                    x1, y1, x2, y2 = self.focused_object_box
+                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+                cv2.putText(frame, f"SEEKING... ({self.lost_frames_counter} frames)", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+            return
+
+        # SUCCESS: Object found/re-acquired
+        self.focused_object_box = best_match_box
+        if self.object_recently_lost:
+            self.object_recently_lost = False
+            self.lost_frames_counter = 0
+            self.publish_tracking_status("FOUND")
+
+        # Keep the appearance gallery current as the object changes
+        x1, y1, x2, y2 = best_match_box
+        if tracked_box is None:
+            if len(self.reid_gallery) == 0 or self.reid_update_counter >= self.cfg["REID_UPDATE_INTERVAL"]:
+                self.reid_gallery.add(batch_descriptors(frame, [best_match_box])[0])
+                self.reid_update_counter = 0
+            self.reid_update_counter += 1
+
+            # HYBRID: Re-seed the fast tracker from every detector match
+            if self.cfg["HYBRID_MODE"]:
+                self.box_tracker.init(frame, best_match_box)
+
+        # --- CALCULATE AND PUBLISH INSTRUCTIONS ---
+        object_center_x = (x1 + x2) // 2
+        object_center_y = (y1 + y2) // 2
+        offset_x = int(object_center_x - self.center_x)
+        offset_y = int(object_center_y - self.center_y)
+
+        gimbal_pan_cmd = "PAN LEFT" if offset_x > 10 else ("PAN RIGHT" if offset_x < -10 else "PAN STOP")
+        gimbal_tilt_cmd = "TILT UP" if offset_y > 10 else ("TILT DOWN" if offset_y < -10 else "TILT STOP")
+        self.publish_move_status(offset_x, offset_y, gimbal_pan_cmd, gimbal_tilt_cmd, self.capture_ts)
+
+        if draw_overlays:
+            color = (0, 255, 0)
+            source_label = "TRACK" if tracked_box is not None else "DETECT"
+            status_text = f"FOCUS ({source_label}) Score:{match_score:.2f} X:{offset_x}, Y:{offset_y}"
+            gimbal_instructions = f"GIMBAL: {gimbal_pan_cmd}, {gimbal_tilt_cmd} (MQTT)"
+
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 4)
+            cv2.putText(frame, f"FOCUS #{self.focused_track_id} {self.class_names[self.focused_object_cls]}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+            cv2.putText(frame, status_text, (x1, y2 + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            cv2.putText(frame, gimbal_instructions, (x1, y2 + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            cv2.circle(frame, (object_center_x, object_center_y), 5, (0, 255, 255), -1)
+
+    def _draw_roi(self):
+        if self.roi_mode:
+            if self.roi_start_point is None or self.roi_end_point is None:
+                return
+            roi_color = (0, 255, 255) # Yellow while drawing
+            p1, p2 = self.roi_start_point, self.roi_end_point
+            cv2.rectangle(self.frame, p1, p2, roi_color, 1)
+            cv2.putText(self.frame, "Drawing ROI", (min(p1[0], p2[0]), max(p1[1], p2[1]) + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, roi_color, 1)
+        elif self.roi_active:
+            roi_color = (255, 0, 255) # Magenta for active ROIs
+            for roi in self.rois:
+                roi.draw(self.frame, roi_color)
+                x1, _, _, y2 = roi.box
+                cv2.putText(self.frame, f"ROI {roi.name} (M-Click to Clear)", (x1, y2 + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, roi_color, 1)
+
+    def _draw_crosshair(self):
+        # --- Draw Center of Frame (Red Crosshair) ---
+        crosshair_color = (0, 0, 255)
+        crosshair_size = 30
+        thickness = 2
+        cx, cy = self.center_x, self.center_y
+        cv2.line(self.frame, (cx - crosshair_size, cy), (cx + crosshair_size, cy), crosshair_color, thickness)
+        cv2.line(self.frame, (cx, cy - crosshair_size), (cx, cy + crosshair_size), crosshair_color, thickness)
+
+    # ----------------------------------------------------
+    # --- Viewer Window & End of Frame ---
+    # ----------------------------------------------------
+
+    def update_window(self):
+        """
+        Shows the frame when the window is visible, opening it on first use
+        and closing it when the viewer detaches. Returns True if it was shown
+        (the caller then runs cv2.waitKey once for all windows). Also feeds
+        the HTTP preview stream, which only encodes while someone watches.
+        """
+        if self.preview is not None:
+            self.preview.publish(self.frame)
+
+        if self.window_visible:
+            if not self.window_open:
+                cv2.namedWindow(self.window_name)
+                cv2.setMouseCallback(self.window_name, self.mouse_callback)
+                self.window_open = True
+            cv2.imshow(self.window_name, self.frame)
+            return True
+
+        if self.window_open:
+            # Viewer detached in headless mode
+            cv2.destroyWindow(self.window_name)
+            cv2.waitKey(1)
+            self.window_open = False
+        return False
+
+    def end_frame(self):
+        """Records the full loop latency and publishes the periodic report."""
+        self.latency_telemetry.record_since("frame_loop", self.capture_ts)
+        self.latency_telemetry.maybe_report(self.publish_diagnostics)
@@ -0,0 +1,154 @@
+import cv2
+import numpy as np
+
+# ----------------------------------------------------
+# --- Single-Object Tracker for Hybrid Detect+Track ---
+# ----------------------------------------------------
+# The YOLO detector runs every few frames; in between, this tracker follows the
+# focused box on its own. OpenCV's KCF/CSRT/MOSSE are used when the installed
+# build has them (opencv-contrib), otherwise a Lucas-Kanade optical-flow tracker
+# is used, which only needs core OpenCV.
+
+SIMILARITY_PATCH_SIZE = (32, 32)   # Patch size used to score the tracked box
+FLOW_MAX_CORNERS = 40              # Feature points tracked inside the box (FLOW mode)
+FLOW_MAX_FB_ERROR = 2.0            # Max forward-backward error (px) for a good point
+
+
+def create_cv_tracker(tracker_type):
+    """
+    Returns an OpenCV tracker instance for 'KCF', 'CSRT' or 'MOSSE',
+    or None if this OpenCV build does not provide it.
+    """
+    factory_name = f"Tracker{tracker_type.upper()}_create"
+    for namespace in (cv2, getattr(cv2, "legacy", None)):
+        if namespace is not None and hasattr(namespace, factory_name):
+            return getattr(namespace, factory_name)()
+    return None
+
+
+def _gray(frame):
+    if frame.ndim == 2:
+        return frame
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def _patch(frame_gray, box):
+    x1, y1, x2, y2 = box
+    crop = frame_gray[y1:y2, x1:x2]
+    if crop.shape[0] < 5 or crop.shape[1] < 5:
+        return None
+    return cv2.resize(crop, SIMILARITY_PATCH_SIZE, interpolation=cv2.INTER_AREA)
+
+
+class CorrelationTracker:
+    """
+    Follows one box between detector passes.
+    init() is called with a detector box, update() returns (ok, box, confidence)
+    where box is (x1, y1, x2, y2) in frame pixels and confidence is in [0, 1].
+    """
+
+    def __init__(self, tracker_type="KCF", frame_size=(640, 480)):
+        self.tracker_type = tracker_type.upper()
+        self.frame_width, self.frame_height = frame_size
+        self.active = False
+        self.box = None
+        self._cv_tracker = None
+        self._reference_patch = None
+        self._prev_gray = None
+        self._points = None
+        self._initial_point_count = 0
+        self._flow_box = None
+
+    def _clamp(self, x1, y1, x2, y2):
+        x1 = int(max(0, min(self.frame_width - 1, x1)))
+        y1 = int(max(0, min(self.frame_height - 1, y1)))
+        x2 = int(max(x1 + 1, min(self.frame_width, x2)))
+        y2 = int(max(y1 + 1, min(self.frame_height, y2)))
+        return (x1, y1, x2, y2)
+
+    def init(self, frame, box):
+        """Starts (or restarts) tracking from a detector box."""
+        self.reset()
+        box = self._clamp(*box)
+        frame_gray = _gray(frame)
+        self._reference_patch = _patch(frame_gray, box)
+        if self._reference_patch is None:
+            return False
+
+        x1, y1, x2, y2 = box
+        if self.tracker_type != "FLOW":
+            self._cv_tracker = create_cv_tracker(self.tracker_type)
+
+        if self._cv_tracker is not None:
+            self._cv_tracker.init(frame, (x1, y1, x2 - x1, y2 - y1))
+        else:
+            # Optical-flow fallback: seed good features inside the box, away
+            # from its border where background points would hold it back
+            inset_x, inset_y = (x2 - x1) // 8, (y2 - y1) // 8
+            mask = np.zeros_like(frame_gray)
+            mask[y1 + inset_y:y2 - inset_y, x1 + inset_x:x2 - inset_x] = 255
+            points = cv2.goodFeaturesToTrack(frame_gray, FLOW_MAX_CORNERS, 0.01, 5, mask=mask)
+            if points is None or len(points) < 4:
+                return False
+            self._points = points
+            self._initial_point_count = len(points)
+            self._prev_gray = frame_gray
+            self._flow_box = np.array(box, dtype=np.float32)
+
+        self.box = box
+        self.active = True
+        return True
+
+    def reset(self):
+        self.active = False
+        self.box = None
+        self._cv_tracker = None
+        self._reference_patch = None
+        self._prev_gray = None
+        self._points = None
+        self._initial_point_count = 0
+        self._flow_box = None
+
+    def _update_flow(self, frame_gray):
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, frame_gray, self._points, None)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(frame_gray, self._prev_gray, new_points, None)
+        fb_error = np.linalg.norm((self._points - back_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < FLOW_MAX_FB_ERROR)
+        if good.sum() < 4:
+            return False, None, 0.0
+
+        shift = np.median((new_points - self._points).reshape(-1, 2)[good], axis=0)
+        self._flow_box = self._flow_box + np.tile(shift, 2) # Kept in float so sub-pixel shifts add up
+        box = self._clamp(*self._flow_box)
+
+        self._points = new_points[good].reshape(-1, 1, 2)
+        self._prev_gray = frame_gray
+        return True, box, good.sum() / self._initial_point_count
+
+    def update(self, frame):
+        """Advances the track by one frame."""
+        if not self.active:
+            return False, None, 0.0
+
+        frame_gray = _gray(frame)
+        if self._cv_tracker is not None:
+            ok, (x, y, w, h) = self._cv_tracker.update(frame)
+            if not ok:
+                return False, None, 0.0
+            box = self._clamp(x, y, x + w, y + h)
+            point_ratio = 1.0
+        else:
+            ok, box, point_ratio = self._update_flow(frame_gray)
+            if not ok:
+                return False, None, 0.0
+
+        # Score the new box against the patch taken at the last detection,
+        # so a drifting tracker hands control back to the detector early.
+        candidate = _patch(frame_gray, box)
+        if candidate is None:
+            return False, None, 0.0
+        similarity = float(cv2.matchTemplate(candidate, self._reference_patch, cv2.TM_CCOEFF_NORMED)[0, 0])
+        confidence = max(0.0, similarity) * min(1.0, point_ratio)
+
+        self.box = box
+        return True, box, confidence
@@ -0,0 +1,115 @@
+import json
+import time
+
+# ----------------------------------------------------
+# --- Full-Scene Detection Stream over MQTT ---
+# ----------------------------------------------------
+# Publishes every confirmed track of a detector pass (track ID, class, conf,
+# box) as one batched message, so dashboards, counters and recorders can use
+# the tracker's inference instead of running their own model.
+#
+#   tracker/detections             one message per detector pass (or per N passes)
+#   tracker/detections/<class>     optional per-class subtopics (e.g. .../person)
+#
+# Full message:
+#   {"camera": "cam0", "seq": 12, "timestamp": ..., "capture_ts": ..., "frame_size": [640, 480],
+#    "detections": [{"id": 3, "class": "person", "conf": 0.87, "box": [120, 40, 260, 400]}]}
+# Compact message (same header, rows instead of objects, conf in 1/1000):
+#   {..., "fields": ["id", "class", "conf", "x1", "y1", "x2", "y2"],
+#    "d": [[3, "person", 870, 120, 40, 260, 400]]}
+# With every_n > 1 the message carries all N passes, each with its own seq
+# and capture_ts, so nothing between two messages is lost:
+#   {"camera": "cam0", "timestamp": ..., "frame_size": [640, 480],
+#    "passes": [{"seq": 11, "capture_ts": ..., "detections": [...]}, {"seq": 12, ...}]}
+# (compact: "fields" once in the header and "d" rows per pass)
+
+COMPACT_FIELDS = ["id", "class", "conf", "x1", "y1", "x2", "y2"]
+
+
+class DetectionStream:
+    """
+    Batches the tracks of a detector pass (or of every_n passes) into one MQTT
+    message. publish_fn(topic, payload_json) sends it. classes=None streams every class
+    the tracker follows; per_class_topics also publishes one message per class
+    (an empty one when a class disappears, so counters drop back to zero).
+    """
+
+    def __init__(self, publish_fn, topic, camera_name, class_names, frame_size, every_n=1,
+                 classes=None, min_confidence=0.0, per_class_topics=False, compact=False):
+        self.publish_fn = publish_fn
+        self.topic = topic
+        self.camera_name = camera_name
+        self.class_names = class_names
+        self.frame_size = list(frame_size)
+        self.every_n = max(1, int(every_n))
+        self.classes = set(classes) if classes else None
+        self.min_confidence = min_confidence
+        self.per_class_topics = per_class_topics
+        self.compact = compact
+        self.seq = 0
+        self._pending = []          # (seq, capture_ts, rows) of the passes not sent yet
+        self._last_classes = set()
+
+    def _rows(self, tracks):
+        rows = []
+        for track in tracks:
+            class_name = self.class_names[track.class_id]
+            if self.classes is not None and class_name not in self.classes:
+                continue
+            if track.conf < self.min_confidence:
+                continue
+            rows.append((track.track_id, class_name, track.conf, track.int_box()))
+        return rows
+
+    def _pass_fields(self, rows):
+        if self.compact:
+            return {"d": [[track_id, class_name, int(round(conf * 1000)), *box]
+                          for track_id, class_name, conf, box in rows]}
+        return {"detections": [{"id": track_id, "class": class_name, "conf": round(conf, 3), "box": list(box)}
+                               for track_id, class_name, conf, box in rows]}
+
+    def _message(self, passes, now):
+        if self.every_n == 1:
+            seq, capture_ts, rows = passes[0]
+            message = {"camera": self.camera_name, "seq": seq, "timestamp": now,
+                       "capture_ts": capture_ts, "frame_size": self.frame_size}
+            if self.compact:
+                message["fields"] = COMPACT_FIELDS
+            message.update(self._pass_fields(rows))
+        else:
+            message = {"camera": self.camera_name, "timestamp": now, "frame_size": self.frame_size}
+            if self.compact:
+                message["fields"] = COMPACT_FIELDS
+            message["passes"] = [dict({"seq": seq, "capture_ts": capture_ts}, **self._pass_fields(rows))
+                                 for seq, capture_ts, rows in passes]
+        return json.dumps(message, separators=(",", ":") if self.compact else None)
+
+    def publish(self, tracks, capture_ts=None, now=None):
+        """Call once per detector pass with its visible tracks. Returns True if a message was sent."""
+        self.seq += 1
+        self._pending.append((self.seq, capture_ts, self._rows(tracks)))
+        if len(self._pending) < self.every_n:
+            return False
+        return self.flush(now)
+
+    def flush(self, now=None):
+        """Sends the passes collected so far (e.g. before shutting down)."""
+        if not self._pending:
+            return False
+        if now is None:
+            now = time.time()
+        passes, self._pending = self._pending, []
+        try:
+            self.publish_fn(self.topic, self._message(passes, now))
+            if self.per_class_topics:
+                seen = {row[1] for _, _, rows in passes for row in rows}
+                for class_name in sorted(seen | self._last_classes):
+                    class_passes = [(seq, capture_ts, [row for row in rows if row[1] == class_name])
+                                    for seq, capture_ts, rows in passes]
+                    self.publish_fn(f"{self.topic}/{class_name}", self._message(class_passes, now))
+                # A class that left during the batch already has its empty pass in it
+                self._last_classes = {row[1] for row in passes[-1][2]}
+        except Exception as e:
+            print(f"Error publishing detection stream: {e}")
+            return False
+        return True
@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+
+# ----------------------------------------------------
+# --- Adaptive Duty Cycling for the Detector ---
+# ----------------------------------------------------
+# While nothing in TARGET_CLASSES has been seen for IDLE_AFTER_S seconds, YOLO
+# only runs every IDLE_DETECT_INTERVAL_S seconds. A cheap frame-difference
+# motion check runs on the frames in between; motion, a target detection or
+# an active focus lock switch straight back to full rate.
+
+MOTION_FRAME_SIZE = (160, 120)      # Frames are compared at this size
+MOTION_BLUR = 5
+MOTION_BACKGROUND_RATE = 0.05       # How fast the background model follows the scene
+
+
+class MotionDetector:
+    """
+    Frame-difference motion check on a downscaled grayscale frame against a
+    slowly updated background. update() returns True if more than
+    min_area of the pixels changed by more than threshold.
+    """
+
+    def __init__(self, threshold=25, min_area=0.005):
+        self.threshold = threshold
+        self.min_area = min_area
+        self.background = None
+        self.changed_fraction = 0.0
+
+    def reset(self):
+        self.background = None
+
+    def update(self, frame):
+        small = cv2.resize(frame, MOTION_FRAME_SIZE, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (MOTION_BLUR, MOTION_BLUR), 0).astype(np.float32)
+
+        if self.background is None:
+            self.background = small
+            self.changed_fraction = 0.0
+            return False
+
+        diff = cv2.absdiff(small, self.background)
+        self.changed_fraction = float(np.count_nonzero(diff > self.threshold)) / diff.size
+        cv2.accumulateWeighted(small, self.background, MOTION_BACKGROUND_RATE)
+        return self.changed_fraction > self.min_area
+
+
+class AdaptiveScheduler:
+    """
+    Decides per frame whether the detector runs. Two modes:
+    ACTIVE (detector on every frame) and IDLE (every idle_interval seconds).
+    on_change(mode, reason) is called whenever the mode switches.
+    """
+
+    ACTIVE = "ACTIVE"
+    IDLE = "IDLE"
+
+    def __init__(self, idle_after=15.0, idle_interval=2.0, on_change=None):
+        self.idle_after = idle_after            # Seconds without activity before going IDLE
+        self.idle_interval = idle_interval      # Seconds between detector passes while IDLE
+        self.on_change = on_change
+        self.mode = self.ACTIVE
+        self.last_activity = None
+        self.last_detection = None
+
+    def _set_mode(self, mode, reason):
+        if mode != self.mode:
+            self.mode = mode
+            if self.on_change is not None:
+                self.on_change(mode, reason)
+
+    def mark_activity(self, now, reason="activity"):
+        self.last_activity = now
+        self._set_mode(self.ACTIVE, reason)
+
+    def should_detect(self, now, focus_active=False, motion=False):
+        if self.last_activity is None:
+            self.last_activity = now
+        if focus_active:
+            self.mark_activity(now, "focus")
+        elif motion:
+            self.mark_activity(now, "motion")
+        elif self.mode == self.ACTIVE and now - self.last_activity > self.idle_after:
+            self._set_mode(self.IDLE, f"no targets for {self.idle_after:.0f}s")
+
+        if self.mode == self.ACTIVE or self.last_detection is None:
+            return True
+        return now - self.last_detection >= self.idle_interval
+
+    def detection_done(self, now, found_targets):
+        self.last_detection = now
+        if found_targets:
+            self.mark_activity(now, "detection")
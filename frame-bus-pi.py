@@ -0,0 +1,69 @@
+import time
+import signal
+from frame_bus import FrameBusWriter
+from frame_sources import open_source
+
+# ----------------------------------------------------
+# --- Frame Bus Service ---
+# ----------------------------------------------------
+# Owns the camera and publishes every frame into a shared-memory ring
+# (frame_bus.py). Trackers, the recorder and viewers then read from the bus
+# with FRAME_SOURCE = "bus:ai_camera" instead of opening Picamera2
+# themselves, so they can all run at the same time.
+
+# --- Configuration ---
+FRAME_BUS_NAME = "ai_camera"
+FRAME_SOURCE = "picamera"           # Or a video file / image folder as a fake camera
+FRAME_SIZE = (640, 480)             # (width, height) published on the bus
+RING_SLOTS = 16                     # Frames kept; a reader must finish a frame within this many
+STATS_INTERVAL = 10.0               # Seconds between fps reports
+
+STOP_REQUESTED = False
+
+def request_stop(signum, frame):
+    global STOP_REQUESTED
+    STOP_REQUESTED = True
+
+
+def run_frame_bus():
+    try:
+        source = open_source(FRAME_SOURCE, FRAME_SIZE)
+    except Exception as e:
+        print(f"Error opening frame source '{FRAME_SOURCE}': {e}")
+        if "Pipeline handler in use by another process" in str(e):
+            print("TIP: Another program still opens the camera directly. Point it at the bus instead.")
+        return
+
+    frame, capture_ts = source.read()
+    if frame is None:
+        print("Error: Frame source returned no frames.")
+        source.close()
+        return
+
+    writer = FrameBusWriter(FRAME_BUS_NAME, frame.shape, RING_SLOTS)
+    print(f"Frame bus '{FRAME_BUS_NAME}' started: {frame.shape[1]}x{frame.shape[0]}, {RING_SLOTS} slots. Press Ctrl+C to stop.")
+
+    frames_published = 0
+    last_report = time.time()
+    try:
+        while not STOP_REQUESTED and frame is not None:
+            writer.publish(frame, capture_ts)
+            frames_published += 1
+
+            now = time.time()
+            if now - last_report >= STATS_INTERVAL:
+                print(f"[FRAME BUS] seq={writer.seq} fps={frames_published / (now - last_report):.1f}")
+                frames_published = 0
+                last_report = now
+
+            frame, capture_ts = source.read()
+    finally:
+        writer.close()
+        source.close()
+        print("Frame bus stopped.")
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    run_frame_bus()
@@ -0,0 +1,204 @@
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# ----------------------------------------------------
+# --- Shared-Memory Frame Bus ---
+# ----------------------------------------------------
+# One process owns the camera and writes every frame into a ring of slots in a
+# multiprocessing.shared_memory block. Any number of readers (tracker,
+# recorder, preview, samplers) attach by name and get numpy views straight into
+# the ring, so frames are never copied between processes.
+#
+# Layout: [header int64 x 8][slot seq int64 x N][slot ts float64 x N][frames]
+# A slot's sequence number is set to -1 while it is being written and to the
+# frame's sequence number afterwards, so a reader can tell if the frame it was
+# looking at was overwritten (the writer lapped the ring) in the meantime.
+
+FRAME_BUS_MAGIC = 0x46425553        # "FBUS"
+HEADER_FIELDS = 8                   # magic, height, width, channels, slots, latest_seq, writer_pid, reserved
+FRAME_ALIGNMENT = 64
+
+_MAGIC, _HEIGHT, _WIDTH, _CHANNELS, _SLOTS, _LATEST_SEQ, _WRITER_PID = range(7)
+_created_here = set()               # Buses this process created (and will unlink)
+
+
+def _layout(slots, frame_shape):
+    meta_bytes = 8 * HEADER_FIELDS + 16 * slots
+    frames_offset = (meta_bytes + FRAME_ALIGNMENT - 1) // FRAME_ALIGNMENT * FRAME_ALIGNMENT
+    frame_bytes = int(np.prod(frame_shape))
+    return frames_offset, frame_bytes, frames_offset + slots * frame_bytes
+
+
+def _attach(name):
+    """Attaches to an existing block without letting this process unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if name in _created_here:
+            return shm # Same process as the writer: keep its registration
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class _FrameRing:
+    """numpy views over a frame bus block (shared by the writer and readers)."""
+
+    def __init__(self, shm, slots, frame_shape):
+        frames_offset, frame_bytes, _ = _layout(slots, frame_shape)
+        self.shm = shm
+        self.slots = slots
+        self.frame_shape = frame_shape
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        self.slot_seq = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=8 * HEADER_FIELDS)
+        self.slot_ts = np.ndarray((slots,), dtype=np.float64, buffer=shm.buf, offset=8 * HEADER_FIELDS + 8 * slots)
+        self.frames = np.ndarray((slots,) + frame_shape, dtype=np.uint8, buffer=shm.buf, offset=frames_offset)
+
+    def release(self):
+        # Views must be dropped before the block can be closed
+        self.header = self.slot_seq = self.slot_ts = self.frames = None
+        self.shm.close()
+
+
+class FrameBusWriter:
+    """
+    Creates the bus and publishes frames into it. frame_shape is
+    (height, width, channels) of the uint8 frames that will be written.
+    """
+
+    def __init__(self, name, frame_shape, slots=16):
+        frame_shape = tuple(int(v) for v in frame_shape)
+        if len(frame_shape) == 2:
+            frame_shape = frame_shape + (1,)
+        _, _, total_bytes = _layout(slots, frame_shape)
+
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=total_bytes)
+        except FileExistsError:
+            # Left behind by a writer that did not shut down cleanly
+            stale = _attach(name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=total_bytes)
+
+        _created_here.add(name)
+        self.name = name
+        self.ring = _FrameRing(shm, slots, frame_shape)
+        self.ring.slot_seq[:] = -1
+        self.ring.header[:] = [FRAME_BUS_MAGIC, frame_shape[0], frame_shape[1], frame_shape[2], slots, -1, os.getpid(), 0]
+        self.seq = -1
+
+    def publish(self, frame, timestamp=None):
+        """Copies one frame into the next slot; returns its sequence number."""
+        ring = self.ring
+        seq = self.seq + 1
+        slot = seq % ring.slots
+        ring.slot_seq[slot] = -1 # Being written
+        np.copyto(ring.frames[slot], frame.reshape(ring.frame_shape))
+        ring.slot_ts[slot] = time.time() if timestamp is None else timestamp
+        ring.slot_seq[slot] = seq
+        ring.header[_LATEST_SEQ] = seq
+        self.seq = seq
+        return seq
+
+    def close(self):
+        shm = self.ring.shm
+        self.ring.release()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        _created_here.discard(self.name)
+
+
+class FrameBusReader:
+    """
+    Attaches to a running bus. Frames are returned as read-only views into
+    shared memory: they stay valid until the writer laps the ring (slots
+    frames later), which is_valid(seq) reports. Copy a frame to keep it.
+    """
+
+    def __init__(self, name, timeout=5.0):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                shm = _attach(name)
+                break
+            except FileNotFoundError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.1)
+
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        if header[_MAGIC] != FRAME_BUS_MAGIC:
+            del header
+            shm.close()
+            raise ValueError(f"Shared memory '{name}' is not a frame bus.")
+        frame_shape = (int(header[_HEIGHT]), int(header[_WIDTH]), int(header[_CHANNELS]))
+        slots = int(header[_SLOTS])
+        del header
+
+        self.name = name
+        self.ring = _FrameRing(shm, slots, frame_shape)
+        self.frame_shape = frame_shape
+        self.last_seq = -1
+        self.dropped_frames = 0
+
+    @property
+    def latest_seq(self):
+        return int(self.ring.header[_LATEST_SEQ])
+
+    def is_valid(self, seq):
+        """True while the frame with this sequence number has not been overwritten."""
+        return int(self.ring.slot_seq[seq % self.ring.slots]) == seq
+
+    def _view(self, seq):
+        slot = seq % self.ring.slots
+        frame = self.ring.frames[slot]
+        frame.flags.writeable = False
+        timestamp = float(self.ring.slot_ts[slot])
+        if not self.is_valid(seq):
+            return None, None
+        return frame, timestamp
+
+    def read(self, latest=True, timeout=1.0):
+        """
+        Waits for a frame newer than the last one read and returns
+        (seq, frame, timestamp), or (None, None, None) on timeout.
+        latest=True skips to the newest frame (trackers, preview);
+        latest=False returns every frame in order (recorders) and counts the
+        ones that were overwritten before they could be read in dropped_frames.
+        """
+        deadline = time.time() + timeout
+        while True:
+            newest = self.latest_seq
+            if newest > self.last_seq:
+                if latest or self.last_seq < 0:
+                    seq = newest
+                else:
+                    seq = self.last_seq + 1
+                    oldest = newest - self.ring.slots + 1
+                    if seq < oldest:
+                        self.dropped_frames += oldest - seq
+                        seq = oldest
+                frame, timestamp = self._view(seq)
+                if frame is not None:
+                    self.last_seq = seq
+                    return seq, frame, timestamp
+                # Overwritten while we looked: try again with fresh indices
+                self.dropped_frames += 1
+                self.last_seq = seq
+                continue
+            if time.time() > deadline:
+                return None, None, None
+            time.sleep(0.002)
+
+    def close(self):
+        self.ring.release()
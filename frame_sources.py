@@ -0,0 +1,149 @@
+import glob
+import os
+import time
+
+import cv2
+
+from frame_bus import FrameBusReader
+
+# ----------------------------------------------------
+# --- Frame Sources ---
+# ----------------------------------------------------
+# Every source has read() -> (frame, capture_ts) and close(), so the trackers
+# and the recorder can take frames from the camera, from the frame bus or
+# from a file without caring which. Frames are BGR uint8 (what Picamera2's
+# "RGB888" format produces in memory). open_source() picks a source from a
+# spec string:
+#   "picamera" / "picamera:1"   Picamera2 (camera number 1)
+#   "bus:ai_camera"             attach to a frame-bus-pi.py service
+#   "video.mp4" / "frames/*.jpg" / "frames/"   file-backed fake camera
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class PicameraSource:
+    """Owns a Picamera2 camera (only one process can open it at a time)."""
+
+    def __init__(self, size=(640, 480), camera_num=0, video=False):
+        from picamera2 import Picamera2 # Only needed on the Pi
+        self.picam2 = Picamera2(camera_num)
+        if video:
+            config = self.picam2.create_video_configuration(main={"format": "RGB888", "size": size})
+        else:
+            config = self.picam2.create_preview_configuration(main={"format": "RGB888", "size": size})
+        self.picam2.configure(config)
+        self.picam2.start()
+
+    def read(self):
+        frame = self.picam2.capture_array()
+        return frame, time.time()
+
+    def close(self):
+        self.picam2.stop()
+
+
+class FileSource:
+    """
+    Fake camera backed by a video file or an image sequence. Frames are
+    paced to fps like a real camera (fps=None reads as fast as possible) and
+    the file loops at its end unless loop=False, after which read() returns
+    (None, None).
+    """
+
+    def __init__(self, path, size=None, fps=30.0, loop=True):
+        self.path = path
+        self.size = size
+        self.fps = fps
+        self.loop = loop
+        self.capture = None
+        self.image_paths = None
+        self.index = 0
+        self.next_frame_time = None
+
+        if os.path.isdir(path):
+            path = os.path.join(path, "*")
+        if any(ch in path for ch in "*?["):
+            self.image_paths = sorted(p for p in glob.glob(path) if p.lower().endswith(IMAGE_EXTENSIONS))
+            if not self.image_paths:
+                raise FileNotFoundError(f"No images match {self.path}")
+        else:
+            self.capture = cv2.VideoCapture(path)
+            if not self.capture.isOpened():
+                raise FileNotFoundError(f"Could not open video {path}")
+
+    def _next_frame(self):
+        if self.image_paths is not None:
+            if self.index >= len(self.image_paths):
+                if not self.loop:
+                    return None
+                self.index = 0
+            frame = cv2.imread(self.image_paths[self.index])
+            self.index += 1
+            return frame
+
+        ok, frame = self.capture.read()
+        if not ok and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read()
+        return frame if ok else None
+
+    def read(self):
+        if self.fps:
+            now = time.time()
+            if self.next_frame_time is None:
+                self.next_frame_time = now
+            elif now < self.next_frame_time:
+                time.sleep(self.next_frame_time - now)
+            self.next_frame_time = max(self.next_frame_time + 1.0 / self.fps, time.time() - 1.0 / self.fps)
+
+        frame = self._next_frame()
+        if frame is None:
+            return None, None
+        if self.size is not None and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+            frame = cv2.resize(frame, tuple(self.size), interpolation=cv2.INTER_AREA)
+        return frame, time.time()
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+
+
+class FrameBusSource:
+    """
+    Reads from a frame bus. Frames are read-only views into shared memory
+    (no copy) and carry the capture timestamp from the bus; they are only
+    resized (and therefore copied) if size differs from the bus frame size.
+    latest=False returns every frame in order instead of the newest one.
+    """
+
+    def __init__(self, name, size=None, latest=True, timeout=5.0):
+        self.reader = FrameBusReader(name, timeout=timeout)
+        self.size = size
+        self.latest = latest
+        self.seq = None
+
+    def read(self):
+        seq, frame, capture_ts = self.reader.read(latest=self.latest)
+        if frame is None:
+            return None, None
+        self.seq = seq
+        if self.size is not None and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+            frame = cv2.resize(frame, tuple(self.size), interpolation=cv2.INTER_AREA)
+        return frame, capture_ts
+
+    def close(self):
+        self.reader.close()
+
+
+def open_source(spec, size=(640, 480), video=False):
+    """
+    Opens a frame source from a spec string (see the top of this file).
+    video=True is for recorders: video configuration on the camera and every
+    frame in order (not just the newest) from the bus.
+    """
+    if spec.startswith("picamera"):
+        camera_num = int(spec.split(":", 1)[1]) if ":" in spec else 0
+        return PicameraSource(size, camera_num, video=video)
+    if spec.startswith("bus:"):
+        return FrameBusSource(spec[4:], size=size, latest=not video)
+    return FileSource(spec, size=size)
@@ -0,0 +1,227 @@
+import collections
+import time
+
+# ----------------------------------------------------
+# --- PID Position Control for the Gimbal ---
+# ----------------------------------------------------
+# Turns the tracker's pixel offsets into absolute pan/tilt angles. The offset
+# is converted to an angular error through the camera field of view, a PID
+# per axis turns the error into a correction, and the new target angle
+# (current + correction, clamped to the servo range) is sent to the sketch as
+#   POS <pan_deg> <tilt_deg>
+# which it applies directly. A large offset is corrected in one or two
+# messages instead of one 1° step per three repeated messages.
+#
+# With a TargetPredictor per axis, the offset is first turned into the
+# target's angle at capture time (servo angle then + offset angle). The
+# target's angular velocity is estimated from consecutive captures, and the
+# command leads the target by the measured capture-to-now latency plus the
+# servo lead time.
+
+# --- Raspberry Pi Camera Module v2 field of view ---
+CAMERA_HFOV_DEG = 62.2
+CAMERA_VFOV_DEG = 48.8
+
+
+class PID:
+    """
+    PID with anti-windup: the integral is clamped to integral_limit and is not
+    grown while the output is saturated in the same direction as the error.
+    update() takes a timestamp so dt follows the real message spacing.
+    """
+
+    def __init__(self, kp, ki=0.0, kd=0.0, output_limit=None, integral_limit=None):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_limit = output_limit
+        self.integral_limit = integral_limit
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.last_error = None
+        self.last_time = None
+
+    def update(self, error, now):
+        dt = now - self.last_time if self.last_time is not None else 0.0
+        derivative = 0.0
+        if dt > 0 and self.last_error is not None:
+            derivative = (error - self.last_error) / dt
+
+        integral = self.integral + error * dt
+        if self.integral_limit is not None:
+            integral = max(-self.integral_limit, min(self.integral_limit, integral))
+
+        output = self.kp * error + self.ki * integral + self.kd * derivative
+        saturated = self.output_limit is not None and abs(output) > self.output_limit
+        if saturated:
+            output = max(-self.output_limit, min(self.output_limit, output))
+        if not saturated or (error > 0) != (output > 0):
+            self.integral = integral # Conditional integration (anti-windup)
+
+        self.last_error = error
+        self.last_time = now
+        return output
+
+
+class TargetPredictor:
+    """
+    Constant-velocity model of the target's angle. update() takes the angle
+    seen at a capture time; predict(lead_s) extrapolates from the latest one.
+    """
+
+    def __init__(self, smoothing=0.5, max_speed_deg_s=120.0):
+        self.smoothing = smoothing              # Weight of the newest velocity sample
+        self.max_speed_deg_s = max_speed_deg_s  # Caps leads caused by detection jitter
+        self.reset()
+
+    def reset(self):
+        self.angle = None
+        self.time = None
+        self.velocity = 0.0
+
+    def update(self, angle, capture_ts):
+        if self.time is not None and capture_ts - self.time > 1e-3:
+            sample = (angle - self.angle) / (capture_ts - self.time)
+            velocity = self.smoothing * sample + (1 - self.smoothing) * self.velocity
+            self.velocity = max(-self.max_speed_deg_s, min(self.max_speed_deg_s, velocity))
+        self.angle = angle
+        self.time = capture_ts
+
+    def predict(self, lead_s):
+        return self.angle + self.velocity * max(lead_s, 0.0)
+
+
+class AxisController:
+    """
+    One servo axis. direction maps a positive pixel offset to a positive (+1)
+    or negative (-1) angle change. Offsets inside deadband_px hold position.
+    predictor (optional) enables latency compensation, see lead_offset().
+    """
+
+    def __init__(self, pid, degrees_per_px, direction=1, min_angle=0.0, max_angle=180.0,
+                 center_angle=90.0, deadband_px=10, predictor=None):
+        self.pid = pid
+        self.degrees_per_px = degrees_per_px
+        self.direction = direction
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self.center_angle = center_angle
+        self.deadband_px = deadband_px
+        self.predictor = predictor
+        self.angle = center_angle
+        self.history = collections.deque(maxlen=64)  # (time, commanded angle)
+
+    def angle_at(self, ts):
+        """The angle commanded at time ts (the servo is assumed to follow immediately)."""
+        for command_time, angle in reversed(self.history):
+            if command_time <= ts:
+                return angle
+        return self.history[0][1] if self.history else self.angle
+
+    def current_offset(self, offset_px, capture_ts):
+        """
+        The offset measured at capture_ts, re-expressed against the angle
+        commanded now, so corrections sent since that frame are not repeated.
+        """
+        scale = self.degrees_per_px * self.direction
+        return (self.angle_at(capture_ts) + offset_px * scale - self.angle) / scale
+
+    def lead_offset(self, offset_px, capture_ts, target_time):
+        """
+        The pixel offset that points at where the target will be at
+        target_time, given the offset it had at capture_ts.
+        """
+        scale = self.degrees_per_px * self.direction
+        target_angle = self.angle_at(capture_ts) + offset_px * scale
+        self.predictor.update(target_angle, capture_ts)
+        return (self.predictor.predict(target_time - capture_ts) - self.angle) / scale
+
+    def update(self, offset_px, now):
+        """Returns the new target angle."""
+        if abs(offset_px) <= self.deadband_px:
+            self.pid.reset() # On target: no integral drift while holding
+            return self.angle
+        error_deg = offset_px * self.degrees_per_px * self.direction
+        correction = self.pid.update(error_deg, now)
+        self.angle = max(self.min_angle, min(self.max_angle, self.angle + correction))
+        self.history.append((now, self.angle))
+        return self.angle
+
+    def reset(self):
+        self.pid.reset()
+        if self.predictor is not None:
+            self.predictor.reset()
+
+    def sync(self, angle, now=None):
+        """Takes over the servo's actual angle (e.g. after the sketch's search sweep)."""
+        self.angle = max(self.min_angle, min(self.max_angle, angle))
+        self.history.clear()
+        self.history.append((time.time() if now is None else now, self.angle))
+        self.reset()
+
+
+class GimbalController:
+    """
+    Pan + tilt position control. update() returns (pan, tilt) when either
+    target moved by at least min_step_deg, or None to leave the servos alone.
+    """
+
+    def __init__(self, pan, tilt, min_step_deg=0.2):
+        self.pan = pan
+        self.tilt = tilt
+        self.min_step_deg = min_step_deg
+        self.last_sent = None
+
+    def update(self, offset_x, offset_y, now=None, capture_ts=None, lead_s=0.0):
+        """
+        capture_ts (same clock as now) is the frame the offsets were measured
+        on. Each axis measures its error against the angle commanded at that
+        time, so a late or repeated message does not apply the same correction
+        twice. Axes with a predictor also lead the target by now - capture_ts + lead_s.
+        """
+        if now is None:
+            now = time.time()
+        if capture_ts is not None:
+            offset_x = self._offset_now(self.pan, offset_x, capture_ts, now + lead_s)
+            offset_y = self._offset_now(self.tilt, offset_y, capture_ts, now + lead_s)
+        target = (self.pan.update(offset_x, now), self.tilt.update(offset_y, now))
+        if self.last_sent is not None and max(abs(target[0] - self.last_sent[0]),
+                                              abs(target[1] - self.last_sent[1])) < self.min_step_deg:
+            return None
+        self.last_sent = target
+        return target
+
+    def _offset_now(self, axis, offset_px, capture_ts, target_time):
+        if axis.predictor is not None:
+            return axis.lead_offset(offset_px, capture_ts, target_time)
+        return axis.current_offset(offset_px, capture_ts)
+
+    def reset(self):
+        """Clears the PID and prediction state (lock lost or re-acquired); keeps the angles."""
+        self.pan.reset()
+        self.tilt.reset()
+
+    def center(self):
+        self.sync(self.pan.center_angle, self.tilt.center_angle)
+
+    def sync(self, pan_angle, tilt_angle):
+        self.pan.sync(pan_angle)
+        self.tilt.sync(tilt_angle)
+        self.last_sent = (self.pan.angle, self.tilt.angle)
+
+
+def format_position(pan_angle, tilt_angle):
+    return f"POS {pan_angle:.1f} {tilt_angle:.1f}"
+
+
+def parse_position(line):
+    """(pan, tilt) from a "POS_NOW <pan> <tilt>" line sent by the sketch, or None."""
+    parts = line.split()
+    if len(parts) != 3 or parts[0] != "POS_NOW":
+        return None
+    try:
+        return float(parts[1]), float(parts[2])
+    except ValueError:
+        return None
@@ -0,0 +1,138 @@
+import bisect
+import json
+import threading
+import time
+from collections import deque
+
+# ----------------------------------------------------
+# --- Latency Histograms for Control-Loop Telemetry ---
+# ----------------------------------------------------
+# Frames are stamped with time.time() right after capture and the stamp travels
+# with the tracker/move payload ("capture_ts"), so every stage downstream can
+# record how old the frame is. When the tracker and the receiver run on
+# different hosts their clocks must be synchronized (NTP/chrony) for the
+# cross-host stages to be meaningful.
+
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000]
+PERCENTILE_WINDOW = 512         # Recent samples kept per stage for percentiles
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with percentiles over a recent window."""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS, window=PERCENTILE_WINDOW):
+        self.buckets_ms = list(buckets_ms)
+        self.recent = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent.clear()
+
+    def record(self, latency_ms):
+        self.counts[bisect.bisect_left(self.buckets_ms, latency_ms)] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+        self.recent.append(latency_ms)
+
+    def percentile(self, p):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+    def summary(self):
+        labels = [f"<={edge}" for edge in self.buckets_ms] + [f">{self.buckets_ms[-1]}"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+            "max_ms": round(self.max_ms, 2),
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+
+class LatencyTelemetry:
+    """
+    One histogram per pipeline stage. maybe_report() prints a summary and
+    hands a JSON payload to publish_fn every report_interval seconds, then
+    starts a fresh interval. Safe to record from several threads.
+    Gauges (last value, e.g. a mode) and counters (events per interval) are
+    reported alongside the histograms.
+    """
+
+    def __init__(self, source, report_interval=10.0):
+        self.source = source
+        self.report_interval = report_interval
+        self.histograms = {}
+        self.gauges = {}
+        self.counters = {}
+        self.last_report = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, stage, latency_ms):
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = LatencyHistogram()
+            self.histograms[stage].record(latency_ms)
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_since(self, stage, start_ts, now=None):
+        """Records the time from start_ts (a time.time() stamp) to now."""
+        if start_ts is None:
+            return
+        if now is None:
+            now = time.time()
+        self.record(stage, (now - start_ts) * 1000.0)
+
+    def report(self, now=None):
+        if now is None:
+            now = time.time()
+        return {
+            "source": self.source,
+            "timestamp": now,
+            "interval_s": round(now - self.last_report, 2),
+            "stages": {stage: hist.summary() for stage, hist in self.histograms.items()},
+            "gauges": dict(self.gauges),
+            "counters": dict(self.counters)
+        }
+
+    def maybe_report(self, publish_fn=None, now=None):
+        if now is None:
+            now = time.time()
+        if now - self.last_report < self.report_interval or not self.histograms:
+            return None
+
+        with self._lock:
+            payload = self.report(now)
+            for hist in self.histograms.values():
+                hist.reset()
+            self.counters = {}
+            self.last_report = now
+
+        print(f"\n[LATENCY] {self.source} over {payload['interval_s']}s:")
+        for stage, summary in payload["stages"].items():
+            print(f"  {stage:<22} n={summary['count']:<5} p50={summary['p50_ms']:.1f}ms "
+                  f"p95={summary['p95_ms']:.1f}ms p99={summary['p99_ms']:.1f}ms max={summary['max_ms']:.1f}ms")
+        if payload["gauges"] or payload["counters"]:
+            print("  " + ", ".join(f"{name}={value}" for name, value in {**payload["gauges"], **payload["counters"]}.items()))
+
+        if publish_fn is not None:
+            try:
+                publish_fn(json.dumps(payload))
+            except Exception as e:
+                print(f"Error publishing latency report: {e}")
+        return payload
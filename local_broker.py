@@ -0,0 +1,156 @@
+import asyncio
+import struct
+import threading
+
+# ----------------------------------------------------
+# --- Minimal In-Process MQTT Broker (load tests) ---
+# ----------------------------------------------------
+# Just enough MQTT 3.1.1 for paho clients on one box: CONNECT, SUBSCRIBE
+# (with + and # wildcards), UNSUBSCRIBE, PUBLISH (QoS 0, QoS 1 is acked and
+# forwarded as QoS 0), PINGREQ and DISCONNECT. No retained messages, no
+# sessions, no auth. Runs its own event loop in a background thread, so a
+# load test does not depend on Mosquitto being installed.
+#
+#   broker = LocalBroker(port=18830).start()
+#   ... paho clients connect to 127.0.0.1:18830 ...
+#   broker.stop()
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def topic_matches(topic_filter, topic):
+    filter_parts = topic_filter.split("/")
+    topic_parts = topic.split("/")
+    for index, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if index >= len(topic_parts) or (part != "+" and part != topic_parts[index]):
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+def _packet(packet_type, body, flags=0):
+    header = bytearray([(packet_type << 4) | flags])
+    length = len(body)
+    while True:
+        byte = length % 128
+        length //= 128
+        header.append(byte | 0x80 if length else byte)
+        if not length:
+            break
+    return bytes(header) + body
+
+
+def _string(data, offset):
+    length = struct.unpack_from("!H", data, offset)[0]
+    return data[offset + 2:offset + 2 + length].decode("utf-8", "replace"), offset + 2 + length
+
+
+class LocalBroker:
+    """
+    QoS 0 message router for tests. routed counts delivered messages;
+    max_backlog_bytes is the largest unsent output seen for one subscriber.
+    """
+
+    def __init__(self, host="127.0.0.1", port=18830):
+        self.host = host
+        self.port = port
+        self.subscriptions = {}     # writer -> set of topic filters
+        self.received = 0
+        self.routed = 0
+        self.max_backlog_bytes = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def subscriber_count(self, topic):
+        return sum(1 for filters in list(self.subscriptions.values())
+                   if any(topic_matches(topic_filter, topic) for topic_filter in filters))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        print(f"📡 Local MQTT broker on {self.host}:{self.port}")
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2)
+            self._loop = None
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._client, self.host, self.port))
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            self._loop.close()
+
+    async def _read_packet(self, reader):
+        first = (await reader.readexactly(1))[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        return first >> 4, first & 0x0F, await reader.readexactly(length)
+
+    def _route(self, topic, payload):
+        self.received += 1
+        message = None
+        for writer, filters in list(self.subscriptions.items()):
+            if any(topic_matches(topic_filter, topic) for topic_filter in filters):
+                if message is None:
+                    topic_bytes = topic.encode()
+                    message = _packet(PUBLISH, struct.pack("!H", len(topic_bytes)) + topic_bytes + payload)
+                writer.write(message)
+                self.routed += 1
+                self.max_backlog_bytes = max(self.max_backlog_bytes, writer.transport.get_write_buffer_size())
+
+    async def _client(self, reader, writer):
+        self.subscriptions[writer] = set()
+        try:
+            while True:
+                packet_type, flags, body = await self._read_packet(reader)
+                if packet_type == CONNECT:
+                    writer.write(_packet(CONNACK, b"\x00\x00"))
+                elif packet_type == PUBLISH:
+                    topic, offset = _string(body, 0)
+                    qos = (flags >> 1) & 0x03
+                    if qos:
+                        writer.write(_packet(PUBACK, body[offset:offset + 2]))
+                        offset += 2
+                    self._route(topic, body[offset:])
+                elif packet_type == SUBSCRIBE:
+                    packet_id, offset, granted = body[:2], 2, bytearray()
+                    while offset < len(body):
+                        topic_filter, offset = _string(body, offset)
+                        offset += 1 # Requested QoS; everything is delivered as QoS 0
+                        self.subscriptions[writer].add(topic_filter)
+                        granted.append(0)
+                    writer.write(_packet(SUBACK, packet_id + bytes(granted)))
+                elif packet_type == UNSUBSCRIBE:
+                    offset = 2
+                    while offset < len(body):
+                        topic_filter, offset = _string(body, offset)
+                        self.subscriptions[writer].discard(topic_filter)
+                    writer.write(_packet(UNSUBACK, body[:2]))
+                elif packet_type == PINGREQ:
+                    writer.write(_packet(PINGRESP, b""))
+                elif packet_type == DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.subscriptions.pop(writer, None)
+            writer.close()
@@ -0,0 +1,354 @@
+import asyncio
+import importlib.util
+import json
+import math
+import os
+import signal
+import threading
+import time
+import tty
+import paho.mqtt.client as mqtt
+from latency_telemetry import LatencyTelemetry
+from local_broker import LocalBroker
+from serial_protocol import FrameDecoder, Frame, encode_frame, OP_ACK, OP_POS
+from telemetry_codec import MoveEncoder
+from transport import TransportRouter, TRANSPORT_UNIX
+
+# ----------------------------------------------------
+# --- Tracker -> Receiver Load Test and Soak Harness ---
+# ----------------------------------------------------
+# Runs the real object-locking-mqtt-receiver-pi.py against synthetic (or
+# replayed) tracker/move and tracker/status streams at set rates, with:
+#   - an in-process MQTT broker (local_broker.py), or BROKER = "localhost"
+#     for a real Mosquitto
+#   - a PTY in place of the Arduino that records every frame and ACKs it
+# and reports, per scenario: throughput, messages lost in transit, moves the
+# receiver replaced or dropped as stale, event-loop and broker backlog, and
+# capture -> receive / capture -> serial latency percentiles. Results are
+# also written to RESULTS_FILE so runs can be compared.
+#
+# Everything runs on one box; with the in-process broker the publisher,
+# broker and receiver share one Python process, so absolute numbers are a
+# pessimistic bound for a Pi running Mosquitto.
+
+# --- Configuration ---
+RECEIVER_SCRIPT = "object-locking-mqtt-receiver-pi.py"
+BROKER = None                       # None = in-process stand-in, or e.g. "localhost" for Mosquitto
+BROKER_PORT = 18830                 # Port of the stand-in (1883 for Mosquitto)
+MOVE_BINARY = False                 # Publish the 26-byte binary move payload instead of JSON
+TRANSPORT = "mqtt"                  # "unix" sends moves/status over transport.py's Unix datagram socket
+LOCAL_SOCKET_PATH = "/tmp/ai-object-detection-loadtest.sock"
+PIPELINE_DELAY_S = 0.03             # capture_ts is this much older than the publish (inference time)
+OFFSET_AMPLITUDE_PX = 150           # Synthetic offsets: sine sweep of this amplitude
+OFFSET_PERIOD_S = 3.0
+REPLAY_FILE = None                  # JSON-lines output of replay-tracker.py to replay instead
+SETTLE_S = 1.0                      # Pause between scenarios so queues drain
+RESULTS_FILE = "loadtest-results.json"
+
+# name, move rate (msg/s), duration (s), optional burst (extra moves every burst_every s),
+# optional status_every (s between LOST/FOUND flips)
+SCENARIOS = [
+    {"name": "steady-30", "rate": 30, "duration": 10},
+    {"name": "steady-60", "rate": 60, "duration": 10},
+    {"name": "steady-120", "rate": 120, "duration": 10},
+    {"name": "burst-30+100", "rate": 30, "duration": 10, "burst": 100, "burst_every": 2.0},
+    {"name": "status-flap-30", "rate": 30, "duration": 10, "status_every": 1.0}
+]
+
+MOVE_TOPIC = "tracker/move"
+STATUS_TOPIC = "tracker/status"
+
+
+def load_receiver():
+    """Imports the receiver script as a module so its handlers can be instrumented."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), RECEIVER_SCRIPT)
+    spec = importlib.util.spec_from_file_location("gimbal_receiver", path)
+    receiver = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(receiver)
+    return receiver
+
+
+# -----------------------------------------------------------------
+# --- PTY Serial Recorder (stands in for the Arduino) ---
+# -----------------------------------------------------------------
+class PtyRecorder:
+    """Counts what the receiver writes to the serial port and ACKs frames that ask for it."""
+
+    def __init__(self):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.path = os.ttyname(self.slave)
+        self.decoder = FrameDecoder()
+        self.position_frames = 0
+        self.other_frames = 0
+        self.text_lines = 0
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def reset(self):
+        self.position_frames = self.other_frames = self.text_lines = 0
+
+    def _run(self):
+        while self.running:
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            for item in self.decoder.feed(data):
+                if not isinstance(item, Frame):
+                    if item:
+                        self.text_lines += 1
+                    continue
+                if item.opcode == OP_POS:
+                    self.position_frames += 1
+                else:
+                    self.other_frames += 1
+                if item.ack:
+                    os.write(self.master, encode_frame(OP_ACK, item.seq))
+
+    def close(self):
+        self.running = False
+        os.close(self.master)
+        os.close(self.slave)
+
+
+# -----------------------------------------------------------------
+# --- Receiver Probe (wraps the receiver's MQTT hand-off) ---
+# -----------------------------------------------------------------
+class ReceiverProbe:
+    """
+    Counts messages handed from paho's thread to the event loop and handled
+    there. The difference is the event-loop backlog; the time between the
+    two is recorded as loop_queue.
+    """
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+        self.lock = threading.Lock()
+        self.telemetry = LatencyTelemetry("loadtest_probe")
+        self.reset()
+        on_message, handle_message = receiver.on_message, receiver.handle_message
+
+        def probed_on_message(client, userdata, msg):
+            with self.lock:
+                self.handed_over += 1
+                self.max_backlog = max(self.max_backlog, self.handed_over - self.handled)
+            on_message(client, userdata, msg)
+
+        def probed_handle_message(client, topic, raw_payload, received_at):
+            self.telemetry.record_since("loop_queue", received_at)
+            with self.lock:
+                self.handled += 1
+                if topic == receiver.MQTT_MOVE_TOPIC:
+                    self.moves += 1
+            handle_message(client, topic, raw_payload, received_at)
+
+        receiver.on_message = probed_on_message
+        receiver.handle_message = probed_handle_message
+
+    def reset(self):
+        with self.lock:
+            self.handed_over = self.handled = self.moves = self.max_backlog = 0
+        self.telemetry = LatencyTelemetry("loadtest_probe")
+
+
+# -----------------------------------------------------------------
+# --- Publisher (the tracker side) ---
+# -----------------------------------------------------------------
+def load_replay(path):
+    """tracker/move and tracker/status payloads from a replay-tracker.py recording, in order."""
+    messages = []
+    with open(path, "r") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["topic"].endswith((MOVE_TOPIC, STATUS_TOPIC)):
+                messages.append((STATUS_TOPIC if record["topic"].endswith(STATUS_TOPIC) else MOVE_TOPIC,
+                                 record["payload"]))
+    return messages
+
+
+class Publisher:
+    """Publishes one scenario's moves on an absolute schedule (no drift under load)."""
+
+    def __init__(self, host, port, replay=None):
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id="Loadtest_Publisher")
+        self.client.connect(host, port, 60)
+        self.client.loop_start()
+        self.router = TransportRouter(lambda topic, payload: self.client.publish(topic, payload, qos=0),
+                                      TRANSPORT, LOCAL_SOCKET_PATH)
+        self.encoder = MoveEncoder(binary=MOVE_BINARY, coalesce=False)
+        self.replay = replay or []
+        self.replay_index = 0
+
+    def status(self, status):
+        self.router.publish(STATUS_TOPIC, json.dumps({"status": status, "timestamp": time.time()}))
+
+    def move(self, elapsed):
+        now = time.time()
+        if self.replay:
+            topic, payload = self.replay[self.replay_index % len(self.replay)]
+            self.replay_index += 1
+            if topic == STATUS_TOPIC:
+                self.router.publish(topic, json.dumps(payload))
+                return 0
+            offset_x, offset_y = payload.get("offset_x", 0), payload.get("offset_y", 0)
+            pan_cmd, tilt_cmd = payload.get("pan_command", "PAN STOP"), payload.get("tilt_command", "TILT STOP")
+        else:
+            phase = 2 * math.pi * elapsed / OFFSET_PERIOD_S
+            offset_x = int(OFFSET_AMPLITUDE_PX * math.sin(phase))
+            offset_y = int(OFFSET_AMPLITUDE_PX / 2 * math.cos(phase))
+            pan_cmd = "PAN LEFT" if offset_x > 10 else "PAN RIGHT" if offset_x < -10 else "PAN STOP"
+            tilt_cmd = "TILT DOWN" if offset_y > 10 else "TILT UP" if offset_y < -10 else "TILT STOP"
+        payload = self.encoder.encode(offset_x, offset_y, pan_cmd, tilt_cmd, now - PIPELINE_DELAY_S, now)
+        self.router.publish(MOVE_TOPIC, payload)
+        return 1
+
+    def run(self, scenario):
+        rate, duration = scenario["rate"], scenario["duration"]
+        burst, burst_every = scenario.get("burst", 0), scenario.get("burst_every", 0)
+        status_every = scenario.get("status_every", 0)
+        start = time.time()
+        next_move, next_burst, next_status = start, start + (burst_every or math.inf), start + (status_every or math.inf)
+        lost = False
+        sent = 0
+        self.status("FOUND")
+        while True:
+            now = time.time()
+            elapsed = now - start
+            if elapsed >= duration:
+                break
+            if now >= next_burst:
+                for _ in range(burst):
+                    sent += self.move(elapsed)
+                next_burst += burst_every
+            if now >= next_status:
+                lost = not lost
+                self.status("LOST" if lost else "FOUND")
+                next_status += status_every
+            if now >= next_move:
+                sent += self.move(elapsed)
+                next_move += 1.0 / rate
+            time.sleep(max(0.0, min(next_move, next_burst, next_status) - time.time()))
+        if lost:
+            self.status("FOUND")
+        return sent, time.time() - start
+
+    def close(self):
+        self.router.close()
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+# -----------------------------------------------------------------
+# --- Scenario Runner ---
+# -----------------------------------------------------------------
+def stage_summary(telemetry, stage):
+    histogram = telemetry.histograms.get(stage)
+    if histogram is None or not histogram.count:
+        return None
+    summary = histogram.summary()
+    return {key: summary[key] for key in ("count", "p50_ms", "p95_ms", "p99_ms", "max_ms")}
+
+
+def run_scenario(scenario, publisher, receiver, probe, recorder, broker):
+    probe.reset()
+    recorder.reset()
+    receiver.latency_telemetry = LatencyTelemetry("gimbal_receiver", math.inf)
+    routed_before = broker.routed if broker else 0
+
+    sent, elapsed = publisher.run(scenario)
+    time.sleep(SETTLE_S) # Let the receiver drain before counting
+
+    counters = receiver.latency_telemetry.counters
+    result = {
+        "scenario": scenario["name"],
+        "rate": scenario["rate"],
+        "published_moves": sent,
+        "published_per_s": round(sent / elapsed, 1),
+        "received_moves": probe.moves,
+        "lost_in_transit": sent - probe.moves,
+        "moves_replaced": counters.get("moves_replaced", 0),
+        "moves_stale_dropped": counters.get("moves_stale_dropped", 0),
+        "move_seq_gaps": counters.get("move_seq_gaps", 0),
+        "serial_position_frames": recorder.position_frames,
+        "serial_other_frames": recorder.other_frames + recorder.text_lines,
+        "max_loop_backlog": probe.max_backlog,
+        "broker_routed": (broker.routed - routed_before) if broker else None,
+        "broker_max_backlog_bytes": broker.max_backlog_bytes if broker else None,
+        "latency": {
+            "loop_queue": stage_summary(probe.telemetry, "loop_queue"),
+            "publish_to_receive": stage_summary(receiver.latency_telemetry, "publish_to_receive"),
+            "capture_to_receive": stage_summary(receiver.latency_telemetry, "capture_to_receive"),
+            "capture_to_serial": stage_summary(receiver.latency_telemetry, "capture_to_serial"),
+            "serial_rtt": stage_summary(receiver.latency_telemetry, "serial_rtt")
+        }
+    }
+    print_result(result)
+    return result
+
+
+def print_result(result):
+    print(f"\n[LOADTEST] {result['scenario']}: {result['published_moves']} moves at "
+          f"{result['published_per_s']}/s, received {result['received_moves']} "
+          f"(lost {result['lost_in_transit']}), replaced {result['moves_replaced']}, "
+          f"stale {result['moves_stale_dropped']}, serial POS frames {result['serial_position_frames']}, "
+          f"max loop backlog {result['max_loop_backlog']}")
+    for stage, summary in result["latency"].items():
+        if summary:
+            print(f"  {stage:<20} n={summary['count']:<6} p50={summary['p50_ms']:.1f}ms "
+                  f"p95={summary['p95_ms']:.1f}ms p99={summary['p99_ms']:.1f}ms max={summary['max_ms']:.1f}ms")
+
+
+def run_loadtest():
+    broker = LocalBroker(port=BROKER_PORT).start() if BROKER is None else None
+    host = "127.0.0.1" if BROKER is None else BROKER
+    recorder = PtyRecorder().start()
+    print(f"🔌 Serial recorder on {recorder.path}")
+
+    receiver = load_receiver()
+    receiver.MQTT_BROKER = host
+    receiver.MQTT_PORT = BROKER_PORT
+    receiver.SERIAL_PORT = recorder.path
+    receiver.TRANSPORT = TRANSPORT
+    receiver.LOCAL_SOCKET_PATH = LOCAL_SOCKET_PATH
+    receiver.print = lambda *args, **kwargs: None # Per-message prints would dominate the timings
+    probe = ReceiverProbe(receiver)
+    results = []
+
+    def drive():
+        # Wait until the receiver has subscribed, then run every scenario
+        if TRANSPORT == TRANSPORT_UNIX:
+            while not os.path.exists(LOCAL_SOCKET_PATH):
+                time.sleep(0.1)
+        while TRANSPORT != TRANSPORT_UNIX and broker is not None and broker.subscriber_count(MOVE_TOPIC) == 0:
+            time.sleep(0.1)
+        time.sleep(2.5 if broker is not None else 5.0) # The receiver waits 2 s for the Arduino reset
+        publisher = Publisher(host, BROKER_PORT, load_replay(REPLAY_FILE) if REPLAY_FILE else None)
+        try:
+            for scenario in SCENARIOS:
+                print(f"\n▶️  {scenario['name']} ({scenario['rate']} moves/s for {scenario['duration']}s)")
+                results.append(run_scenario(scenario, publisher, receiver, probe, recorder, broker))
+        finally:
+            publisher.close()
+            os.kill(os.getpid(), signal.SIGINT) # Stops the receiver's main loop
+
+    threading.Thread(target=drive, daemon=True).start()
+    try:
+        asyncio.run(receiver.main_async())
+    finally:
+        recorder.close()
+        if broker is not None:
+            broker.stop()
+
+    with open(RESULTS_FILE, "w") as f:
+        json.dump({"timestamp": time.time(), "move_binary": MOVE_BINARY, "transport": TRANSPORT, "results": results},
+                  f, indent=2)
+    print(f"\n✅ {len(results)} scenarios done. Results written to {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    run_loadtest()
@@ -0,0 +1,222 @@
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None # Greedy matching is used instead
+
+# ----------------------------------------------------
+# --- Multi-Object Tracker (ByteTrack/SORT-style) ---
+# ----------------------------------------------------
+# Every target-class detection gets a persistent track ID. Detections are
+# associated with existing tracks through a vectorized IoU matrix, first the
+# confident ones, then the low-confidence leftovers (the ByteTrack trick that
+# keeps a track alive through partial occlusion).
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Returns the (len(boxes_a), len(boxes_b)) IoU matrix of two sets of
+    (x1, y1, x2, y2) boxes.
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    inter_x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    inter_y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    inter_x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    inter_y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(inter_x2 - inter_x1, 0, None) * np.clip(inter_y2 - inter_y1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def match_cost_matrix(cost, max_cost):
+    """
+    Solves the assignment problem for a cost matrix and returns the list of
+    (row, col) pairs whose cost is <= max_cost. Uses the Hungarian algorithm
+    when scipy is installed, greedy lowest-cost-first matching otherwise.
+    """
+    if cost.size == 0:
+        return []
+
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(np.where(np.isfinite(cost), cost, 1e6))
+        return [(r, c) for r, c in zip(rows, cols) if cost[r, c] <= max_cost]
+
+    pairs = []
+    used_rows, used_cols = set(), set()
+    for flat_index in np.argsort(cost, axis=None):
+        r, c = np.unravel_index(flat_index, cost.shape)
+        if cost[r, c] > max_cost:
+            break
+        if r in used_rows or c in used_cols:
+            continue
+        pairs.append((r, c))
+        used_rows.add(r)
+        used_cols.add(c)
+    return pairs
+
+
+def detections_from_results(results, class_names, target_classes, min_confidence, offset=(0, 0)):
+    """
+    Converts YOLO results into (boxes, class_ids, confs) numpy arrays, keeping
+    only target classes above min_confidence. offset is added to every box
+    (used when inference ran on a cropped region).
+    """
+    target_ids = [class_id for class_id, name in class_names.items() if name in target_classes]
+    boxes, class_ids, confs = [], [], []
+    for result in results:
+        if len(result.boxes) == 0:
+            continue
+        boxes.append(result.boxes.xyxy.cpu().numpy())
+        class_ids.append(result.boxes.cls.cpu().numpy().astype(int))
+        confs.append(result.boxes.conf.cpu().numpy())
+
+    if not boxes:
+        return np.zeros((0, 4), np.float32), np.zeros(0, int), np.zeros(0, np.float32)
+
+    boxes = np.concatenate(boxes).astype(np.float32)
+    class_ids = np.concatenate(class_ids)
+    confs = np.concatenate(confs)
+    keep = np.isin(class_ids, target_ids) & (confs >= min_confidence)
+    boxes = boxes[keep] + np.array([offset[0], offset[1], offset[0], offset[1]], dtype=np.float32)
+    return boxes, class_ids[keep], confs[keep]
+
+
+class Track:
+    """One tracked object with a persistent ID and a constant-velocity motion model."""
+
+    def __init__(self, track_id, box, class_id, conf):
+        self.track_id = track_id
+        self.box = np.asarray(box, dtype=np.float32)
+        self.class_id = int(class_id)
+        self.conf = float(conf)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.hits = 1
+        self.age = 1
+        self.time_since_update = 0
+        self._last_observed_box = self.box.copy()
+        self._skip_prediction = False
+
+    def predict(self):
+        if not self._skip_prediction:
+            self.box = self.box + self.velocity
+        self._skip_prediction = False
+        self.age += 1
+        self.time_since_update += 1
+
+    def update(self, box, conf):
+        box = np.asarray(box, dtype=np.float32)
+        observed_motion = (box - self._last_observed_box) / max(1, self.time_since_update)
+        self.velocity = 0.5 * self.velocity + 0.5 * observed_motion
+        self.box = box
+        self._last_observed_box = box.copy()
+        self.conf = float(conf)
+        self.hits += 1
+        self.time_since_update = 0
+
+    def correct(self, box):
+        """Moves the track to an externally tracked box (no detector hit)."""
+        self.box = np.asarray(box, dtype=np.float32)
+        self._last_observed_box = self.box.copy()
+        self._skip_prediction = True # The box already reflects the latest motion
+
+    def int_box(self):
+        x1, y1, x2, y2 = self.box
+        return int(x1), int(y1), int(x2), int(y2)
+
+    def center(self):
+        x1, y1, x2, y2 = self.box
+        return (x1 + x2) / 2, (y1 + y2) / 2
+
+
+class MultiObjectTracker:
+    """
+    Keeps persistent IDs for all target-class detections.
+    Call update() once per detector pass with the frame's detections.
+    """
+
+    def __init__(self, iou_threshold=0.3, low_iou_threshold=0.5, high_confidence=0.4,
+                 max_age=30, min_hits=2, max_center_shift=None):
+        self.iou_threshold = iou_threshold          # Min IoU to match a confident detection
+        self.low_iou_threshold = low_iou_threshold  # Min IoU to match a low-confidence detection
+        self.high_confidence = high_confidence      # Only confident detections start new tracks
+        self.max_age = max_age                      # Detector passes a track survives unmatched
+        self.min_hits = min_hits                    # Hits before a track is reported
+        self.max_center_shift = max_center_shift    # Optional pixel gate on center movement
+        self.tracks = []
+        self._next_id = 1
+
+    def _cost(self, tracks, boxes, class_ids):
+        if not tracks or len(boxes) == 0:
+            return np.zeros((len(tracks), len(boxes)), dtype=np.float32)
+
+        track_boxes = np.stack([t.box for t in tracks])
+        cost = 1.0 - iou_matrix(track_boxes, boxes)
+
+        # Gate: a track only matches detections of its own class...
+        track_classes = np.array([t.class_id for t in tracks])
+        cost[track_classes[:, None] != class_ids[None, :]] = np.inf
+
+        # ...and, optionally, detections within max_center_shift pixels
+        if self.max_center_shift is not None:
+            track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+            det_centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+            shift = np.linalg.norm(track_centers[:, None, :] - det_centers[None, :, :], axis=2)
+            cost[shift > self.max_center_shift] = np.inf
+        return cost
+
+    def update(self, boxes, class_ids, confs):
+        """
+        Associates one frame of detections (numpy arrays from
+        detections_from_results) and returns the tracks seen in this frame.
+        """
+        for track in self.tracks:
+            track.predict()
+
+        high = confs >= self.high_confidence
+        high_idx = np.flatnonzero(high)
+        low_idx = np.flatnonzero(~high)
+
+        # --- Stage 1: all tracks vs confident detections ---
+        cost = self._cost(self.tracks, boxes[high_idx], class_ids[high_idx])
+        matched_tracks = set()
+        matched_high = set()
+        for r, c in match_cost_matrix(cost, 1.0 - self.iou_threshold):
+            det = high_idx[c]
+            self.tracks[r].update(boxes[det], confs[det])
+            matched_tracks.add(r)
+            matched_high.add(c)
+
+        # --- Stage 2: leftover tracks vs low-confidence detections ---
+        leftover = [i for i in range(len(self.tracks)) if i not in matched_tracks]
+        cost = self._cost([self.tracks[i] for i in leftover], boxes[low_idx], class_ids[low_idx])
+        for r, c in match_cost_matrix(cost, 1.0 - self.low_iou_threshold):
+            det = low_idx[c]
+            self.tracks[leftover[r]].update(boxes[det], confs[det])
+
+        # --- New tracks from unmatched confident detections ---
+        for c, det in enumerate(high_idx):
+            if c not in matched_high:
+                self.tracks.append(Track(self._next_id, boxes[det], class_ids[det], confs[det]))
+                self._next_id += 1
+
+        self.tracks = [t for t in self.tracks if t.time_since_update <= self.max_age]
+        return self.visible_tracks()
+
+    def visible_tracks(self):
+        """Confirmed tracks matched on the latest detector pass."""
+        return [t for t in self.tracks if t.time_since_update == 0 and t.hits >= self.min_hits]
+
+    def get(self, track_id):
+        for track in self.tracks:
+            if track.track_id == track_id:
+                return track
+        return None
+
+    def reset(self):
+        self.tracks = []
@@ -1,152 +1,388 @@
 import paho.mqtt.client as mqtt
+import asyncio
+import collections
+import signal
 import time
 import json
 import serial
-import threading
 import sys # Import sys for cleaner exit on failure
+import struct
+from latency_telemetry import LatencyTelemetry
+from telemetry_codec import decode_move
+from gimbal_control import (PID, AxisController, GimbalController, TargetPredictor, format_position,
+                            parse_position, CAMERA_HFOV_DEG, CAMERA_VFOV_DEG)
+from serial_protocol import AckTracker, FrameDecoder, Frame, OP_ACK, encode_command, frame_to_line
+from transport import UnixDatagramSubscriber, DEFAULT_SOCKET_PATH, TRANSPORT_UNIX
+
+# ----------------------------------------------------
+# --- Gimbal Receiver (asyncio) ---
+# ----------------------------------------------------
+# One event loop owns all receiver state. paho's network thread only hands
+# each message over with call_soon_threadsafe(). A single SerialWriter task
+# owns the serial port: status lines (FOUND/LOST/TIMEOUT) are queued in
+# order, while moves go into a latest-wins slot, so a newer move replaces one
+# that has not been written yet instead of queueing behind it. The "PAN STOP"
+# after a move is scheduled with call_later() and rescheduled by every new
+# move, so nothing sleeps and no message is dropped while a move runs.
+# With SERIAL_PROTOCOL = "BINARY" commands go out as CRC-checked frames
+# (serial_protocol.py) and the sketch's ACKs give the serial round-trip time.
 
 # --- MQTT Configuration ---
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
-MQTT_MOVE_TOPIC = "tracker/move"
-MQTT_STATUS_TOPIC = "tracker/status"
+MQTT_TOPIC_PREFIX = ""  # e.g. "cam1/" to follow one camera of object-locking-multicam-pi.py
+MQTT_MOVE_TOPIC = MQTT_TOPIC_PREFIX + "tracker/move"
+MQTT_STATUS_TOPIC = MQTT_TOPIC_PREFIX + "tracker/status"
+MQTT_DIAGNOSTICS_TOPIC = MQTT_TOPIC_PREFIX + "tracker/diagnostics"  # Periodic latency reports
 MQTT_CLIENT_ID = "Gimbal_Controller"
 
+# --- Control-Path Transport ---
+# "unix": tracker/move and tracker/status arrive from a tracker on this Pi
+# over a Unix datagram socket (transport.py), skipping the broker. MQTT is
+# then only used for diagnostics and may be unavailable.
+TRANSPORT = "mqtt"
+LOCAL_SOCKET_PATH = DEFAULT_SOCKET_PATH
+
 # --- Serial Configuration ---
 SERIAL_PORT = '/dev/ttyUSB0'
-BAUD_RATE = 9600
+BAUD_RATE = 115200          # Must match Serial.begin() in the sketch (was 9600)
 SERIAL_TIMEOUT = 1
+SERIAL_WRITE_TIMEOUT = 0.1  # A stuck port must not stall the event loop
+SERIAL_PROTOCOL = "BINARY"  # "BINARY" frames, or "TEXT" lines for sketches without frame support
+SERIAL_ACKS = True          # Ask for an ACK per frame (serial_rtt in the latency report)
+SERIAL_ACK_TIMEOUT = 0.5    # Frames unacknowledged this long count as serial_ack_timeouts
+
+# --- Control Mode ---
+# "PID": offsets -> absolute "POS <pan> <tilt>" angles the sketch applies directly (gimbal_control.py)
+# "STEP": the original repeat-filtered PAN_LEFT_SMALL / PAN_RIGHT_SMALL 1° steps
+CONTROL_MODE = "PID"
+
+# --- PID Position Control ---
+FRAME_WIDTH = 640           # Tracker frame size the offsets refer to
+FRAME_HEIGHT = 480
+PAN_KP, PAN_KI, PAN_KD = 0.7, 0.1, 0.02     # Per degree of angular error
+TILT_KP, TILT_KI, TILT_KD = 0.7, 0.1, 0.02
+PAN_DIRECTION = -1          # offset_x > 0 lowers the pan angle (same as PAN_LEFT_SMALL)
+TILT_DIRECTION = 1          # Flip if the tilt servo moves away from the target
+MAX_CORRECTION_DEG = 30.0   # Largest correction per message
+INTEGRAL_LIMIT_DEG = 20.0   # Anti-windup clamp on the integral term
+CONTROL_DEADBAND_PX = 10    # Hold position while the offset is inside this
+
+# --- Latency Compensation (needs tracker and receiver clocks in sync, e.g. NTP) ---
+PREDICTION = True           # Lead moving targets by the measured pipeline latency
+SERVO_LEAD_S = 0.05         # Extra lead for the servo to get there
+TARGET_VELOCITY_SMOOTHING = 0.5
+MAX_TARGET_SPEED_DEG_S = 120.0
+MAX_MESSAGE_AGE_S = 0.5     # Moves whose frame is older than this are dropped
+
+# --- Command Timing ---
+MOVE_STOP_DELAY = 1.0       # "PAN STOP" this long after the latest move (STEP mode)
+FOUND_STOP_DELAY = 0.2      # "PAN STOP" this long after "FOUND"
+POSITION_SYNC_TIMEOUT = 0.3 # PID: moves after "FOUND" wait this long at most for the sketch's POS_NOW
 
 # --- Global Variables ---
-arduino = None
 tracking_lost = False
 last_command = None
 repeat_count = 0
-REQUIRED_REPEATS = 3
+REQUIRED_REPEATS = 3    # Move messages in a row (the tracker resends unchanged offsets every MOVE_HEARTBEAT_S)
 STABLE_ZONE = 10        # ±20 = stable zone
-busy = False            # flag: waiting for stop
+last_move_seq = None
+serial_writer = None
+position_sync_deadline = None   # Set on FOUND until POS_NOW reports where the sweep stopped
+
+def make_predictor():
+    return TargetPredictor(TARGET_VELOCITY_SMOOTHING, MAX_TARGET_SPEED_DEG_S) if PREDICTION else None
+
+gimbal = GimbalController(
+    AxisController(PID(PAN_KP, PAN_KI, PAN_KD, MAX_CORRECTION_DEG, INTEGRAL_LIMIT_DEG),
+                   CAMERA_HFOV_DEG / FRAME_WIDTH, PAN_DIRECTION, deadband_px=CONTROL_DEADBAND_PX,
+                   predictor=make_predictor()),
+    AxisController(PID(TILT_KP, TILT_KI, TILT_KD, MAX_CORRECTION_DEG, INTEGRAL_LIMIT_DEG),
+                   CAMERA_VFOV_DEG / FRAME_HEIGHT, TILT_DIRECTION, deadband_px=CONTROL_DEADBAND_PX,
+                   predictor=make_predictor())
+)
+
+# --- Latency Telemetry ---
+LATENCY_REPORT_INTERVAL = 10.0
+latency_telemetry = LatencyTelemetry("gimbal_receiver", LATENCY_REPORT_INTERVAL)
 
 # -----------------------------------------------------------------
-# --- Serial Write Function ---
+# --- Serial Writer (the only code that touches the port) ---
 # -----------------------------------------------------------------
-def send_to_arduino(data_string):
-    global arduino
-    if arduino is None or not arduino.is_open:
-        # This print will occur if serial is not initialized, but MQTT will still receive messages.
-        print("❌ Serial not ready. Command not sent.")
-        return
-    try:
-        arduino.write((data_string + '\n').encode('utf-8'))
-        print(f"-> SERIAL SENT: {data_string}")
-    except Exception as e:
-        print(f"❌ Serial write error: {e}")
-
-def handle_command_with_stop(command):
+class SerialWriter:
     """
-    Send a command, wait 1s, send PAN STOP.
-    Blocks new commands until finished.
+    Serial output for the event loop. send_status() keeps every status line;
+    send_move() keeps only the newest move that has not been written yet.
     """
-    global busy
-    # Only proceed if serial is potentially connected, otherwise the lock serves no purpose.
-    # We still manage 'busy' to regulate message processing, even without serial.
-    busy = True
-    send_to_arduino(command)
-    time.sleep(1)
-    send_to_arduino("PAN STOP")
-    busy = False
+
+    def __init__(self, port):
+        self.port = port
+        self.decoder = FrameDecoder()
+        self.acks = AckTracker(SERIAL_ACK_TIMEOUT)
+        self.seq = 0
+        self.status_lines = collections.deque()
+        self.pending_move = None    # (line, capture_ts), latest wins
+        self.replaced_moves = 0
+        self.stop_handle = None
+        self.wake = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+    def send_status(self, line):
+        self.status_lines.append(line)
+        self.wake.set()
+
+    def send_move(self, line, capture_ts=None):
+        if self.pending_move is not None:
+            self.replaced_moves += 1
+            latency_telemetry.increment("moves_replaced")
+        self.pending_move = (line, capture_ts)
+        self.wake.set()
+
+    def schedule_stop(self, delay):
+        """(Re)schedules "PAN STOP" after delay seconds; a newer move pushes it back."""
+        if self.stop_handle is not None:
+            self.stop_handle.cancel()
+        self.stop_handle = self.loop.call_later(delay, self._send_stop)
+
+    def _send_stop(self):
+        self.stop_handle = None
+        self.send_move("PAN STOP")
+
+    def _write(self, line, capture_ts=None):
+        """capture_ts is the tracker's frame capture stamp for move commands."""
+        if self.port is None or not self.port.is_open:
+            # This print will occur if serial is not initialized, but MQTT will still receive messages.
+            print(f"❌ Serial not ready. Command not sent: {line}")
+            return
+        try:
+            if SERIAL_PROTOCOL == "BINARY":
+                self.seq = (self.seq + 1) & 0xFF
+                data = encode_command(line, self.seq, SERIAL_ACKS)
+            else:
+                data = (line + '\n').encode('utf-8')
+            self.port.write(data)
+            latency_telemetry.record_since("capture_to_serial", capture_ts)
+            if SERIAL_PROTOCOL == "BINARY" and SERIAL_ACKS:
+                self.acks.sent(self.seq)
+                lost = self.acks.expire()
+                if lost:
+                    latency_telemetry.increment("serial_ack_timeouts", lost)
+            print(f"-> SERIAL SENT: {line}")
+        except Exception as e:
+            print(f"❌ Serial write error: {e}")
+
+    def start_reader(self, on_line):
+        """
+        Calls on_line(text) for every line the sketch prints (frames other
+        than ACKs arrive as their text form), from the event loop (no thread).
+        """
+        if self.port is None or not self.port.is_open:
+            return
+        self.loop.add_reader(self.port.fileno(), self._read_lines, on_line)
+
+    def _read_lines(self, on_line):
+        try:
+            items = self.decoder.feed(self.port.read(self.port.in_waiting or 1))
+        except Exception as e:
+            print(f"❌ Serial read error: {e}")
+            self.loop.remove_reader(self.port.fileno())
+            return
+        for item in items:
+            if not isinstance(item, Frame):
+                on_line(item)
+            elif item.opcode == OP_ACK:
+                rtt = self.acks.acked(item.seq)
+                if rtt is not None:
+                    latency_telemetry.record("serial_rtt", rtt * 1000.0)
+            else:
+                on_line(frame_to_line(item) or "")
+
+    async def run(self):
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            while self.status_lines:
+                self._write(self.status_lines.popleft())
+            if self.pending_move is not None:
+                line, capture_ts = self.pending_move
+                self.pending_move = None
+                self._write(line, capture_ts)
 
 # -----------------------------------------------------------------
-# --- MQTT Callbacks ---
+# --- Message Handling (runs on the event loop) ---
 # -----------------------------------------------------------------
-def on_connect(client, userdata, flags, rc):
-    if rc == 0:
-        print("✅ MQTT Connected.")
-        client.subscribe(MQTT_MOVE_TOPIC)
-        client.subscribe(MQTT_STATUS_TOPIC)
-    else:
-        print(f"❌ MQTT connection failed with code {rc}")
+def handle_status(payload):
+    global tracking_lost, position_sync_deadline
+    status = payload.get("status", "UNKNOWN")
+    position_sync_deadline = None
+    if status == "FOUND":
+        tracking_lost = False
+        gimbal.reset() # The sketch reports where the search sweep stopped (POS_NOW)
+        serial_writer.send_status("FOUND")
+        if CONTROL_MODE != "PID":
+            serial_writer.schedule_stop(FOUND_STOP_DELAY)
+        else:
+            # Moves computed from the pre-sweep angle would swing the servo back
+            serial_writer.pending_move = None
+            position_sync_deadline = time.time() + POSITION_SYNC_TIMEOUT
+    elif status == "LOST":
+        tracking_lost = True
+        gimbal.reset()
+        serial_writer.pending_move = None # A late move would cut the search sweep short
+        if serial_writer.stop_handle is not None:
+            # A STOP still pending from the last FOUND would halt the search sweep
+            serial_writer.stop_handle.cancel()
+            serial_writer.stop_handle = None
+        serial_writer.send_status("LOST")
+    elif status == "TIMEOUT":
+        gimbal.center() # The sketch centers the servos on TIMEOUT
+        serial_writer.send_status("TIMEOUT")
 
-def on_message(client, userdata, msg):
-    global tracking_lost, last_command, repeat_count, busy
+def handle_serial_line(line):
+    global position_sync_deadline
+    position = parse_position(line)
+    if position is not None:
+        gimbal.sync(*position)
+        position_sync_deadline = None
+    elif line:
+        print(f"<- SERIAL: {line}")
 
-    try:
-        payload = json.loads(msg.payload.decode())
-        topic = msg.topic
-
-        # --- Status Messages ---
-        if topic == MQTT_STATUS_TOPIC:
-            status = payload.get("status", "UNKNOWN")
-            if status == "FOUND":
-                tracking_lost = False
-                send_to_arduino("FOUND")
-                time.sleep(0.2)
-                send_to_arduino("PAN STOP")
-            elif status == "LOST":
-                tracking_lost = True
-                send_to_arduino("LOST")
-            elif status == "TIMEOUT":
-                send_to_arduino("TIMEOUT")
-            return
+def handle_move(payload, received_at, client):
+    global last_command, repeat_count, last_move_seq, position_sync_deadline
 
-        # --- Move Messages ---
-        if topic == MQTT_MOVE_TOPIC:
-            if tracking_lost:
-                return
-            if busy:
-                # currently executing a previous command → ignore new commands
-                print("⏱️ Busy, ignoring new command until stop is sent.")
-                return
+    # Frame age on arrival, and the broker/network share of it
+    capture_ts = payload.get("capture_ts")
+    latency_telemetry.record_since("capture_to_receive", capture_ts, received_at)
+    latency_telemetry.record_since("publish_to_receive", payload.get("timestamp"), received_at)
+    seq = payload.get("seq")
+    if seq is not None:
+        if last_move_seq is not None and seq > last_move_seq + 1:
+            latency_telemetry.increment("move_seq_gaps", seq - last_move_seq - 1)
+        last_move_seq = seq
+    latency_telemetry.maybe_report(
+        lambda report: client.publish(MQTT_DIAGNOSTICS_TOPIC, report, qos=0), received_at
+    )
 
-            offset_x = payload.get("offset_x", 0)
-            pan_cmd = payload.get("pan_command", "PAN STOP")
-            tilt_cmd = payload.get("tilt_command", "TILT STOP")
+    if tracking_lost:
+        return
+    if capture_ts is not None and received_at - capture_ts > MAX_MESSAGE_AGE_S:
+        # The target has moved on since this frame; acting on it would only add lag
+        latency_telemetry.increment("moves_stale_dropped")
+        return
+
+    offset_x = payload.get("offset_x", 0)
 
-            # --- Stable zone ---
-            if -STABLE_ZONE <= offset_x <= STABLE_ZONE:
-                print(f"🟢 Stable zone (-{STABLE_ZONE} to +{STABLE_ZONE}) → no movement")
-                last_command = None
-                repeat_count = 0
+    # --- PID: absolute target angles, no repeat filter ---
+    if CONTROL_MODE == "PID":
+        if position_sync_deadline is not None:
+            if received_at < position_sync_deadline:
+                latency_telemetry.increment("moves_held_for_sync")
                 return
+            print("⚠️ No POS_NOW after FOUND; continuing from the last known angle.")
+            position_sync_deadline = None
+        target = gimbal.update(offset_x, payload.get("offset_y", 0), received_at, capture_ts, SERVO_LEAD_S)
+        if target is not None:
+            serial_writer.send_move(format_position(*target), capture_ts)
+        return
 
-            # --- Correct small-step direction ---
-            if offset_x > STABLE_ZONE:
-                # Object is to the left → move servo left
-                gimbal_command = "PAN_LEFT_SMALL"
-            elif offset_x < -STABLE_ZONE:
-                # Object is to the right → move servo right
-                gimbal_command = "PAN_RIGHT_SMALL"
-            else:
-                gimbal_command = f"{pan_cmd} {tilt_cmd}"
+    pan_cmd = payload.get("pan_command", "PAN STOP")
+    tilt_cmd = payload.get("tilt_command", "TILT STOP")
 
-            # --- Repeat filter to avoid jitter ---
-            if gimbal_command == last_command:
-                repeat_count += 1
-            else:
-                repeat_count = 1
-                last_command = gimbal_command
-
-            if repeat_count >= REQUIRED_REPEATS:
-                # Execute command with stop in a separate thread
-                # The send_to_arduino function handles the case where the serial port is not open.
-                threading.Thread(target=handle_command_with_stop, args=(gimbal_command,)).start()
-                repeat_count = 0
-            else:
-                print(f"Waiting for stability {repeat_count}/{REQUIRED_REPEATS} → {gimbal_command}")
+    # --- Stable zone ---
+    if -STABLE_ZONE <= offset_x <= STABLE_ZONE:
+        print(f"🟢 Stable zone (-{STABLE_ZONE} to +{STABLE_ZONE}) → no movement")
+        last_command = None
+        repeat_count = 0
+        return
 
-    except json.JSONDecodeError:
-        print(f"⚠️ Invalid JSON: {msg.payload.decode()}")
+    # --- Correct small-step direction ---
+    if offset_x > STABLE_ZONE:
+        # Object is to the left → move servo left
+        gimbal_command = "PAN_LEFT_SMALL"
+    elif offset_x < -STABLE_ZONE:
+        # Object is to the right → move servo right
+        gimbal_command = "PAN_RIGHT_SMALL"
+    else:
+        gimbal_command = f"{pan_cmd} {tilt_cmd}"
+
+    # --- Repeat filter to avoid jitter ---
+    if gimbal_command == last_command:
+        repeat_count += 1
+    else:
+        repeat_count = 1
+        last_command = gimbal_command
+
+    if repeat_count >= REQUIRED_REPEATS:
+        # Newest move wins; the stop follows MOVE_STOP_DELAY after the latest one
+        serial_writer.send_move(gimbal_command, capture_ts)
+        serial_writer.schedule_stop(MOVE_STOP_DELAY)
+        repeat_count = 0
+    else:
+        print(f"Waiting for stability {repeat_count}/{REQUIRED_REPEATS} → {gimbal_command}")
+
+def handle_message(client, topic, raw_payload, received_at):
+    try:
+        # Move messages are JSON or the compact binary struct (MOVE_BINARY in the tracker)
+        if topic == MQTT_MOVE_TOPIC:
+            handle_move(decode_move(raw_payload), received_at, client)
+        elif topic == MQTT_STATUS_TOPIC:
+            handle_status(json.loads(raw_payload.decode()))
+    except (ValueError, UnicodeDecodeError, struct.error): # ValueError includes JSONDecodeError
+        print(f"⚠️ Invalid message on {topic}: {raw_payload!r}")
     except Exception as e:
         print(f"❌ Error processing message: {e}")
 
+# -----------------------------------------------------------------
+# --- MQTT Callbacks (paho network thread → event loop) ---
+# -----------------------------------------------------------------
+def on_connect(client, userdata, flags, rc):
+    if rc == 0:
+        print("✅ MQTT Connected.")
+        if TRANSPORT != TRANSPORT_UNIX:
+            client.subscribe(MQTT_MOVE_TOPIC)
+            client.subscribe(MQTT_STATUS_TOPIC)
+    else:
+        print(f"❌ MQTT connection failed with code {rc}")
+
+def on_message(client, userdata, msg):
+    # userdata is the event loop; all handling happens there
+    userdata.call_soon_threadsafe(handle_message, client, msg.topic, msg.payload, time.time())
+
+def receive_local(subscriber, client):
+    # Datagrams are read on the event loop itself; no hand-off needed
+    received_at = time.time()
+    for topic, payload in subscriber.receive():
+        handle_message(client, topic, payload, received_at)
+
 # -----------------------------------------------------------------
 # --- Main ---
 # -----------------------------------------------------------------
-def main():
-    global arduino
+async def main_async():
+    global serial_writer
     print("Starting Gimbal MQTT Receiver...")
+    loop = asyncio.get_running_loop()
+
+    ## 1. Initialize Serial Connection (Optional for initial run)
+    # Before any message source is attached: handlers use serial_writer
+    arduino = None
+    try:
+        print(f"Attempting to connect to serial port {SERIAL_PORT}...")
+        # If this fails, 'arduino' remains None, but the program continues.
+        arduino = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=SERIAL_TIMEOUT, write_timeout=SERIAL_WRITE_TIMEOUT)
+        await asyncio.sleep(2) # Wait for Arduino reset
+        print("✅ Serial connected.")
+    except Exception as e:
+        print(f"⚠️ Serial failed: {e}. Program will proceed, but commands will not be sent to device.")
+        # DO NOT exit here. This is the main change.
+
+    serial_writer = SerialWriter(arduino)
+    serial_writer.start_reader(handle_serial_line)
+    writer_task = asyncio.create_task(serial_writer.run())
+    if CONTROL_MODE == "PID":
+        serial_writer.send_move(format_position(gimbal.pan.angle, gimbal.tilt.angle))
 
-    ## 1. Initialize MQTT First
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=MQTT_CLIENT_ID)
+    ## 2. Initialize MQTT
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=MQTT_CLIENT_ID, userdata=loop)
     client.on_connect = on_connect
     client.on_message = on_message
 
@@ -155,33 +391,41 @@ def main():
         client.connect(MQTT_BROKER, MQTT_PORT, 60)
     except Exception as e:
         print(f"❌ MQTT connection failed: {e}")
-        # If MQTT fails, there's no point in running, so exit.
-        sys.exit(1)
+        if TRANSPORT != TRANSPORT_UNIX:
+            # If MQTT fails, there's no point in running, so exit.
+            sys.exit(1)
+        print("⚠️ Continuing on the local transport without diagnostics.")
 
-    ## 2. Initialize Serial Connection (Optional for initial run)
-    try:
-        print(f"Attempting to connect to serial port {SERIAL_PORT}...")
-        # If this fails, 'arduino' remains None, but the program continues.
-        arduino = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=SERIAL_TIMEOUT)
-        time.sleep(2) # Wait for Arduino reset
-        print("✅ Serial connected.")
-    except Exception as e:
-        print(f"⚠️ Serial failed: {e}. Program will proceed, but commands will not be sent to device.")
-        # DO NOT exit here. This is the main change.
+    local_subscriber = None
+    if TRANSPORT == TRANSPORT_UNIX:
+        local_subscriber = UnixDatagramSubscriber(LOCAL_SOCKET_PATH)
+        loop.add_reader(local_subscriber.fileno(), receive_local, local_subscriber, client)
+        print(f"✅ Listening for tracker messages on {LOCAL_SOCKET_PATH}")
+
+    stop_event = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop_event.set)
 
-    ## 3. Start MQTT Loop
+    ## 3. Start MQTT (one network thread) and wait for Ctrl+C
+    print("Starting MQTT loop...")
+    client.loop_start()
     try:
-        print("Starting MQTT loop forever...")
-        client.loop_forever()
-    except KeyboardInterrupt:
+        await stop_event.wait()
         print("\n🛑 Exiting.")
     finally:
         client.loop_stop()
         client.disconnect()
+        writer_task.cancel()
+        if local_subscriber is not None:
+            loop.remove_reader(local_subscriber.fileno())
+            local_subscriber.close()
         # Clean up serial connection only if it was successfully opened
         if arduino and arduino.is_open:
             arduino.close()
             print("Serial closed.")
 
+def main():
+    asyncio.run(main_async())
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,212 @@
+from ultralytics import YOLO
+import cv2
+import paho.mqtt.client as mqtt
+import signal
+from camera_tracker import CameraTracker, MQTT_DIAGNOSTICS_TOPIC
+from frame_sources import open_source
+from thermal_governor import QualityGovernor, SysfsReader
+from preview_server import PreviewServer
+from transport import TransportRouter, DEFAULT_SOCKET_PATH
+
+# ----------------------------------------------------
+# --- Multi-Camera Object Locking (one process, one model) ---
+# ----------------------------------------------------
+# Every camera gets its own CameraTracker (focus, ROI, track IDs, re-ID) and
+# its own MQTT namespace, e.g. cam0/tracker/move, cam1/tracker/control.
+# The frames of all cameras that need detection are sent to YOLO in a single
+# batched call, so the model is loaded and run once for all of them.
+
+# --- Cameras ---
+# source: "picamera:<num>", "bus:<name>" (frame-bus-pi.py) or a video file
+CAMERAS = [
+    {"name": "cam0", "source": "picamera:0", "topic_prefix": "cam0/"},
+    {"name": "cam1", "source": "picamera:1", "topic_prefix": "cam1/"},
+]
+
+# --- Global: Define Tracking State and Target ---
+TARGET_CLASSES = ["person", "bottle", "tv"]
+MIN_CONFIDENCE = 0.4
+
+# --- Configuration Parameter ---
+AUTO_FOCUS_ON_BIGGEST = False
+HEADLESS_MODE = False               # Windows/overlays only while a viewer is attached
+QUALITY_GOVERNOR = True             # Lower imgsz, stride and overlays to hold the loop rate
+TARGET_LOOP_FPS = 10.0              # Whole loop over all cameras
+INFERENCE_IMGSZ = 640               # imgsz while the governor is off
+PREVIEW_SERVER = False              # http://<pi>:PREVIEW_PORT/<camera name>, no login: anyone on the network can watch
+PREVIEW_PORT = 8080
+
+# --- MQTT Setup ---
+MQTT_BROKER = "localhost"
+MQTT_PORT = 1883
+MQTT_CLIENT_ID = "YOLO_Tracker_Multicam"
+mqtt_client = None
+STOP_REQUESTED = False
+
+# --- Control-Path Transport ---
+# "unix": tracker/move and tracker/status go straight to a gimbal receiver on
+# this Pi over a Unix datagram socket (transport.py), skipping the broker.
+# Set the same TRANSPORT in object-locking-mqtt-receiver-pi.py.
+TRANSPORT = "mqtt"
+LOCAL_SOCKET_PATH = DEFAULT_SOCKET_PATH
+
+# --- Tracker Settings (shared by all cameras; see object-locking-pi.py) ---
+TRACK_LOW_CONFIDENCE = 0.1          # Detector confidence floor
+TRACKER_SETTINGS = {
+    "TARGET_CLASSES": TARGET_CLASSES,
+    "MIN_CONFIDENCE": MIN_CONFIDENCE,
+    "AUTO_FOCUS_ON_BIGGEST": AUTO_FOCUS_ON_BIGGEST,
+    "HEADLESS_MODE": HEADLESS_MODE,
+    "ROI_CONTROLS": True,
+    "TRACK_LOW_CONFIDENCE": TRACK_LOW_CONFIDENCE,
+    "HYBRID_MODE": True,
+    "DETECT_EVERY_N_FRAMES": 4,
+    "TRACKER_TYPE": "KCF",
+    "DETECTION_STREAM": False       # camN/tracker/detections with all tracks of each detector pass
+}
+
+# --- Load YOLOv8 Model (once for all cameras) ---
+try:
+    model = YOLO("yolov8n.pt")
+except Exception as e:
+    print(f"Error loading YOLO model: {e}")
+    exit()
+
+# --- Frame Size ---
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+
+# ----------------------------------------------------
+# --- MQTT Functions ---
+# ----------------------------------------------------
+
+def publish_mqtt(topic, payload_json):
+    if mqtt_client is None: return
+    mqtt_client.publish(topic, payload_json, qos=0)
+
+router = TransportRouter(publish_mqtt, TRANSPORT, LOCAL_SOCKET_PATH)
+
+def on_connect(client, userdata, flags, rc):
+    if rc == 0:
+        print("✅ MQTT Connected successfully.")
+        for camera in cameras:
+            client.subscribe(camera.control_topic)
+    else:
+        print(f"❌ MQTT Connection failed with code {rc}.")
+
+def on_control_message(client, userdata, msg):
+    # Route each control message to the camera that owns the topic
+    for camera in cameras:
+        if msg.topic == camera.control_topic:
+            camera.on_control_message(client, userdata, msg)
+
+def connect_mqtt():
+    global mqtt_client
+    try:
+        mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, MQTT_CLIENT_ID)
+        mqtt_client.on_connect = on_connect
+        mqtt_client.on_message = on_control_message
+        mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        mqtt_client.loop_start()
+    except Exception as e:
+        print(f"Could not connect to MQTT broker: {e}")
+        mqtt_client = None
+
+def request_stop(signum, frame):
+    global STOP_REQUESTED
+    STOP_REQUESTED = True
+
+# ----------------------------------------------------
+# --- Initialize Cameras and Trackers ---
+# ----------------------------------------------------
+
+sources = []
+cameras = []
+for camera_config in CAMERAS:
+    sources.append(open_source(camera_config["source"], (FRAME_WIDTH, FRAME_HEIGHT)))
+    cameras.append(CameraTracker(
+        camera_config["name"], model.names, router.publish,
+        topic_prefix=camera_config["topic_prefix"],
+        frame_size=(FRAME_WIDTH, FRAME_HEIGHT),
+        settings=TRACKER_SETTINGS
+    ))
+    print(f"{camera_config['source']} -> '{camera_config['topic_prefix']}tracker/...'")
+
+preview = None
+if PREVIEW_SERVER:
+    try:
+        preview = PreviewServer(port=PREVIEW_PORT).start()
+        for camera in cameras:
+            camera.attach_preview(preview.stream(camera.name))
+    except OSError as e:
+        print(f"Could not start preview server on port {PREVIEW_PORT}: {e}")
+        preview = None
+
+governor = QualityGovernor(SysfsReader(), target_fps=TARGET_LOOP_FPS) if QUALITY_GOVERNOR else None
+
+print(f"Starting multi-camera detection with {len(cameras)} cameras. Press 'q' or Ctrl+C to quit.")
+signal.signal(signal.SIGINT, request_stop)
+
+# --- Connect MQTT ---
+connect_mqtt()
+
+# --- Main Detection Loop ---
+while not STOP_REQUESTED:
+    active_cameras = []
+    detector_groups = {} # imgsz -> [(camera, images)]
+    imgsz = governor.level["imgsz"] if governor is not None else INFERENCE_IMGSZ
+
+    # 1. Capture every camera and let its hybrid tracker decide if it needs detection
+    for source, camera in zip(sources, cameras):
+        camera.apply_pending_commands()
+        frame, capture_ts = source.read()
+        if frame is None:
+            continue
+        active_cameras.append(camera)
+        detector_input = camera.begin_frame(frame, capture_ts)
+        if detector_input is not None:
+            images, roi_imgsz = detector_input
+            images = images if isinstance(images, list) else [images]
+            detector_groups.setdefault(min(imgsz, roi_imgsz or imgsz), []).append((camera, images))
+
+    # 2. One batched inference call per input size (full frames and ROI crops of all cameras)
+    results_by_camera = {}
+    for group_imgsz, entries in detector_groups.items():
+        batch_results = model([image for _, images in entries for image in images],
+                              conf=TRACK_LOW_CONFIDENCE, imgsz=group_imgsz)
+        start = 0
+        for camera, images in entries:
+            results_by_camera[id(camera)] = batch_results[start:start + len(images)]
+            start += len(images)
+
+    # 3. Tracking, MQTT output and drawing per camera
+    window_shown = False
+    for camera in active_cameras:
+        camera.finish_frame(results_by_camera.get(id(camera)))
+        window_shown = camera.update_window() or window_shown
+
+    if window_shown and cv2.waitKey(1) & 0xFF == ord("q"):
+        break
+
+    for camera in active_cameras:
+        camera.end_frame()
+
+    # --- One governor for the whole process (all cameras share the CPU) ---
+    if governor is not None:
+        if governor.frame_done():
+            for camera in cameras:
+                camera.apply_quality(governor.level)
+        governor.telemetry.maybe_report(lambda payload_json: publish_mqtt(MQTT_DIAGNOSTICS_TOPIC, payload_json))
+
+# --- Cleanup ---
+if preview is not None:
+    preview.stop()
+if mqtt_client:
+    mqtt_client.loop_stop()
+    mqtt_client.disconnect()
+    print("MQTT Disconnected.")
+router.close()
+
+for source in sources:
+    source.close()
+cv2.destroyAllWindows()
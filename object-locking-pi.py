@@ -1,42 +1,90 @@
 from ultralytics import YOLO
 import cv2
-from picamera2 import Picamera2
-import numpy as np
-import math
 import paho.mqtt.client as mqtt
-import json
-import time
+import signal
+from camera_tracker import CameraTracker
+from frame_sources import open_source
+from thermal_governor import QualityGovernor, SysfsReader
+from preview_server import PreviewServer
+from transport import TransportRouter, DEFAULT_SOCKET_PATH
 
 # --- Global: Define Tracking State and Target ---
 TARGET_CLASSES = ["person", "bottle", "tv"]
 MIN_CONFIDENCE = 0.4
 
 # --- Configuration Parameter ---
-AUTO_FOCUS_ON_BIGGEST = False 
+AUTO_FOCUS_ON_BIGGEST = False
+
+# --- Headless Mode ---
+# No window and no overlay drawing; lock/unlock/auto-focus come in over
+# tracker/control. Overlays are drawn only while a viewer is attached
+# ({"command": "VIEW", "enabled": true}).
+HEADLESS_MODE = False
 
 # --- MQTT Setup ---
+# Topics: tracker/move, tracker/status, tracker/diagnostics and tracker/control (in)
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
-MQTT_STATUS_TOPIC = "tracker/move"    
-MQTT_TRACKING_TOPIC = "tracker/status" 
 MQTT_CLIENT_ID = "YOLO_Tracker"
-mqtt_client = None 
+mqtt_client = None
+STOP_REQUESTED = False
 
-# State variables for mouse control and tracking
-FOCUS_MODE = False
-OBJECT_RECENTLY_LOST = False  
-FOCUSED_OBJECT_CLS = -1
-FOCUSED_OBJECT_BOX_COORDS = None  
-FOCUSED_OBJECT_CONF = 0.0
-FOCUSED_OBJECT_TEMPLATE = None    
+# --- Control-Path Transport ---
+# "unix": tracker/move and tracker/status go straight to a gimbal receiver on
+# this Pi over a Unix datagram socket (transport.py), skipping the broker.
+# Set the same TRANSPORT in object-locking-mqtt-receiver-pi.py.
+TRANSPORT = "mqtt"
+LOCAL_SOCKET_PATH = DEFAULT_SOCKET_PATH
 
 # --- Tracking Parameters ---
-MIN_SIMILARITY_MATCH = 0.40         
-TEMPLATE_UPDATE_THRESHOLD = 0.90    
-MAX_PIXEL_SHIFT = 150               
-MAX_LOST_FRAMES = 150               
-lost_frames_counter = 0             
-AUTO_FOCUS_ACTIVE = False           
+MAX_PIXEL_SHIFT = 150
+MAX_LOST_FRAMES = 150
+
+# --- Hybrid Detect+Track Parameters ---
+# YOLO runs every DETECT_EVERY_N_FRAMES frames while an object is focused; the
+# frames in between are handled by a fast single-object tracker.
+HYBRID_MODE = True
+DETECT_EVERY_N_FRAMES = 4           # 1 = run the detector on every frame
+TRACKER_TYPE = "KCF"                # "KCF", "CSRT", "MOSSE" or "FLOW" (optical flow)
+MIN_TRACKER_CONFIDENCE = 0.5        # Below this the detector is run immediately
+
+# --- Multi-Object Tracker Parameters ---
+# Every target-class detection keeps a persistent track ID; focus locks onto an ID.
+TRACK_LOW_CONFIDENCE = 0.1          # Low-confidence detections only extend existing tracks
+TRACK_IOU_THRESHOLD = 0.3           # Min IoU between a track and a detection to match
+TRACK_MAX_AGE = 30                  # Detector passes a track survives without a match
+TRACK_MIN_HITS = 2                  # Matches before a new track is shown/selectable
+
+# --- Re-identification Parameters (used while LOST) ---
+MIN_SIMILARITY_MATCH = 0.80         # Min color-histogram similarity (0..1) to re-acquire a track
+                                    # (was a template-match score with 0.40; retune, don't carry over)
+REID_GALLERY_SIZE = 16              # Appearance descriptors kept for the locked object
+REID_UPDATE_INTERVAL = 5            # Detector passes between gallery updates
+REID_NOVELTY_THRESHOLD = 0.95       # Only descriptors less similar than this are added
+
+# --- Latency Telemetry ---
+LATENCY_REPORT_INTERVAL = 10.0      # Seconds between latency reports
+
+# --- Adaptive Duty Cycle (detector slows down while nothing is happening) ---
+DUTY_CYCLE = True
+IDLE_AFTER_S = 15.0                 # Seconds without targets/motion before going IDLE
+IDLE_DETECT_INTERVAL_S = 2.0        # Seconds between detector passes while IDLE
+MOTION_PRECHECK = True              # Cheap motion check wakes the detector between passes
+
+# --- Thermal / Load Governor (lower imgsz, stride and overlays to hold the loop rate) ---
+QUALITY_GOVERNOR = True
+TARGET_LOOP_FPS = 15.0              # Must be below the camera frame rate
+INFERENCE_IMGSZ = 640               # imgsz while the governor is off
+
+# --- HTTP Preview (MJPEG, encoded only while a browser is watching) ---
+PREVIEW_SERVER = False              # http://<pi>:PREVIEW_PORT/cam0, no login: anyone on the network can watch
+PREVIEW_PORT = 8080
+
+# --- Detection Stream (all tracks of each detector pass on tracker/detections) ---
+DETECTION_STREAM = False
+DETECTION_STREAM_EVERY_N = 1        # Detector passes per message
+DETECTION_STREAM_PER_CLASS = False  # Also tracker/detections/<class>
+DETECTION_STREAM_COMPACT = False    # Rows instead of objects
 
 # --- Load YOLOv8 Model ---
 try:
@@ -45,19 +93,78 @@ except Exception as e:
     print(f"Error loading YOLO model: {e}")
     exit()
 
-# --- Initialize PiCamera2 ---
-picam2 = Picamera2()
-preview_config = picam2.create_preview_configuration(
-    main={"format": "RGB888", "size": (640, 480)}
-)
-picam2.configure(preview_config)
-picam2.start()
-
-# --- Calculate Frame Center ---
+# --- Frame Source ---
+# "picamera" opens the camera directly; "bus:ai_camera" reads from a running
+# frame-bus-pi.py so the recorder and viewers can use the camera at the same time.
+FRAME_SOURCE = "picamera"
 FRAME_WIDTH = 640
 FRAME_HEIGHT = 480
-CENTER_X = FRAME_WIDTH // 2
-CENTER_Y = FRAME_HEIGHT // 2
+
+try:
+    source = open_source(FRAME_SOURCE, (FRAME_WIDTH, FRAME_HEIGHT))
+except Exception as e:
+    print(f"Error opening frame source '{FRAME_SOURCE}': {e}")
+    if "Pipeline handler in use by another process" in str(e):
+        print("TIP: The camera is in use. Run frame-bus-pi.py and set FRAME_SOURCE = \"bus:ai_camera\".")
+    exit()
+
+# ----------------------------------------------------
+# --- Camera Tracker (all focus/tracking state for this camera) ---
+# ----------------------------------------------------
+
+def publish_mqtt(topic, payload_json):
+    if mqtt_client is None: return
+    mqtt_client.publish(topic, payload_json, qos=0)
+
+router = TransportRouter(publish_mqtt, TRANSPORT, LOCAL_SOCKET_PATH)
+
+camera = CameraTracker(
+    "cam0", model.names, router.publish,
+    frame_size=(FRAME_WIDTH, FRAME_HEIGHT),
+    window_name="YOLOv8 Object Detection",
+    settings={
+        "TARGET_CLASSES": TARGET_CLASSES,
+        "MIN_CONFIDENCE": MIN_CONFIDENCE,
+        "AUTO_FOCUS_ON_BIGGEST": AUTO_FOCUS_ON_BIGGEST,
+        "HEADLESS_MODE": HEADLESS_MODE,
+        "MAX_PIXEL_SHIFT": MAX_PIXEL_SHIFT,
+        "MAX_LOST_FRAMES": MAX_LOST_FRAMES,
+        "HYBRID_MODE": HYBRID_MODE,
+        "DETECT_EVERY_N_FRAMES": DETECT_EVERY_N_FRAMES,
+        "TRACKER_TYPE": TRACKER_TYPE,
+        "MIN_TRACKER_CONFIDENCE": MIN_TRACKER_CONFIDENCE,
+        "TRACK_LOW_CONFIDENCE": TRACK_LOW_CONFIDENCE,
+        "TRACK_IOU_THRESHOLD": TRACK_IOU_THRESHOLD,
+        "TRACK_MAX_AGE": TRACK_MAX_AGE,
+        "TRACK_MIN_HITS": TRACK_MIN_HITS,
+        "MIN_SIMILARITY_MATCH": MIN_SIMILARITY_MATCH,
+        "REID_GALLERY_SIZE": REID_GALLERY_SIZE,
+        "REID_UPDATE_INTERVAL": REID_UPDATE_INTERVAL,
+        "REID_NOVELTY_THRESHOLD": REID_NOVELTY_THRESHOLD,
+        "LATENCY_REPORT_INTERVAL": LATENCY_REPORT_INTERVAL,
+        "DETECTION_STREAM": DETECTION_STREAM,
+        "DETECTION_STREAM_EVERY_N": DETECTION_STREAM_EVERY_N,
+        "DETECTION_STREAM_PER_CLASS": DETECTION_STREAM_PER_CLASS,
+        "DETECTION_STREAM_COMPACT": DETECTION_STREAM_COMPACT,
+        "DUTY_CYCLE": DUTY_CYCLE,
+        "IDLE_AFTER_S": IDLE_AFTER_S,
+        "IDLE_DETECT_INTERVAL_S": IDLE_DETECT_INTERVAL_S,
+        "MOTION_PRECHECK": MOTION_PRECHECK,
+        "FRAME_LOG": True
+    }
+)
+
+preview = None
+if PREVIEW_SERVER:
+    try:
+        preview = PreviewServer(port=PREVIEW_PORT).start()
+        camera.attach_preview(preview.stream(camera.name))
+    except OSError as e:
+        print(f"Could not start preview server on port {PREVIEW_PORT}: {e}")
+        preview = None
+
+governor = QualityGovernor(SysfsReader(), target_fps=TARGET_LOOP_FPS,
+                           report_interval=LATENCY_REPORT_INTERVAL) if QUALITY_GOVERNOR else None
 
 # ----------------------------------------------------
 # --- MQTT Functions ---
@@ -66,6 +173,7 @@ CENTER_Y = FRAME_HEIGHT // 2
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
         print("✅ MQTT Connected successfully.")
+        client.subscribe(camera.control_topic)
     else:
         print(f"❌ MQTT Connection failed with code {rc}.")
 
@@ -74,345 +182,67 @@ def connect_mqtt():
     try:
         mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, MQTT_CLIENT_ID)
         mqtt_client.on_connect = on_connect
+        mqtt_client.on_message = camera.on_control_message
         mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
-        mqtt_client.loop_start() 
+        mqtt_client.loop_start()
     except Exception as e:
         print(f"Could not connect to MQTT broker: {e}")
         mqtt_client = None
 
-def publish_move_status(offset_x, offset_y, pan_cmd, tilt_cmd):
-    """
-    Publishes the object position and gimbal instructions via MQTT.
-    Note: offset_x and offset_y must be standard Python 'int' or 'float'.
-    """
-    global mqtt_client
-    if mqtt_client is None: return
+def request_stop(signum, frame):
+    global STOP_REQUESTED
+    STOP_REQUESTED = True
 
-    payload = {
-        "timestamp": time.time(),
-        "offset_x": offset_x,
-        "offset_y": offset_y,
-        "pan_command": pan_cmd,
-        "tilt_command": tilt_cmd
-    }
-    
-    try:
-        # This will now succeed because offsets are cast to standard int/float.
-        print(f"-> MQTT MOVE: X:{offset_x}, Y:{offset_y}, Pan:{pan_cmd}, Tilt:{tilt_cmd}")
-        mqtt_client.publish(MQTT_STATUS_TOPIC, json.dumps(payload), qos=0)
-    except Exception as e:
-        # Kept the error message just in case another serialization error occurs
-        print(f"Error publishing MOVE message: {e}")
 
-def publish_tracking_status(status):
-    global mqtt_client
-    if mqtt_client is None: return
-    
-    payload = {
-        "timestamp": time.time(),
-        "status": status
-    }
-    
-    try:
-        print(f"-> MQTT TRACKING STATUS: {status}")
-        mqtt_client.publish(MQTT_TRACKING_TOPIC, json.dumps(payload), qos=0)
-    except Exception as e:
-        print(f"Error publishing TRACKING status: {e}")
-
-
-# ----------------------------------------------------
-# --- Helper Function to Start Focus (Unchanged) ---
-# ----------------------------------------------------
-
-def start_focus(frame, x1, y1, x2, y2, class_id, conf):
-    global FOCUS_MODE, FOCUSED_OBJECT_CLS, FOCUSED_OBJECT_BOX_COORDS, FOCUSED_OBJECT_CONF, FOCUSED_OBJECT_TEMPLATE, OBJECT_RECENTLY_LOST, lost_frames_counter
-
-    OBJECT_RECENTLY_LOST = False
-    lost_frames_counter = 0
-
-    x1, y1 = max(0, x1), max(0, y1)
-    x2, y2 = min(FRAME_WIDTH, x2), min(FRAME_HEIGHT, y2)
-    
-    template_rgb = frame[y1:y2, x1:x2].copy()
-    
-    if template_rgb.size == 0:
-        print("Error: Cropped area for focus is empty.")
-        return False
-        
-    FOCUSED_OBJECT_TEMPLATE = cv2.cvtColor(template_rgb, cv2.COLOR_BGR2GRAY)
-    
-    FOCUSED_OBJECT_BOX_COORDS = (x1, y1, x2, y2)
-    FOCUSED_OBJECT_CLS = class_id
-    FOCUSED_OBJECT_CONF = conf
-    FOCUS_MODE = True
-    print(f"\n[FOCUS ACQUIRED] Tracking {model.names[class_id]}. Initial Template Created.")
-    return True
-
-
-# ----------------------------------------------------
-# --- Mouse Callback Function (Unchanged) ---
-# ----------------------------------------------------
-
-def mouse_callback(event, x, y, flags, param):
-    global FOCUS_MODE, AUTO_FOCUS_ACTIVE
-    
-    current_boxes = param[0]
-    frame = param[1] 
-
-    if event == cv2.EVENT_LBUTTONDOWN:
-        if AUTO_FOCUS_ACTIVE:
-            AUTO_FOCUS_ACTIVE = False 
-
-        # 1. Clear Focus/Seeking state
-        global OBJECT_RECENTLY_LOST, FOCUSED_OBJECT_CLS, FOCUSED_OBJECT_BOX_COORDS, FOCUSED_OBJECT_TEMPLATE, lost_frames_counter
-        FOCUS_MODE = False
-        OBJECT_RECENTLY_LOST = False
-        FOCUSED_OBJECT_CLS = -1
-        FOCUSED_OBJECT_BOX_COORDS = None
-        FOCUSED_OBJECT_TEMPLATE = None
-        lost_frames_counter = 0
-        print("\n[FOCUS CLEARED] Returning to General Tracking.")
-        
-        publish_tracking_status("MANUAL_STOP")
-        
-        # 2. If the click lands on an object, start focus on that object
-        min_dist_to_click = float('inf')
-        best_match_at_click = None
-
-        for box_data in current_boxes:
-            x1, y1, x2, y2, class_id, conf, class_name = box_data
-            
-            if x1 <= x <= x2 and y1 <= y <= y2 and class_name in TARGET_CLASSES and conf > MIN_CONFIDENCE:
-                obj_center_x = (x1 + x2) // 2
-                obj_center_y = (y1 + y2) // 2
-                distance = math.sqrt((obj_center_x - x)**2 + (obj_center_y - y)**2)
-                
-                if distance < min_dist_to_click:
-                    min_dist_to_click = distance
-                    best_match_at_click = box_data
-
-        if best_match_at_click:
-            x1, y1, x2, y2, class_id, conf, _ = best_match_at_click
-            start_focus(frame, x1, y1, x2, y2, class_id, conf)
-
-
-# --- Setup Mouse Handler (Unchanged) ---
-WINDOW_NAME = "YOLOv8 Object Detection"
-cv2.namedWindow(WINDOW_NAME)
 if AUTO_FOCUS_ON_BIGGEST:
     print("Starting object detection. Auto-focus is ON. Click once to untrack.")
 else:
     print("Starting object detection. Auto-focus is OFF. Click on an object to focus, click again to untrack.")
+if HEADLESS_MODE:
+    print(f"Headless mode: send commands to '{camera.control_topic}'. Press Ctrl+C to quit.")
+signal.signal(signal.SIGINT, request_stop)
 
 # --- Connect MQTT ---
 connect_mqtt()
 
 # --- Main Detection Loop ---
-while True:
-    frame = picam2.capture_array()
-    results = model(frame)
-    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) 
-    current_boxes_data = [] 
-    
-    # --- AUTO-SELECTION LOGIC (Unchanged) ---
-    if AUTO_FOCUS_ON_BIGGEST and not AUTO_FOCUS_ACTIVE and not FOCUS_MODE:
-        best_area = 0
-        best_object_data = None
-        
-        for result in results:
-            for box in result.boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                class_id = int(box.cls[0])
-                conf = float(box.conf[0])
-                class_name = model.names[class_id]
-
-                if class_name in TARGET_CLASSES and conf > MIN_CONFIDENCE:
-                    area = (x2 - x1) * (y2 - y1)
-                    if area > best_area:
-                        best_area = area
-                        best_object_data = (x1, y1, x2, y2, class_id, conf)
-
-        if best_object_data is not None:
-            x1, y1, x2, y2, class_id, conf = best_object_data
-            if start_focus(frame, x1, y1, x2, y2, class_id, conf):
-                AUTO_FOCUS_ACTIVE = True 
-        
-    # --- Check for Seeking Mode Timeout (Unchanged) ---
-    if OBJECT_RECENTLY_LOST:
-        lost_frames_counter += 1
-        if lost_frames_counter > MAX_LOST_FRAMES:
-            FOCUS_MODE = False
-            OBJECT_RECENTLY_LOST = False
-            FOCUSED_OBJECT_CLS = -1
-            FOCUSED_OBJECT_TEMPLATE = None
-            lost_frames_counter = 0
-            print("[TIMEOUT] Seeking timeout. Returning to general track.")
-            publish_tracking_status("TIMEOUT")
-    
-    # --- Tracking and Drawing Logic ---
-    if FOCUS_MODE and FOCUSED_OBJECT_TEMPLATE is not None:
-        
-        highest_similarity_score = -1.0
-        best_match_box = None
-        found_focused_object = False
-        
-        search_candidates = []
-        for result in results:
-            for box in result.boxes:
-                class_id = int(box.cls[0])
-                conf = float(box.conf[0])
-                if class_id == FOCUSED_OBJECT_CLS and conf > MIN_CONFIDENCE:
-                    search_candidates.append(box.xyxy[0].cpu().numpy().astype(int))
-
-        # --- Perform Template Matching (Unchanged) ---
-        for new_x1, new_y1, new_x2, new_y2 in search_candidates:
-            
-            # Proximity Check (Skip in seeking mode)
-            if not OBJECT_RECENTLY_LOST and FOCUSED_OBJECT_BOX_COORDS is not None:
-                last_x1, last_y1, last_x2, last_y2 = FOCUSED_OBJECT_BOX_COORDS
-                last_center_x = (last_x1 + last_x2) // 2
-                last_center_y = (last_y1 + last_y2) // 2
-                new_center_x = (new_x1 + new_x2) // 2
-                new_center_y = (new_y1 + new_y2) // 2
-                distance = math.sqrt((new_center_x - last_center_x)**2 + (new_center_y - last_center_y)**2)
-                if distance > MAX_PIXEL_SHIFT:
-                    continue 
-
-            candidate_image_gray = frame_gray[new_y1:new_y2, new_x1:new_x2]
-            if candidate_image_gray.shape[0] < 5 or candidate_image_gray.shape[1] < 5:
-                continue 
-            
-            try:
-                resized_candidate_gray = cv2.resize(
-                    candidate_image_gray, 
-                    (FOCUSED_OBJECT_TEMPLATE.shape[1], FOCUSED_OBJECT_TEMPLATE.shape[0])
-                )
-                result_matrix = cv2.matchTemplate(resized_candidate_gray, FOCUSED_OBJECT_TEMPLATE, cv2.TM_CCOEFF_NORMED)
-                similarity_score = result_matrix[0, 0]
-
-                if similarity_score > highest_similarity_score:
-                    highest_similarity_score = similarity_score
-                    best_match_box = (new_x1, new_y1, new_x2, new_y2)
-                    
-            except cv2.error:
-                continue
-
-        # --- DEBUG LOGGING (Unchanged) ---
-        if highest_similarity_score > MIN_SIMILARITY_MATCH:
-            found_focused_object = True
-        
-        print(f"Frame {int(time.time() * 10) % 100}: Score={highest_similarity_score:.3f}, Found={found_focused_object}, Lost_Mode={OBJECT_RECENTLY_LOST}")
-        
-        # --- Update State Based on Match Score ---
-        if found_focused_object:
-            # SUCCESS: Object found/re-acquired
-            FOCUSED_OBJECT_BOX_COORDS = best_match_box
-            
-            # CHECK: Transition from LOST to FOUND
-            if OBJECT_RECENTLY_LOST:
-                OBJECT_RECENTLY_LOST = False
-                lost_frames_counter = 0
-                publish_tracking_status("FOUND") 
-
-            # Adaptive Template Update... (Unchanged)
-            x1, y1, x2, y2 = FOCUSED_OBJECT_BOX_COORDS
-            if highest_similarity_score > TEMPLATE_UPDATE_THRESHOLD:
-                template_rgb = frame[y1:y2, x1:x2].copy()
-                FOCUSED_OBJECT_TEMPLATE = cv2.cvtColor(template_rgb, cv2.COLOR_BGR2GRAY)
-            
-            # --- CALCULATE AND PUBLISH INSTRUCTIONS ---
-            object_center_x = (x1 + x2) // 2
-            object_center_y = (y1 + y2) // 2
-            
-            # --- FIX: Cast offsets to standard Python int here ---
-            offset_x = int(object_center_x - CENTER_X)
-            offset_y = int(object_center_y - CENTER_Y)
-            # ----------------------------------------------------
-            
-            gimbal_pan_cmd = "PAN LEFT" if offset_x > 10 else ("PAN RIGHT" if offset_x < -10 else "PAN STOP")
-            gimbal_tilt_cmd = "TILT UP" if offset_y > 10 else ("TILT DOWN" if offset_y < -10 else "TILT STOP")
-            
-            # PUBLISH MQTT MOVE MESSAGE
-            publish_move_status(offset_x, offset_y, gimbal_pan_cmd, gimbal_tilt_cmd)
-            
-            # --- Drawing (Unchanged) ---
-            color = (0, 255, 0) 
-            status_text = f"FOCUS Score:{highest_similarity_score:.2f} X:{offset_x}, Y:{offset_y}"
-            gimbal_instructions = f"GIMBAL: {gimbal_pan_cmd}, {gimbal_tilt_cmd} (MQTT)"
-
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 4) 
-            cv2.putText(frame, f"FOCUS {model.names[FOCUSED_OBJECT_CLS]}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-            cv2.putText(frame, status_text, (x1, y2 + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-            cv2.putText(frame, gimbal_instructions, (x1, y2 + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-            cv2.circle(frame, (object_center_x, object_center_y), 5, (0, 255, 255), -1) 
-        
-        # Handle temporary loss (start seeking)
-        if not found_focused_object:
-             # CHECK: Transition from NORMAL to LOST
-             if not OBJECT_RECENTLY_LOST:
-                 OBJECT_RECENTLY_LOST = True
-                 publish_tracking_status("LOST") 
-                 # Publish STOP MOVE command only once when entering LOST state
-                 publish_move_status(0, 0, "PAN STOP", "TILT STOP") 
-             
-             status_text = f"SEEKING... ({lost_frames_counter} frames)"
-             color = (0, 165, 255) 
-             
-             if FOCUSED_OBJECT_BOX_COORDS is not None:
-                 x1, y1, x2, y2 = FOCUSED_OBJECT_BOX_COORDS
-                 cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-             
-             cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-
-    # --- General Tracking Mode (Unchanged) ---
-    if not FOCUS_MODE:
-        for result in results:
-            for box in result.boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                class_id = int(box.cls[0])
-                conf = float(box.conf[0])
-                class_name = model.names[class_id]
-
-                if class_name in TARGET_CLASSES and conf > MIN_CONFIDENCE:
-                    current_boxes_data.append((x1, y1, x2, y2, class_id, conf, class_name))
-                    
-                    object_center_x = (x1 + x2) // 2
-                    object_center_y = (y1 + y2) // 2
-                    offset_x = object_center_x - CENTER_X
-                    offset_y = object_center_y - CENTER_Y
-                    position_text = f"X:{offset_x}, Y:{offset_y}"
-                    
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2) 
-                    cv2.putText(frame, f"{class_name} {conf:.2f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                    cv2.putText(frame, position_text, (x1, y2 + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-
-    # --- Draw Center of Frame (Red Crosshair) (Unchanged) ---
-    crosshair_color = (0, 0, 255) 
-    crosshair_size = 30           
-    thickness = 2                 
-    
-    cv2.line(frame, (CENTER_X - crosshair_size, CENTER_Y), (CENTER_X + crosshair_size, CENTER_Y), crosshair_color, thickness)
-    cv2.line(frame, (CENTER_X, CENTER_Y - crosshair_size), (CENTER_X, CENTER_Y + crosshair_size), crosshair_color, thickness)
-
-    # --- Set Mouse Callback (Unchanged) ---
-    cv2.setMouseCallback(WINDOW_NAME, mouse_callback, (current_boxes_data, frame))
-    
-    # Show frame
-    cv2.imshow(WINDOW_NAME, frame)
-
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
+while not STOP_REQUESTED:
+    # --- Apply queued MQTT control commands between frames ---
+    camera.apply_pending_commands()
+
+    frame, capture_ts = source.read() # Frame age is measured from capture_ts
+    if frame is None:
+        continue
+
+    # None = the hybrid tracker carries the lock on this frame, skip the detector
+    detector_input = camera.begin_frame(frame, capture_ts)
+    results = None
+    if detector_input is not None:
+        images, roi_imgsz = detector_input # ROI crops come with their own (smaller) imgsz bucket
+        imgsz = governor.level["imgsz"] if governor is not None else INFERENCE_IMGSZ
+        results = model(images, conf=TRACK_LOW_CONFIDENCE, imgsz=min(imgsz, roi_imgsz or imgsz))
+    camera.finish_frame(results)
+
+    if camera.update_window():
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            break
+
+    camera.end_frame()
+
+    # --- Step quality down/up on heat, throttling or a slow loop ---
+    if governor is not None:
+        if governor.frame_done():
+            camera.apply_quality(governor.level)
+        governor.telemetry.maybe_report(camera.publish_diagnostics)
 
 # --- Cleanup ---
+if preview is not None:
+    preview.stop()
 if mqtt_client:
     mqtt_client.loop_stop()
     mqtt_client.disconnect()
     print("MQTT Disconnected.")
-    
-picam2.stop()
-cv2.destroyAllWindows()
-
-
-
-
+router.close()
 
+source.close()
+cv2.destroyAllWindows()
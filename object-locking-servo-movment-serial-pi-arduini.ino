@@ -1,9 +1,11 @@
 #include <Servo.h>
 
 Servo panServo; // Pan servo
+Servo tiltServo; // Tilt servo
 
 // Servo configuration
 const int SERVO_PIN = 2;
+const int TILT_SERVO_PIN = 3;
 const int SERVO_LEFT = 0;
 const int SERVO_RIGHT = 180;
 const int SERVO_CENTER = 90;
@@ -14,58 +16,145 @@ const unsigned long STEP_DELAY = 3000;
 
 int currentPos = SERVO_CENTER;
 int targetPos = SERVO_CENTER;
+float tiltPos = SERVO_CENTER;
 unsigned long lastStepTime = 0;
 
+// Absolute positioning ("POS <pan> <tilt>" from the receiver's PID control)
+const int SERVO_MIN_US = 544;     // Servo library pulse widths for 0 and 180 degrees
+const int SERVO_MAX_US = 2400;
+
 // Search mode variables
 bool searching = false;
 int searchDirection = 1; // 1 = right, -1 = left
 
+// Framed binary protocol (serial_protocol.py):
+//   0xA5 | opcode | seq | length | payload | CRC-8 over opcode..payload
+// Text lines still work; the first frame switches replies to frames and
+// silences the text log so the link only carries what the receiver needs.
+const byte FRAME_SYNC = 0xA5;
+const byte ACK_REQUEST = 0x80;
+const byte OP_POS = 0x01;       // int16 pan, tilt in 1/100 degree
+const byte OP_PAN = 0x02;       // 0 STOP, 1 LEFT, 2 RIGHT
+const byte OP_STEP = 0x03;      // int8 pan step (-1 = PAN_LEFT_SMALL)
+const byte OP_STATUS = 0x04;    // 1 FOUND, 2 LOST, 3 TIMEOUT
+const byte OP_ACK = 0x40;
+const byte OP_POS_NOW = 0x41;
+const int MAX_PAYLOAD = 32;
+
+byte frameBuf[MAX_PAYLOAD + 4];   // opcode, seq, length, payload, CRC
+int frameFill = -1;               // Bytes of the current frame so far, -1 = outside a frame
+String textLine = "";
+bool binaryHost = false;
+byte lastSeq = 0;
+
+// Fractional angles via the pulse width (Servo.write() only takes whole degrees)
+int angleToMicros(float angle) {
+  angle = constrain(angle, SERVO_LEFT, SERVO_RIGHT);
+  return SERVO_MIN_US + (int)(angle * (SERVO_MAX_US - SERVO_MIN_US) / 180.0 + 0.5);
+}
+
+byte crc8(const byte *data, int len) {
+  byte crc = 0;
+  for (int i = 0; i < len; i++) {
+    crc ^= data[i];
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (byte)((crc << 1) ^ 0x07) : (byte)(crc << 1);
+    }
+  }
+  return crc;
+}
+
+void sendFrame(byte opcode, byte seq, const byte *payload, byte len) {
+  byte frame[MAX_PAYLOAD + 5];
+  frame[0] = FRAME_SYNC;
+  frame[1] = opcode;
+  frame[2] = seq;
+  frame[3] = len;
+  for (int i = 0; i < len; i++) frame[4 + i] = payload[i];
+  frame[4 + len] = crc8(frame + 1, len + 3);
+  Serial.write(frame, len + 5);
+}
+
+// Text log, only for text-mode hosts (serial monitor, old receivers)
+void logLine(const String &message) {
+  if (!binaryHost) Serial.println(message);
+}
+
+// Tells the receiver where the servos are (e.g. after a search sweep)
+void reportPosition() {
+  if (binaryHost) {
+    int pan = currentPos * 100;
+    int tilt = (int)(tiltPos * 100);
+    byte payload[4] = {(byte)(pan & 0xFF), (byte)(pan >> 8), (byte)(tilt & 0xFF), (byte)(tilt >> 8)};
+    sendFrame(OP_POS_NOW, lastSeq, payload, 4);
+    return;
+  }
+  Serial.print("POS_NOW ");
+  Serial.print(currentPos);
+  Serial.print(" ");
+  Serial.println(tiltPos, 1);
+}
+
+void applyPosition(float pan, float tilt) {
+  searching = false;
+  pan = constrain(pan, SERVO_LEFT, SERVO_RIGHT);
+  tiltPos = constrain(tilt, SERVO_LEFT, SERVO_RIGHT);
+  currentPos = (int)(pan + 0.5);
+  targetPos = currentPos; // Hold here; no stepping towards an old target
+  panServo.writeMicroseconds(angleToMicros(pan));
+  tiltServo.writeMicroseconds(angleToMicros(tiltPos));
+}
+
+void stepPan(int steps) {
+  searching = false;
+  currentPos = constrain(currentPos + steps * SMALL_STEP_SIZE, SERVO_LEFT, SERVO_RIGHT);
+  panServo.write(currentPos);
+}
+
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(115200); // Must match BAUD_RATE in the receiver
   panServo.attach(SERVO_PIN);
   panServo.write(currentPos);
+  tiltServo.attach(TILT_SERVO_PIN);
+  tiltServo.write(SERVO_CENTER);
   Serial.println("Gimbal Controller Initialized.");
 }
 
-void loop() {
-  // Handle incoming serial commands
-  if (Serial.available()) {
-    String command = Serial.readStringUntil('\n');
-    command.trim();
+// Text commands (and frames translated to them)
+void handleCommand(String command) {
+    // ===== ABSOLUTE POSITION (applied directly) =====
+    if (command.startsWith("POS ")) {
+      int split = command.indexOf(' ', 4);
+      float pan = command.substring(4, split).toFloat();
+      float tilt = (split > 0) ? command.substring(split + 1).toFloat() : tiltPos;
+      applyPosition(pan, tilt);
+    }
 
     // ===== PAN FULL COMMANDS =====
-    if (command.indexOf("PAN LEFT") != -1 && command.indexOf("SMALL") == -1) {
+    else if (command.indexOf("PAN LEFT") != -1 && command.indexOf("SMALL") == -1) {
       searching = false;
       targetPos = SERVO_LEFT;
-      Serial.println("Command: PAN LEFT (Full)");
+      logLine("Command: PAN LEFT (Full)");
     }
     else if (command.indexOf("PAN RIGHT") != -1 && command.indexOf("SMALL") == -1) {
       searching = false;
       targetPos = SERVO_RIGHT;
-      Serial.println("Command: PAN RIGHT (Full)");
+      logLine("Command: PAN RIGHT (Full)");
     }
     else if (command.indexOf("PAN STOP") != -1) {
       searching = false;
       targetPos = currentPos; // Hold position
-      Serial.println("Command: PAN STOP (Holding)");
+      logLine("Command: PAN STOP (Holding)");
     }
 
     // ===== PAN SMALL COMMANDS =====
     else if (command.indexOf("PAN_LEFT_SMALL") != -1) {
-      searching = false;
-      currentPos -= SMALL_STEP_SIZE;
-      if (currentPos < SERVO_LEFT) currentPos = SERVO_LEFT;
-      panServo.write(currentPos);
-      Serial.print("Command: PAN_LEFT_SMALL -> ");
-      Serial.println(currentPos);
+      stepPan(-1);
+      logLine("Command: PAN_LEFT_SMALL -> " + String(currentPos));
     }
     else if (command.indexOf("PAN_RIGHT_SMALL") != -1) {
-      searching = false;
-      currentPos += SMALL_STEP_SIZE;
-      if (currentPos > SERVO_RIGHT) currentPos = SERVO_RIGHT;
-      panServo.write(currentPos);
-      Serial.print("Command: PAN_RIGHT_SMALL -> ");
-      Serial.println(currentPos);
+      stepPan(1);
+      logLine("Command: PAN_RIGHT_SMALL -> " + String(currentPos));
     }
 
     // ===== STATUS COMMANDS =====
@@ -73,23 +162,88 @@ void loop() {
       searching = true;
       searchDirection = 1;
       targetPos = SERVO_CENTER;
-      Serial.println("Status: LOST  Starting search sweep.");
+      logLine("Status: LOST  Starting search sweep.");
     }
     else if (command.equals("FOUND")) {
       searching = false;
       targetPos = currentPos; // Stop movement
-      Serial.println("Status: FOUND  Tracking re-acquired.");
+      reportPosition();
+      logLine("Status: FOUND  Tracking re-acquired.");
     }
     else if (command.equals("TIMEOUT")) {
       searching = false;
       targetPos = SERVO_CENTER;
-      Serial.println("Status: TIMEOUT  Servo centered and stopped.");
+      tiltPos = SERVO_CENTER;
+      tiltServo.write(SERVO_CENTER);
+      logLine("Status: TIMEOUT  Servo centered and stopped.");
     }
     else {
-      Serial.print("Unknown or Ignored Command: ");
-      Serial.println(command);
+      logLine("Unknown or Ignored Command: " + command);
+    }
+}
+
+// One complete frame with a good CRC is in frameBuf
+void handleFrame() {
+  byte opcode = frameBuf[0] & ~ACK_REQUEST;
+  byte len = frameBuf[2];
+  byte *payload = frameBuf + 3;
+  binaryHost = true;
+  lastSeq = frameBuf[1];
+
+  if (opcode == OP_POS && len == 4) {
+    int16_t pan = (int16_t)(payload[0] | (payload[1] << 8));
+    int16_t tilt = (int16_t)(payload[2] | (payload[3] << 8));
+    applyPosition(pan / 100.0, tilt / 100.0);
+  }
+  else if (opcode == OP_STEP && len == 1) {
+    stepPan((int)(signed char)payload[0]);
+  }
+  else if (opcode == OP_PAN && len == 1) {
+    const char *pan[] = {"PAN STOP", "PAN LEFT", "PAN RIGHT"};
+    if (payload[0] < 3) handleCommand(pan[payload[0]]);
+  }
+  else if (opcode == OP_STATUS && len == 1) {
+    const char *status[] = {"", "FOUND", "LOST", "TIMEOUT"};
+    if (payload[0] >= 1 && payload[0] <= 3) handleCommand(status[payload[0]]);
+  }
+
+  if (frameBuf[0] & ACK_REQUEST) sendFrame(OP_ACK, lastSeq, NULL, 0);
+}
+
+// Non-blocking: consumes whatever arrived, frames and text lines alike
+void readSerial() {
+  while (Serial.available()) {
+    byte b = Serial.read();
+    if (frameFill >= 0) {
+      frameBuf[frameFill++] = b;
+      if (frameFill == 3 && frameBuf[2] > MAX_PAYLOAD) {
+        frameFill = -1; // Corrupt length, wait for the next sync byte
+      }
+      else if (frameFill > 3 && frameFill == frameBuf[2] + 4) {
+        frameFill = -1;
+        if (crc8(frameBuf, frameBuf[2] + 3) == frameBuf[frameBuf[2] + 3]) handleFrame();
+      }
+    }
+    else if (b == FRAME_SYNC) {
+      frameFill = 0;
+    }
+    else if (b == '\n') {
+      textLine.trim();
+      if (textLine.length() > 0) {
+        binaryHost = false;
+        handleCommand(textLine);
+      }
+      textLine = "";
+    }
+    else if (textLine.length() < 64) {
+      textLine += (char)b;
     }
   }
+}
+
+void loop() {
+  // Handle incoming serial commands
+  readSerial();
 
   // ===== SERVO MOVEMENT LOGIC =====
   unsigned long currentTime = millis();
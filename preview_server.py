@@ -0,0 +1,177 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+# ----------------------------------------------------
+# --- Live MJPEG Preview over HTTP ---
+# ----------------------------------------------------
+# A headless unit can be watched from a browser at http://<pi>:8080/ instead
+# of a cv2.imshow window. Nothing is encoded while nobody is watching. With
+# viewers connected, each frame is JPEG-encoded once and the same bytes go to
+# every viewer. Frame rate and JPEG quality drop as more viewers join, to keep
+# CPU and upload bandwidth bounded.
+#
+#   preview = PreviewServer(port=8080).start()
+#   stream = preview.stream("cam0")              # http://<pi>:8080/cam0
+#   ...in the loop:
+#   if stream.has_viewers: stream.publish(frame)
+
+BOUNDARY = "frame"
+QUALITY_STEP_PER_VIEWER = 10        # JPEG quality lost per extra viewer
+FPS_FACTOR_PER_VIEWER = 0.75        # Frame rate multiplier per extra viewer
+
+
+class PreviewStream:
+    """One named MJPEG stream. publish() is called from the capture loop."""
+
+    def __init__(self, name, max_fps=15.0, quality=80, min_quality=40, min_fps=2.0):
+        self.name = name
+        self.max_fps = max_fps
+        self.quality = quality
+        self.min_quality = min_quality
+        self.min_fps = min_fps
+        self.viewers = 0
+        self.jpeg = None
+        self.seq = 0
+        self.encoded_frames = 0
+        self.last_publish = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def has_viewers(self):
+        return self.viewers > 0
+
+    def settings(self):
+        """(fps, jpeg_quality) for the current number of viewers."""
+        extra = max(self.viewers - 1, 0)
+        fps = max(self.min_fps, self.max_fps * FPS_FACTOR_PER_VIEWER ** extra)
+        quality = max(self.min_quality, self.quality - QUALITY_STEP_PER_VIEWER * extra)
+        return fps, quality
+
+    def publish(self, frame, now=None):
+        """Encodes frame for all viewers if any are watching and the rate allows. Returns True if encoded."""
+        if self.viewers == 0:
+            return False
+        if now is None:
+            now = time.time()
+        fps, quality = self.settings()
+        if now - self.last_publish < 1.0 / fps:
+            return False
+
+        ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            return False
+        with self._cond:
+            self.jpeg = encoded.tobytes()
+            self.seq += 1
+            self.last_publish = now
+            self.encoded_frames += 1
+            self._cond.notify_all()
+        return True
+
+    def wait_frame(self, last_seq, timeout=1.0):
+        """Blocks until a frame newer than last_seq exists. Returns (seq, jpeg) or (last_seq, None)."""
+        with self._cond:
+            if self.seq == last_seq:
+                self._cond.wait(timeout)
+            if self.seq == last_seq:
+                return last_seq, None
+            return self.seq, self.jpeg
+
+    def _viewer_joined(self):
+        with self._cond:
+            self.viewers += 1
+            self.last_publish = 0.0  # Send the next frame right away
+        print(f"[PREVIEW] Viewer connected to '{self.name}' ({self.viewers} watching).")
+
+    def _viewer_left(self):
+        with self._cond:
+            self.viewers -= 1
+        print(f"[PREVIEW] Viewer left '{self.name}' ({self.viewers} watching).")
+
+
+class _PreviewHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass # Keep the tracker console readable
+
+    def do_GET(self):
+        preview = self.server.preview
+        path = self.path.strip("/").split("?")[0]
+
+        if path == "":
+            links = "".join(f'<h3>{name}</h3><img src="/{name}"><br>' for name in preview.streams)
+            body = f"<html><head><title>Preview</title></head><body>{links or 'No streams.'}</body></html>".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        stream = preview.streams.get(path)
+        if stream is None:
+            self.send_error(404, "Unknown stream")
+            return
+
+        self.send_response(200)
+        self.send_header("Cache-Control", "no-cache, private")
+        self.send_header("Pragma", "no-cache")
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.end_headers()
+
+        stream._viewer_joined()
+        last_seq = -1
+        try:
+            while preview.running:
+                last_seq, jpeg = stream.wait_frame(last_seq)
+                if jpeg is None:
+                    continue
+                self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            stream._viewer_left()
+
+
+class PreviewServer:
+    """Serves every PreviewStream at http://host:port/<name> from a background thread."""
+
+    def __init__(self, host="0.0.0.0", port=8080, max_fps=15.0, quality=80):
+        self.host = host
+        self.port = port
+        self.max_fps = max_fps
+        self.quality = quality
+        self.streams = {}
+        self.running = False
+        self._server = None
+        self._thread = None
+
+    def stream(self, name):
+        if name not in self.streams:
+            self.streams[name] = PreviewStream(name, self.max_fps, self.quality)
+        return self.streams[name]
+
+    @property
+    def viewer_count(self):
+        return sum(stream.viewers for stream in self.streams.values())
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _PreviewHandler)
+        self._server.daemon_threads = True
+        self._server.preview = self
+        self.running = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"📺 Preview server on http://{self.host}:{self.port}/")
+        return self
+
+    def stop(self):
+        self.running = False
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
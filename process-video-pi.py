@@ -3,7 +3,11 @@ from ultralytics import YOLO
 import os
 import sys
 import shutil
-from datetime import timedelta # New import for time calculation
+import json
+import time
+from datetime import datetime, timedelta # New import for time calculation
+from activity_index import load_sidecar, active_frame_ranges, SIDECAR_SUFFIX
+from storage_manager import read_storage_state, DEFAULT_STATE_FILE
 
 # --- Configuration ---
 TARGET_CLASSES = ["person", "bottle", "tv"]
@@ -20,8 +24,64 @@ SAVE_INTERVAL_FRAMES = 10
 PROGRESS_UPDATE_INTERVAL = 10
 # ----------------------------
 
-def process_video_for_detections(video_path):
+# --- Watch Mode (segmented recordings from record-pi.py) ---
+# Instead of processing the latest video once, keep watching RECORDED_DIR
+# and process every segment as soon as its <video>.json manifest appears
+# (the manifest is written after the video is complete), oldest first. The
+# model is loaded once, and the analysis gets a wall-clock column taken from
+# the manifest's absolute timestamps.
+WATCH_MODE = False
+WATCH_INTERVAL = 2.0    # Seconds between directory scans
+RECORDED_DIR = "recorded"
+VIDEO_EXTENSIONS = (".mp4", ".h264")
+
+# --- Activity Sidecar (written by record-pi.py with ACTIVITY_INDEX = True) ---
+# When <video>.activity.json exists, only the spans it marks active (padded
+# by ACTIVITY_PAD_SECONDS) are decoded and run through the model; the quiet
+# rest of the video is skipped by seeking.
+USE_ACTIVITY_SIDECAR = True
+ACTIVITY_PAD_SECONDS = 1.0
+
+# --- Storage Backpressure (storage-manager-pi.py) ---
+# Watch mode pauses while the storage manager reports critically low free
+# space (saved frames would fill the card), and resumes when space is back.
+STORAGE_BACKPRESSURE = True
+STORAGE_STATE_FILE = DEFAULT_STATE_FILE
+
+
+def load_model():
+    try:
+        model = YOLO(MODEL_NAME)
+        print(f"YOLO model {MODEL_NAME} loaded.")
+        return model
+    except Exception as e:
+        print(f"Error loading YOLO model: {e}")
+        print("Please ensure 'ultralytics' is installed.")
+        return None
+
+
+def load_manifest(video_path):
+    """The segment manifest next to a video (<video>.json), or None."""
+    try:
+        with open(video_path + ".json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def frame_wall_clock(manifest, frame_index, fps):
+    """Absolute time of a frame from the segment manifest (per-frame offsets when recorded)."""
+    offsets = manifest.get("frame_offsets_ms") or []
+    if frame_index < len(offsets):
+        return manifest["start_ts"] + offsets[frame_index] / 1000.0
+    return manifest["start_ts"] + frame_index / fps
+
+
+def process_video_for_detections(video_path, model=None, manifest=None):
     # --- Setup ---
+    if manifest is None:
+        # Per-frame times for triggered (gapped) segments and .h264 files with no reliable fps
+        manifest = load_manifest(video_path)
     
     # 1. Prepare output directories
     video_filename = os.path.basename(video_path)
@@ -40,14 +100,11 @@ def process_video_for_detections(video_path):
     if not os.path.exists(PROCESSED_VIDEO_DIR):
         os.makedirs(PROCESSED_VIDEO_DIR)
 
-    # 2. Load the YOLO model
-    try:
-        model = YOLO(MODEL_NAME)
-        print(f"YOLO model {MODEL_NAME} loaded.")
-    except Exception as e:
-        print(f"Error loading YOLO model: {e}")
-        print("Please ensure 'ultralytics' is installed.")
-        return
+    # 2. Load the YOLO model (watch mode passes one in)
+    if model is None:
+        model = load_model()
+        if model is None:
+            return
 
     # 3. Load the video and get FPS
     cap = cv2.VideoCapture(video_path)
@@ -57,6 +114,7 @@ def process_video_for_detections(video_path):
 
     # Get video properties
     fps = cap.get(cv2.CAP_PROP_FPS)
+    cap_frame_total = cap.get(cv2.CAP_PROP_FRAME_COUNT)
     if fps <= 0:
          # Fallback to a common FPS if property is not available
          fps = 30.0
@@ -75,14 +133,31 @@ def process_video_for_detections(video_path):
         
     print(f"Target classes detected (COCO IDs): {target_class_ids}")
 
+    # Active frame ranges from the record-time sidecar (None: scan every frame)
+    frame_ranges = None
+    sidecar = load_sidecar(video_path) if USE_ACTIVITY_SIDECAR else None
+    if sidecar is not None:
+        offsets = manifest.get("frame_offsets_ms") if manifest is not None else None
+        frame_ranges = active_frame_ranges(sidecar, fps, offsets, ACTIVITY_PAD_SECONDS)
+        print(f"Activity sidecar: {len(frame_ranges)} active spans")
+
     # 5. Open the analysis file for writing
     try:
         analysis_file = open(analysis_file_path, 'w')
         analysis_file.write(f"--- YOLOv8 Detection Analysis for: {video_filename} ---\n")
         analysis_file.write(f"Target Classes: {', '.join(TARGET_CLASSES)}\n")
         analysis_file.write(f"Video FPS: {fps:.2f}\n")
+        if manifest is not None:
+            start = datetime.fromtimestamp(manifest["start_ts"]).isoformat(timespec="milliseconds")
+            end = datetime.fromtimestamp(manifest["end_ts"]).isoformat(timespec="milliseconds")
+            analysis_file.write(f"Segment {manifest['index']}: {start} -> {end} (previous: {manifest['previous']})\n")
+        if frame_ranges is not None:
+            analysis_file.write(f"Active spans (activity sidecar): {frame_ranges}\n")
         analysis_file.write("-----------------------------------------------------------\n")
-        analysis_file.write("FRAME_INDEX | TIME (HH:MM:SS.ms) | DETECTED OBJECTS\n")
+        if manifest is not None:
+            analysis_file.write("FRAME_INDEX | TIME (HH:MM:SS.ms) | WALL CLOCK   | DETECTED OBJECTS\n")
+        else:
+            analysis_file.write("FRAME_INDEX | TIME (HH:MM:SS.ms) | DETECTED OBJECTS\n")
         analysis_file.write("-----------------------------------------------------------\n")
     except Exception as e:
         print(f"Error opening analysis file: {e}")
@@ -92,11 +167,23 @@ def process_video_for_detections(video_path):
     # --- Processing Loop ---
     frame_count = 0
     detected_frame_count = 0
+    scanned_frame_count = 0
+    range_index = 0
     
     print("\n--- Starting Video Processing ---")
     
     try:
         while cap.isOpened():
+            if frame_ranges is not None:
+                # Skip quiet spans: seek to the start of the next active one
+                while range_index < len(frame_ranges) and frame_count >= frame_ranges[range_index][1]:
+                    range_index += 1
+                if range_index == len(frame_ranges):
+                    break
+                if frame_count < frame_ranges[range_index][0]:
+                    frame_count = frame_ranges[range_index][0]
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
+
             ret, frame = cap.read()
             if not ret:
                 # End of video
@@ -129,7 +216,12 @@ def process_video_for_detections(video_path):
                     detected_objects_str = ", ".join(detected_names)
 
                     # 1. Log to Analysis File
-                    analysis_file.write(f"{frame_count:11} | {time_format[:10].zfill(10)} | {detected_objects_str}\n")
+                    if manifest is not None:
+                        wall_clock = datetime.fromtimestamp(frame_wall_clock(manifest, frame_count, fps))
+                        analysis_file.write(f"{frame_count:11} | {time_format[:10].zfill(10)} | "
+                                            f"{wall_clock.strftime('%H:%M:%S.%f')[:12]} | {detected_objects_str}\n")
+                    else:
+                        analysis_file.write(f"{frame_count:11} | {time_format[:10].zfill(10)} | {detected_objects_str}\n")
 
                     # 2. Save the annotated frame
                     annotated_frame = single_result.plot()
@@ -139,6 +231,7 @@ def process_video_for_detections(video_path):
                     print(f"Saved frame {frame_count} at {time_format[:10].zfill(10)} with {len(boxes)} detections.")
 
             frame_count += 1
+            scanned_frame_count += 1
             
             # Print progress update
             if frame_count % PROGRESS_UPDATE_INTERVAL == 0:
@@ -158,23 +251,80 @@ def process_video_for_detections(video_path):
         source_path = video_path
         destination_path = os.path.join(PROCESSED_VIDEO_DIR, video_filename)
         shutil.move(source_path, destination_path)
+        for suffix in (".json", SIDECAR_SUFFIX):
+            if os.path.exists(source_path + suffix):
+                shutil.move(source_path + suffix, destination_path + suffix)
         print(f"\nSuccessfully moved source video to: {destination_path}")
     except Exception as e:
         print(f"Error moving video file: {e}")
 
     print(f"\n\n--- Processing Complete ---")
-    print(f"Total frames processed: {frame_count}")
+    print(f"Total frames processed: {scanned_frame_count}")
+    if frame_ranges is not None:
+        print(f"Frames skipped as quiet (activity sidecar): {max(0, int(cap_frame_total) - scanned_frame_count)}")
     print(f"Total detected frames saved: {detected_frame_count}")
     print(f"Analysis log saved to: {analysis_file_path}")
 
 
+def watch_recorded_segments():
+    """Processes completed segments in RECORDED_DIR in recording order until Ctrl+C."""
+    model = load_model()
+    if model is None:
+        return
+    attempted = set()
+    paused = False
+    print(f"Watching '{RECORDED_DIR}' for finished segments (Ctrl+C to stop)...")
+    try:
+        while True:
+            state = read_storage_state(STORAGE_STATE_FILE) if STORAGE_BACKPRESSURE else None
+            if state is not None and state.get("pause_processing"):
+                if not paused:
+                    print(f"💾 Disk space critical ({state['free_mb']} MB free): processing paused.")
+                    paused = True
+                time.sleep(WATCH_INTERVAL)
+                continue
+            if paused:
+                print("💾 Disk space recovered: processing resumed.")
+                paused = False
+
+            manifests = []
+            for name in os.listdir(RECORDED_DIR) if os.path.isdir(RECORDED_DIR) else []:
+                if not name.endswith(".json") or name.endswith(SIDECAR_SUFFIX) or name in attempted:
+                    continue
+                try:
+                    with open(os.path.join(RECORDED_DIR, name)) as f:
+                        manifest = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping unreadable manifest {name}: {e}")
+                    attempted.add(name)
+                    continue
+                if "video" in manifest and os.path.exists(os.path.join(RECORDED_DIR, manifest["video"])):
+                    manifests.append((manifest["start_ts"], name, manifest))
+
+            if not manifests:
+                time.sleep(WATCH_INTERVAL)
+                continue
+
+            # Oldest segment only, then scan again (and re-check disk pressure)
+            _, name, manifest = min(manifests)
+            attempted.add(name) # Never loop on a segment that failed to move
+            video_path = os.path.join(RECORDED_DIR, manifest["video"])
+            print(f"\nProcessing segment {manifest['index']}: {video_path}")
+            process_video_for_detections(video_path, model, manifest)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+
 if __name__ == "__main__":
     # --- Main Execution ---
-    
-    recorded_dir = "recorded"
+    if WATCH_MODE:
+        watch_recorded_segments()
+        sys.exit(0)
+
+    recorded_dir = RECORDED_DIR
     
     try:
-        video_files = [f for f in os.listdir(recorded_dir) if f.endswith(".mp4")]
+        video_files = [f for f in os.listdir(recorded_dir) if f.endswith(VIDEO_EXTENSIONS)]
     except FileNotFoundError:
         print(f"Error: The directory '{recorded_dir}' was not found.")
         print("Please ensure the recording script was run successfully first.")
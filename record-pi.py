@@ -1,9 +1,109 @@
 import cv2
-from picamera2 import Picamera2
 import time
 from datetime import datetime
 import os
 import sys
+from recording_engine import open_recorder, SegmentRoller, RecordingTrigger
+from duty_cycle import MotionDetector
+from activity_index import ActivityIndexer
+from storage_manager import read_storage_state, DEFAULT_STATE_FILE
+from preview_server import PreviewServer
+
+# "picamera" opens the camera directly; "bus:ai_camera" records from a running
+# frame-bus-pi.py so a tracker can use the camera at the same time.
+FRAME_SOURCE = "picamera"
+
+# --- Recording Engine (recording_engine.py) ---
+# "h264": Picamera2's hardware encoder, frames never enter Python.
+# "software": OpenCV mp4v on a background thread (frame bus, files).
+# "auto": h264 when recording from the camera and the encoder is available.
+ENCODER = "auto"
+RECORD_SIZE = (1280, 720)
+RECORD_FPS = 30.0
+H264_BITRATE = 8000000
+STATS_INTERVAL = 10.0       # Seconds between fps / dropped-frame reports
+
+# --- Segmented Recording ---
+# Roll to a new file every SEGMENT_SECONDS or SEGMENT_MB (whichever comes
+# first; None disables that limit, both None records one file). Each closed
+# segment appears in recorded/ together with a <video>.json manifest of
+# absolute timestamps, so process-video-pi.py (WATCH_MODE) can detect on
+# segment N while segment N+1 is still being recorded.
+SEGMENT_SECONDS = 60
+SEGMENT_MB = None
+
+# --- Triggered Recording ---
+# RECORD_MODE = "triggered" writes only around activity: the last
+# PRE_ROLL_SECONDS stay in memory (at most PRE_ROLL_MAX_MB; raw frames in
+# software, ~1 MB/s of H.264 in hardware) and are flushed into a new event
+# file when motion is seen. Recording stops once QUIET_SECONDS pass without
+# motion. Event files are segments like the ones above (with manifests).
+# TRIGGER_CLASSES = ["person"] additionally requires a low-rate detector
+# (TRIGGER_MODEL at imgsz 320, at most once per TRIGGER_DETECT_INTERVAL) to
+# confirm the motion, so swaying trees and light changes do not record.
+RECORD_MODE = "continuous"  # or "triggered"
+PRE_ROLL_SECONDS = 3.0
+PRE_ROLL_MAX_MB = 128
+QUIET_SECONDS = 5.0
+MOTION_THRESHOLD = 25       # Per-pixel change (0-255) that counts as motion
+MOTION_MIN_AREA = 0.005     # Fraction of the (160 px wide) frame that must change
+MOTION_CHECK_FPS = 5.0
+TRIGGER_CLASSES = None
+TRIGGER_MODEL = "yolov8n.pt"
+TRIGGER_DETECT_INTERVAL = 1.0
+
+# --- Record-Time Activity Index (activity_index.py) ---
+# A very low-rate detection pass (one frame per ACTIVITY_INTERVAL at
+# ACTIVITY_IMGSZ) on a background thread while recording. Every video gets a
+# <video>.activity.json sidecar of per-second activity, and
+# process-video-pi.py runs full-rate inference only in the active spans.
+# Use the same classes as TARGET_CLASSES there.
+ACTIVITY_INDEX = False
+ACTIVITY_MODEL = "yolov8n.pt"
+ACTIVITY_CLASSES = ["person", "bottle", "tv"]
+ACTIVITY_INTERVAL = 1.0
+ACTIVITY_IMGSZ = 320
+
+# --- Storage Backpressure (storage-manager-pi.py) ---
+# While the storage manager reports low free space, a continuous segmented
+# recording switches to triggered mode (the motion settings above) and back
+# once space is freed. Without storage-manager-pi.py running nothing changes.
+STORAGE_BACKPRESSURE = True
+STORAGE_STATE_FILE = DEFAULT_STATE_FILE
+STORAGE_CHECK_INTERVAL = 5.0
+
+def load_class_detector(model_name, classes, imgsz=320):
+    """Returns detect(frame) -> names of the classes found in the frame (low-res, low-rate use)."""
+    from ultralytics import YOLO
+    model = YOLO(model_name)
+    class_ids = [class_id for class_id, name in model.names.items() if name in classes]
+
+    def detect(frame):
+        results = model.predict(source=frame, classes=class_ids, conf=0.4, imgsz=imgsz, verbose=False)
+        return [model.names[int(cls)] for cls in results[0].boxes.cls]
+    return detect
+
+def make_recording_trigger():
+    try:
+        detect_fn = None
+        if TRIGGER_CLASSES:
+            detect_classes = load_class_detector(TRIGGER_MODEL, TRIGGER_CLASSES)
+            detect_fn = lambda frame: bool(detect_classes(frame))
+    except Exception as e:
+        print(f"Trigger detector unavailable ({e}); triggering on motion alone.")
+        detect_fn = None
+    return RecordingTrigger(MotionDetector(MOTION_THRESHOLD, MOTION_MIN_AREA), QUIET_SECONDS,
+                            PRE_ROLL_SECONDS, PRE_ROLL_MAX_MB, MOTION_CHECK_FPS,
+                            detect_fn, TRIGGER_DETECT_INTERVAL)
+
+# Low-res preview: a local window and/or a browser preview at
+# http://<pi>:PREVIEW_PORT/record (MJPEG, encoded only while someone is
+# watching). Without the window, stop with Ctrl+C. PREVIEW_SIZE = None
+# records without any preview stream.
+SHOW_WINDOW = True
+PREVIEW_SIZE = (320, 180)
+PREVIEW_SERVER = False
+PREVIEW_PORT = 8081
 
 def record_video_on_keypress():
     # --- Configuration ---
@@ -16,70 +116,110 @@ def record_video_on_keypress():
         except OSError as e:
             print(f"Error creating directory {output_dir}: {e}")
             return
-    
-    # Generate a unique filename using a timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_filename = os.path.join(output_dir, f"video_{timestamp}.mp4")
 
-    # --- Picamera2 Initialization ---
+    # --- Recording Engine Initialization ---
     try:
-        picam2 = Picamera2()
-        
-        # Configure the camera for video: 1280x720 is a good standard HD resolution
-        frame_size = (1280, 720)
-        config = picam2.create_video_configuration(main={"size": frame_size, "format": "RGB888"})
-        picam2.configure(config)
-        
-        # Start the camera capture
-        picam2.start()
-        print("Camera started.")
+        # 1280x720 is a good standard HD resolution
+        # (frames from the bus are scaled to this size if the bus runs smaller)
+        # Triggered mode watches motion on the lores stream, so it always needs one
+        # (also when storage backpressure may switch a segmented recording to it)
+        segmented = bool(SEGMENT_SECONDS or SEGMENT_MB)
+        want_lores = (SHOW_WINDOW or PREVIEW_SERVER or RECORD_MODE == "triggered"
+                      or (STORAGE_BACKPRESSURE and segmented))
+        engine = open_recorder(FRAME_SOURCE, RECORD_SIZE, RECORD_FPS, ENCODER,
+                               (PREVIEW_SIZE or (320, 180)) if want_lores else None,
+                               H264_BITRATE, STATS_INTERVAL)
+        print(f"Camera started ({engine.name} encoder).")
         time.sleep(1) # Allow camera sensor to initialize
         
     except Exception as e:
-        print(f"Error initializing Picamera2: {e}")
+        print(f"Error initializing frame source '{FRAME_SOURCE}': {e}")
         # Check for the common "in use" error and provide a helpful tip
         if "Pipeline handler in use by another process" in str(e):
-             print("TIP: The camera is likely in use by another program. Please kill that process or reboot the Pi.")
+             print("TIP: The camera is in use by another program. Run frame-bus-pi.py and set FRAME_SOURCE = \"bus:ai_camera\".")
         return
 
-    # --- OpenCV Video Writer Setup ---
-    # Define the video codec (H.264 is common and good)
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v') 
-    fps = 30.0 # Framerate
-    
-    # Initialize the VideoWriter object
-    out = cv2.VideoWriter(output_filename, fourcc, fps, frame_size)
-    
-    if not out.isOpened():
-        print(f"Error: VideoWriter could not be opened for file {output_filename}.")
-        picam2.stop()
+    # Generate a unique filename using a timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_filename = os.path.join(output_dir, f"video_{timestamp}{engine.extension}")
+    segments = None
+    trigger = None
+    indexer = None
+    if ACTIVITY_INDEX:
+        try:
+            indexer = ActivityIndexer(load_class_detector(ACTIVITY_MODEL, ACTIVITY_CLASSES, ACTIVITY_IMGSZ),
+                                      ACTIVITY_INTERVAL)
+        except Exception as e:
+            print(f"Activity index disabled: {e}")
+    if SEGMENT_SECONDS or SEGMENT_MB or RECORD_MODE == "triggered":
+        segments = SegmentRoller(output_dir, f"video_{timestamp}", SEGMENT_SECONDS, SEGMENT_MB, RECORD_FPS,
+                                 activity=indexer)
+        output_filename = os.path.join(output_dir, f"video_{timestamp}_NNNN{engine.extension} (segments)")
+    if RECORD_MODE == "triggered":
+        trigger = make_recording_trigger()
+
+    try:
+        recording_started = time.time()
+        engine.start(output_filename, segments, trigger)
+        if indexer is not None:
+            indexer.start(engine.snapshot)
+    except Exception as e:
+        print(f"Error: Recording could not be started for file {output_filename}: {e}")
+        engine.close()
         return
 
+    preview_stream = None
+    preview = None
+    if PREVIEW_SERVER:
+        try:
+            preview = PreviewServer(port=PREVIEW_PORT).start()
+            preview_stream = preview.stream("record")
+        except OSError as e:
+            print(f"Could not start preview server on port {PREVIEW_PORT}: {e}")
+
     # --- Recording Loop ---
+    # The engine records on its own; this loop only serves the preview and the keys
     print("\n--- Recording Started ---")
     print(f"Saving video to: {output_filename}")
     print("Press the **q** key or the **Enter** key while the video window is focused to **STOP** recording.")
     print("Or press **Ctrl+C** in the terminal to stop.")
     
+    backpressure = STORAGE_BACKPRESSURE and RECORD_MODE == "continuous" and segments is not None
+    last_storage_check = 0.0
     try:
         while True:
-            # Capture the frame from the camera as a NumPy array
-            frame = picam2.capture_array()
-            
-            # **CRITICAL FIX:** Manual RGB to BGR conversion.
-            # This avoids the error "module 'cv2' has no attribute 'COLOR_RGB2_BGR'"
-            # Picamera2 outputs RGB, but OpenCV's VideoWriter expects BGR.
-            # Slicing [:, :, ::-1] reverses the color channels.
-            frame_bgr = frame[:, :, ::-1]
-            
-            # Write the frame to the video file
-            out.write(frame_bgr)
-            
+            if engine.error is not None:
+                raise engine.error
+            engine.stats.maybe_report()
+
+            # Low disk space: record only around activity until the storage manager frees space
+            if backpressure and time.time() - last_storage_check >= STORAGE_CHECK_INTERVAL:
+                last_storage_check = time.time()
+                state = read_storage_state(STORAGE_STATE_FILE)
+                low_space = state is not None and state.get("record_mode") == "triggered"
+                if low_space and engine.trigger is None:
+                    print(f"💾 Low disk space ({state['free_mb']} MB free): switching to triggered recording.")
+                    trigger = trigger or make_recording_trigger()
+                    engine.set_trigger(trigger)
+                elif not low_space and engine.trigger is not None:
+                    print("💾 Disk space recovered: back to continuous recording.")
+                    engine.set_trigger(None)
+
+            # The low-res preview frame is only fetched (and converted) when someone looks at it
+            want_preview = SHOW_WINDOW or (preview_stream is not None and preview_stream.has_viewers)
+            frame = engine.preview_frame() if want_preview else None
+            if frame is not None and preview_stream is not None:
+                preview_stream.publish(frame)
+            if not SHOW_WINDOW:
+                time.sleep(0.05)
+                continue
+
             # Display the frame in a window for user feedback and keyboard input
-            cv2.imshow('Recording - Press q or Enter to STOP', frame_bgr)
+            if frame is not None:
+                cv2.imshow('Recording - Press q or Enter to STOP', frame)
             
-            # Check for a keyboard press to stop (waitKey(1) waits 1ms)
-            key = cv2.waitKey(1) & 0xFF 
+            # Check for a keyboard press to stop
+            key = cv2.waitKey(int(1000 / RECORD_FPS)) & 0xFF 
             
             # Check for 'q' (standard quit) or 13 (ASCII for Enter key)
             if key == ord('q') or key == 13: 
@@ -93,18 +233,27 @@ def record_video_on_keypress():
 
     # --- Cleanup ---
     print("Releasing resources...")
-    # Release the VideoWriter
-    out.release()
-    # Stop the camera and close the OpenCV window
-    picam2.stop()
+    # Stop the encoder and the camera
+    engine.close()
+    if segments is not None:
+        segments.close() # Wait for the last segment to land in recorded/
+    elif indexer is not None and os.path.exists(output_filename):
+        indexer.write_sidecar(output_filename, recording_started, time.time())
+    if indexer is not None:
+        indexer.stop()
+    if preview is not None:
+        preview.stop()
     cv2.destroyAllWindows()
-    
-    print(f"Recording finished. Video saved to: {output_filename}")
+
+    summary = engine.stats.summary()
+    if segments is not None:
+        print(f"Recording finished. {len(segments.finished)} segments saved to: {output_dir}")
+    else:
+        print(f"Recording finished. Video saved to: {output_filename}")
+    print(f"{summary['frames']} frames at {summary['fps']} fps, {summary['dropped']} dropped ({summary['drop_pct']}%).")
+    if trigger is not None:
+        print(f"{trigger.events} activity events, {trigger.saved_pct()}% of frames saved.")
 
 
 if __name__ == "__main__":
     record_video_on_keypress()
-
-
-
-
@@ -0,0 +1,650 @@
+import collections
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+from activity_index import SIDECAR_SUFFIX
+from duty_cycle import MotionDetector
+from frame_sources import open_source
+
+# ----------------------------------------------------
+# --- Recording Engines ---
+# ----------------------------------------------------
+# record-pi.py used to pull every 1280x720 frame into Python, reverse its
+# channels (a non-contiguous view VideoWriter had to copy) and encode it in
+# software, which took a whole core and still dropped frames. Two engines
+# with the same interface now do the work:
+#
+#   H264Recorder      Picamera2's hardware H.264 encoder. Frames go from the
+#                     camera to the encoder without entering Python; an
+#                     optional low-res "lores" stream feeds the preview.
+#   SoftwareRecorder  Fallback for the frame bus, files, or cameras without
+#                     the encoder. A background thread hands each BGR frame
+#                     straight to cv2.VideoWriter (no per-frame conversion).
+#
+# Both count achieved fps and dropped frames (gaps in the frame timestamps)
+# in RecordingStats.
+#
+#   engine = open_recorder("picamera", (1280, 720), 30.0)
+#   engine.start("recorded/video_x" + engine.extension)
+#   ...engine.preview_frame() / engine.stats.maybe_report()...
+#   engine.stop()
+#
+# Segmented recording: engine.start(segments=SegmentRoller("recorded", ...))
+# rolls to a new file every max_seconds or max_mb. The next file is opened
+# before the old one is closed (software), or at the next keyframe (H.264),
+# so no frame is lost at the boundary. A segment is written under
+# recorded/.partial/ and closed on a background thread. There it gets a
+# manifest (<video>.json with absolute start/end and per-frame timestamps)
+# and is moved into recorded/ with os.replace(), video first, then
+# manifest. A manifest in recorded/ therefore always means a complete video.
+#
+# Triggered recording: engine.start(segments=..., trigger=RecordingTrigger())
+# keeps the last pre_roll_s seconds in a bounded in-memory ring (raw frames
+# for the software engine, encoded H.264 frames for the hardware one) and
+# writes nothing while the scene is idle. When the tracker's motion check
+# (duty_cycle.MotionDetector) sees enough change, optionally confirmed by a
+# low-rate detector, the ring is flushed into a new event file, and
+# recording continues until quiet_s pass without activity. Event files are
+# ordinary segments with manifests.
+#
+# Activity sidecars: SegmentRoller(activity=ActivityIndexer(...)) writes a
+# <video>.activity.json (activity_index.py) for each segment before its
+# manifest. engine.snapshot() gives the indexer its frames.
+
+H264_BITRATE = 8000000          # bits/s at 1280x720
+SOFTWARE_FOURCC = "mp4v"
+PARTIAL_DIR = ".partial"
+SIZE_CHECK_EVERY_N_FRAMES = 30  # os.path.getsize() of the open segment (software)
+
+
+class Segment:
+    """One file of a segmented recording while it is being written."""
+
+    def __init__(self, index, partial_path, start_ts):
+        self.index = index
+        self.partial_path = partial_path
+        self.start_ts = start_ts
+        self.frame_ts = []
+        self.bytes = 0
+
+    def add(self, ts):
+        self.frame_ts.append(ts)
+
+
+class SegmentRoller:
+    """
+    Names, rolls and finalizes the segments of one recording. finish()
+    queues a closed segment; a background thread writes its manifest and
+    moves it into output_dir. on_segment(video_path, manifest) is called
+    after each move (e.g. to start processing). With activity (an
+    ActivityIndexer), each segment also gets an activity sidecar.
+    """
+
+    def __init__(self, output_dir="recorded", prefix="video", max_seconds=60.0, max_mb=None,
+                 fps=30.0, on_segment=None, remux=True, activity=None):
+        self.output_dir = output_dir
+        self.partial_dir = os.path.join(output_dir, PARTIAL_DIR)
+        self.prefix = prefix
+        self.max_seconds = max_seconds
+        self.max_bytes = max_mb * 1024 * 1024 if max_mb else None
+        self.fps = fps
+        self.on_segment = on_segment
+        self.activity = activity
+        self.remux = remux and shutil.which("ffmpeg") is not None
+        self.extension = ".mp4"
+        self.index = 0
+        self.previous_video = None
+        self.finished = []          # Final video paths, in order
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self._thread.start()
+
+    def new_segment(self, start_ts):
+        self.index += 1
+        stamp = datetime.fromtimestamp(start_ts).strftime("%Y%m%d_%H%M%S")
+        name = f"{self.prefix}_{stamp}_{self.index:04d}{self.extension}"
+        return Segment(self.index, os.path.join(self.partial_dir, name), start_ts)
+
+    def due(self, segment, now):
+        if self.max_seconds and now - segment.start_ts >= self.max_seconds:
+            return True
+        return self.max_bytes is not None and segment.bytes >= self.max_bytes
+
+    def finish(self, segment, close_fn=None):
+        """Queues segment for finalizing; close_fn (e.g. writer.release) runs first, off the capture thread."""
+        self._queue.put((segment, close_fn))
+
+    def close(self):
+        """Waits until every queued segment is in output_dir."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            segment, close_fn = item
+            try:
+                if close_fn is not None:
+                    close_fn()
+                self._finalize(segment)
+            except Exception as e:
+                print(f"Error finalizing segment {segment.partial_path}: {e}")
+
+    def _finalize(self, segment):
+        if not segment.frame_ts:
+            os.remove(segment.partial_path)
+            return
+        partial_path = segment.partial_path
+        if partial_path.endswith(".h264") and self.remux:
+            # Container without re-encoding, so players and OpenCV know the frame rate
+            mp4_path = partial_path[:-len(".h264")] + ".mp4"
+            result = subprocess.run(["ffmpeg", "-loglevel", "error", "-y", "-framerate", str(self.fps),
+                                     "-i", partial_path, "-c", "copy", mp4_path])
+            if result.returncode == 0:
+                os.remove(partial_path)
+                partial_path = mp4_path
+
+        video_name = os.path.basename(partial_path)
+        manifest = {
+            "video": video_name,
+            "index": segment.index,
+            "previous": self.previous_video,
+            "start_ts": segment.start_ts,
+            "end_ts": segment.frame_ts[-1],
+            "frames": len(segment.frame_ts),
+            "fps": self.fps,
+            "frame_offsets_ms": [round((ts - segment.start_ts) * 1000.0, 1) for ts in segment.frame_ts]
+        }
+        manifest_partial = partial_path + ".json"
+        with open(manifest_partial, "w") as f:
+            json.dump(manifest, f)
+
+        video_path = os.path.join(self.output_dir, video_name)
+        if self.activity is not None:
+            self.activity.write_sidecar(partial_path, segment.start_ts, segment.frame_ts[-1])
+            os.replace(partial_path + SIDECAR_SUFFIX, video_path + SIDECAR_SUFFIX)
+        os.replace(partial_path, video_path)
+        os.replace(manifest_partial, video_path + ".json")
+        self.previous_video = video_name
+        self.finished.append(video_path)
+        print(f"[SEGMENT] {video_name}: {manifest['frames']} frames, "
+              f"{manifest['end_ts'] - manifest['start_ts']:.1f}s")
+        if self.on_segment is not None:
+            self.on_segment(video_path, manifest)
+
+
+class RecordingTrigger:
+    """
+    Decides when triggered recording writes. check(frame, now) runs motion
+    detection at most check_fps times a second. Without detect_fn motion is
+    activity; with it, motion frames go (latest wins) to detect_fn(frame)
+    on its own thread, at most once per detect_interval, and only a
+    confirmed detection counts. active(now) stays True for quiet_s after
+    the last activity. pre_roll_s / pre_roll_max_mb bound the ring buffer.
+    """
+
+    def __init__(self, motion=None, quiet_s=5.0, pre_roll_s=3.0, pre_roll_max_mb=128, check_fps=5.0,
+                 detect_fn=None, detect_interval=1.0):
+        self.motion = motion if motion is not None else MotionDetector()
+        self.quiet_s = quiet_s
+        self.pre_roll_s = pre_roll_s
+        self.pre_roll_max_bytes = pre_roll_max_mb * 1024 * 1024
+        self.check_interval = 1.0 / check_fps
+        self.detect_fn = detect_fn
+        self.detect_interval = detect_interval
+        self.last_check = 0.0
+        self.last_activity = None
+        self.events = 0
+        self.frames_seen = 0
+        self.frames_saved = 0
+        self._pending = None
+        self._wake = threading.Event()
+        if detect_fn is not None:
+            threading.Thread(target=self._detect_loop, daemon=True).start()
+
+    def check(self, frame, now):
+        if now - self.last_check >= self.check_interval:
+            self.last_check = now
+            if self.motion.update(frame):
+                if self.detect_fn is None:
+                    self._activity(now)
+                else:
+                    self._pending = (frame, now)
+                    self._wake.set()
+        return self.active(now)
+
+    def active(self, now):
+        return self.last_activity is not None and now - self.last_activity < self.quiet_s
+
+    def count(self, saved):
+        self.frames_seen += 1
+        if saved:
+            self.frames_saved += 1
+
+    def saved_pct(self):
+        return round(100.0 * self.frames_saved / self.frames_seen, 1) if self.frames_seen else 0.0
+
+    def _activity(self, ts):
+        if not self.active(ts):
+            self.events += 1
+            print(f"[TRIGGER] Activity (motion {self.motion.changed_fraction:.1%}), event {self.events} started")
+        self.last_activity = ts
+
+    def _detect_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            frame, ts = self._pending
+            try:
+                if self.detect_fn(frame):
+                    self._activity(ts)
+            except Exception as e:
+                print(f"Trigger detector error: {e}")
+            time.sleep(self.detect_interval)
+
+
+class RecordingStats:
+    """Frames written, frames dropped (timestamp gaps) and achieved fps, overall and per interval."""
+
+    def __init__(self, fps, report_interval=10.0):
+        self.expected_interval = 1.0 / fps
+        self.report_interval = report_interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, now=None):
+        with self._lock:
+            self.frames = 0
+            self.dropped = 0
+            self.started_at = time.time() if now is None else now
+            self.last_ts = None
+            self.interval_frames = 0
+            self.interval_dropped = 0
+            self.interval_start = self.started_at
+
+    def frame(self, ts):
+        """Counts one frame with its capture timestamp (seconds)."""
+        with self._lock:
+            if self.last_ts is not None:
+                gap = ts - self.last_ts
+                if gap > 1.5 * self.expected_interval:
+                    missed = int(round(gap / self.expected_interval)) - 1
+                    self.dropped += missed
+                    self.interval_dropped += missed
+            self.last_ts = ts
+            self.frames += 1
+            self.interval_frames += 1
+
+    def summary(self, now=None):
+        if now is None:
+            now = time.time()
+        elapsed = max(now - self.started_at, 1e-6)
+        total = self.frames + self.dropped
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "fps": round(self.frames / elapsed, 2),
+            "drop_pct": round(100.0 * self.dropped / total, 2) if total else 0.0,
+            "elapsed_s": round(elapsed, 1)
+        }
+
+    def maybe_report(self, now=None):
+        if now is None:
+            now = time.time()
+        if now - self.interval_start < self.report_interval:
+            return None
+        with self._lock:
+            elapsed = now - self.interval_start
+            fps = self.interval_frames / elapsed
+            dropped = self.interval_dropped
+            self.interval_frames = 0
+            self.interval_dropped = 0
+            self.interval_start = now
+        print(f"[RECORD] {fps:.1f} fps, {dropped} dropped in the last {elapsed:.0f}s "
+              f"({self.frames} frames, {self.dropped} dropped in total)")
+        return fps, dropped
+
+
+class SoftwareRecorder:
+    """Reads a frame source on a background thread and writes it with cv2.VideoWriter."""
+
+    name = f"software ({SOFTWARE_FOURCC})"
+    extension = ".mp4"
+
+    def __init__(self, source, size, fps=30.0, preview_size=None, report_interval=10.0):
+        self.source = source
+        self.size = tuple(size)
+        self.fps = fps
+        self.preview_size = tuple(preview_size) if preview_size else None
+        self.stats = RecordingStats(fps, report_interval)
+        self.writer = None
+        self.segments = None
+        self.segment = None
+        self.trigger = None
+        self.pre_roll = None
+        self.latest = None
+        self.latest_ts = None
+        self.error = None
+        self.running = False
+        self._thread = None
+
+    def _open_writer(self, path):
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*SOFTWARE_FOURCC), self.fps, self.size)
+        if not writer.isOpened():
+            raise IOError(f"VideoWriter could not be opened for file {path}")
+        return writer
+
+    def start(self, path=None, segments=None, trigger=None):
+        """Records into path, or into rolling segments from a SegmentRoller (always with a trigger)."""
+        self.segments = segments
+        if trigger is not None:
+            self.set_trigger(trigger)
+        elif segments is None:
+            self.writer = self._open_writer(path)
+        self.stats.reset()
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def set_trigger(self, trigger):
+        """Switches a segmented recording to triggered (or back to continuous with None), also while it runs."""
+        if trigger is not None:
+            if self.segments is None:
+                raise ValueError("Triggered recording writes event segments; pass a SegmentRoller")
+            # Raw frames: the byte budget usually caps the pre-roll before pre_roll_s does
+            frame_bytes = self.size[0] * self.size[1] * 3
+            max_frames = min(int(trigger.pre_roll_s * self.fps), trigger.pre_roll_max_bytes // frame_bytes)
+            self.pre_roll = collections.deque(maxlen=max(1, max_frames))
+            print(f"Pre-roll: {self.pre_roll.maxlen} frames ({self.pre_roll.maxlen / self.fps:.1f}s, "
+                  f"{self.pre_roll.maxlen * frame_bytes / 1048576:.0f} MB)")
+        self.trigger = trigger
+
+    def _roll(self, capture_ts):
+        # Open the next file first; the old one is released on the roller's thread
+        segment = self.segments.new_segment(capture_ts)
+        writer = self._open_writer(segment.partial_path)
+        if self.segment is not None:
+            self.segments.finish(self.segment, self.writer.release)
+        self.segment, self.writer = segment, writer
+
+    def _write(self, frame, capture_ts):
+        if self.segments is not None:
+            if self.segment is None or self.segments.due(self.segment, capture_ts):
+                self._roll(capture_ts)
+            self.segment.add(capture_ts)
+            if len(self.segment.frame_ts) % SIZE_CHECK_EVERY_N_FRAMES == 0:
+                self.segment.bytes = os.path.getsize(self.segment.partial_path)
+        self.writer.write(frame) # Frame sources already deliver contiguous BGR
+
+    def _end_event(self, trigger):
+        print(f"[TRIGGER] Quiet for {trigger.quiet_s:.0f}s, event closed")
+        self.segments.finish(self.segment, self.writer.release)
+        self.segment = None
+        self.writer = None
+
+    def _run(self):
+        try:
+            while self.running:
+                frame, capture_ts = self.source.read()
+                if frame is None:
+                    continue
+                if not frame.flags.writeable:
+                    # A read-only view into the frame bus ring: its slot is reused 16 frames later,
+                    # so anything kept (latest, pre-roll) needs its own copy
+                    frame = frame.copy()
+                self.stats.frame(capture_ts)
+                self.latest = frame
+                self.latest_ts = capture_ts
+                trigger = self.trigger # set_trigger() may swap it between frames
+                if trigger is not None:
+                    active = trigger.check(frame, capture_ts)
+                    trigger.count(active)
+                    if not active:
+                        if self.segment is not None:
+                            self._end_event(trigger)
+                        self.pre_roll.append((frame, capture_ts))
+                        continue
+                while self.pre_roll:
+                    self._write(*self.pre_roll.popleft())
+                self._write(frame, capture_ts)
+        except Exception as e:
+            self.error = e
+            self.running = False
+
+    def snapshot(self):
+        """(newest full-size frame, its capture time) for analysis, e.g. an ActivityIndexer."""
+        return self.latest, self.latest_ts
+
+    def preview_frame(self):
+        """The newest frame at preview size (only resized when asked for), or None."""
+        frame = self.latest
+        if frame is None or self.preview_size is None:
+            return frame
+        return cv2.resize(frame, self.preview_size, interpolation=cv2.INTER_AREA)
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self.segment is not None:
+            self.segments.finish(self.segment, self.writer.release)
+            self.segment = None
+        elif self.writer is not None:
+            self.writer.release()
+        self.writer = None
+        if self.pre_roll is not None:
+            self.pre_roll.clear()
+
+    def close(self):
+        self.stop()
+        self.source.close()
+
+
+class H264Recorder:
+    """
+    Picamera2 recording through the hardware H.264 encoder. The main stream
+    is YUV420 for the encoder; the optional lores stream is the preview.
+    Frames are counted in the camera's post_callback from SensorTimestamp.
+    Writes .mp4 through ffmpeg when it is installed, raw .h264 otherwise.
+    """
+
+    name = "hardware H.264"
+
+    def __init__(self, size, fps=30.0, preview_size=None, camera_num=0, bitrate=H264_BITRATE, report_interval=10.0):
+        from picamera2 import Picamera2 # Only needed on the Pi
+        from picamera2.encoders import H264Encoder
+        self.size = tuple(size)
+        self.fps = fps
+        self.preview_size = tuple(preview_size) if preview_size else None
+        self.stats = RecordingStats(fps, report_interval)
+        self.error = None
+        self.extension = ".mp4" if shutil.which("ffmpeg") else ".h264"
+
+        self.picam2 = Picamera2(camera_num)
+        streams = {"main": {"size": self.size, "format": "YUV420"}}
+        if self.preview_size:
+            streams["lores"] = {"size": self.preview_size, "format": "YUV420"}
+        config = self.picam2.create_video_configuration(**streams, controls={"FrameRate": fps})
+        self.picam2.configure(config)
+        self.picam2.post_callback = self._on_request
+        # A keyframe every second, so segments can start within a second of being due
+        self.encoder = H264Encoder(bitrate=bitrate, iperiod=max(1, int(fps)))
+        self.output = None
+        self.trigger = None
+        self.recording = False
+        self._motion_thread = None
+
+    def _on_request(self, request):
+        # Camera thread: metadata only, pixel data stays with the encoder
+        sensor_ts = request.get_metadata().get("SensorTimestamp")
+        self.stats.frame(sensor_ts / 1e9 if sensor_ts else time.time())
+
+    def _output(self, path):
+        from picamera2.outputs import FfmpegOutput, FileOutput
+        return FfmpegOutput(path) if path.endswith(".mp4") else FileOutput(path)
+
+    def start(self, path=None, segments=None, trigger=None):
+        """Records into path, or into rolling raw H.264 segments from a SegmentRoller (always with a trigger)."""
+        self.stats.reset()
+        if segments is not None:
+            segments.extension = ".h264"
+            self.output = _segment_output(segments)
+        else:
+            self.output = self._output(path)
+        if trigger is not None:
+            self.set_trigger(trigger) # Before the first frame arrives
+        self.picam2.start_recording(self.encoder, self.output)
+        self.recording = True
+        if trigger is not None:
+            self._start_motion()
+
+    def set_trigger(self, trigger):
+        """Switches a segmented recording to triggered (or back to continuous with None), also while it runs."""
+        if trigger is not None and (not hasattr(self.output, "trigger") or self.preview_size is None):
+            raise ValueError("Triggered recording needs a SegmentRoller and a lores (preview) stream")
+        self.trigger = trigger
+        if hasattr(self.output, "trigger"):
+            self.output.trigger = trigger
+        if trigger is not None and self.recording:
+            self._start_motion()
+
+    def _start_motion(self):
+        if self._motion_thread is None or not self._motion_thread.is_alive():
+            self._motion_thread = threading.Thread(target=self._watch_motion, daemon=True)
+            self._motion_thread.start()
+
+    def _watch_motion(self):
+        # Motion runs on the lores stream; the encoder keeps the main stream
+        try:
+            while self.recording:
+                trigger = self.trigger
+                if trigger is None:
+                    return
+                started = time.time()
+                trigger.check(self.preview_frame(), started)
+                time.sleep(max(0.0, trigger.check_interval - (time.time() - started)))
+        except Exception as e:
+            if self.recording:
+                self.error = e
+
+    def preview_frame(self):
+        """BGR lores frame (converted only when asked for), or None without a lores stream."""
+        if self.preview_size is None or not self.recording:
+            return None
+        yuv = self.picam2.capture_array("lores")
+        return cv2.cvtColor(yuv, cv2.COLOR_YUV420p2BGR)
+
+    def snapshot(self):
+        """(lores frame as BGR, now) for analysis; (None, None) without a lores stream."""
+        frame = self.preview_frame()
+        return frame, (time.time() if frame is not None else None)
+
+    def stop(self):
+        if self.recording:
+            self.recording = False
+            if self._motion_thread is not None:
+                self._motion_thread.join(timeout=2)
+            self.picam2.stop_recording()
+            if hasattr(self.output, "finish_segment"):
+                self.output.finish_segment()
+
+    def close(self):
+        self.stop()
+        self.picam2.close()
+
+
+def _segment_output(segments):
+    """
+    A Picamera2 Output that writes encoded frames into rolling segments,
+    switching on keyframes. With a trigger set, idle frames go to a pre-roll
+    ring that is flushed from its oldest keyframe when activity starts.
+    """
+    from picamera2.outputs import Output
+
+    class SegmentOutput(Output):
+        def __init__(self):
+            super().__init__()
+            self.file = None
+            self.segment = None
+            self.base = None    # (encoder timestamp µs, wall clock) of the first frame
+            self.trigger = None
+            self.pre_roll = collections.deque()
+            self.pre_roll_bytes = 0
+
+        def outputframe(self, frame, keyframe=True, timestamp=None, *args, **kwargs):
+            now = time.time()
+            if timestamp is not None:
+                if self.base is None:
+                    self.base = (timestamp, now)
+                now = self.base[1] + (timestamp - self.base[0]) / 1e6
+            trigger = self.trigger
+            if trigger is not None:
+                active = trigger.active(now)
+                trigger.count(active)
+                if not active:
+                    if self.segment is not None:
+                        print(f"[TRIGGER] Quiet for {trigger.quiet_s:.0f}s, event closed")
+                        self.finish_segment()
+                    self.buffer(bytes(frame), keyframe, now, trigger)
+                    return
+            while self.pre_roll:
+                self.write(*self.pre_roll.popleft())
+            self.pre_roll_bytes = 0
+            self.write(frame, keyframe, now)
+
+        def buffer(self, frame, keyframe, now, trigger):
+            self.pre_roll.append((frame, keyframe, now))
+            self.pre_roll_bytes += len(frame)
+            while self.pre_roll and (now - self.pre_roll[0][2] > trigger.pre_roll_s
+                                     or self.pre_roll_bytes > trigger.pre_roll_max_bytes):
+                self.pre_roll_bytes -= len(self.pre_roll.popleft()[0])
+
+        def write(self, frame, keyframe, now):
+            if keyframe and (self.segment is None or segments.due(self.segment, now)):
+                self.finish_segment()
+                self.segment = segments.new_segment(now)
+                self.file = open(self.segment.partial_path, "wb")
+            if self.file is None:
+                return # Wait for the first keyframe
+            self.file.write(frame)
+            self.segment.bytes += len(frame)
+            self.segment.add(now)
+
+        def finish_segment(self):
+            if self.segment is not None:
+                segments.finish(self.segment, self.file.close)
+                self.segment = None
+                self.file = None
+
+    return SegmentOutput()
+
+
+def open_recorder(spec, size, fps=30.0, encoder="auto", preview_size=None, bitrate=H264_BITRATE,
+                  report_interval=10.0):
+    """
+    encoder: "h264" (hardware, Picamera2 only), "software", or "auto" (h264
+    for a camera spec when Picamera2's encoder is available, else software).
+    """
+    if encoder in ("auto", "h264") and spec.startswith("picamera"):
+        camera_num = int(spec.split(":", 1)[1]) if ":" in spec else 0
+        try:
+            return H264Recorder(size, fps, preview_size, camera_num, bitrate, report_interval)
+        except ImportError as e:
+            if encoder == "h264":
+                raise
+            print(f"Hardware encoder unavailable ({e}); recording in software.")
+    elif encoder == "h264":
+        raise ValueError(f"The hardware encoder needs a Picamera2 source, not '{spec}'")
+    source = open_source(spec, size, video=True)
+    return SoftwareRecorder(source, size, fps, preview_size, report_interval)
@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+
+# ----------------------------------------------------
+# --- Appearance Re-identification Gallery ---
+# ----------------------------------------------------
+# Each box is described by a compact color descriptor: a hue/saturation
+# histogram (value bins for washed-out pixels) of its upper and lower half.
+# Histograms are square-rooted so that the dot product of two descriptors is
+# their Bhattacharyya coefficient (1.0 = identical color distribution).
+
+REID_PATCH_SIZE = (16, 32)      # (width, height) every box is resized to
+HUE_BINS = 16
+SAT_BINS = 4
+VALUE_BINS = 4                  # Used instead of hue for low-saturation pixels
+LOW_SATURATION = 40             # Below this, hue is unreliable
+PART_BINS = HUE_BINS * SAT_BINS + VALUE_BINS
+DESCRIPTOR_SIZE = 2 * PART_BINS # Upper half + lower half
+
+
+def batch_descriptors(frame, boxes):
+    """
+    Returns an (N, DESCRIPTOR_SIZE) float32 array of appearance descriptors,
+    one per (x1, y1, x2, y2) box. Boxes too small to describe get a zero row.
+    """
+    count = len(boxes)
+    if count == 0:
+        return np.zeros((0, DESCRIPTOR_SIZE), dtype=np.float32)
+
+    frame_height, frame_width = frame.shape[:2]
+    patch_w, patch_h = REID_PATCH_SIZE
+    patches = np.zeros((count, patch_h, patch_w, 3), dtype=np.uint8)
+    valid = np.zeros(count, dtype=bool)
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        x1, y1 = max(0, int(x1)), max(0, int(y1))
+        x2, y2 = min(frame_width, int(x2)), min(frame_height, int(y2))
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            continue
+        patches[i] = cv2.resize(frame[y1:y2, x1:x2], REID_PATCH_SIZE, interpolation=cv2.INTER_AREA)
+        valid[i] = True
+
+    # One color conversion for all candidates: stack the patches vertically
+    hsv = cv2.cvtColor(patches.reshape(count * patch_h, patch_w, 3), cv2.COLOR_BGR2HSV)
+    hsv = hsv.reshape(count, patch_h, patch_w, 3).astype(np.int32)
+
+    hue_bin = hsv[..., 0] * HUE_BINS // 180
+    sat_bin = hsv[..., 1] * SAT_BINS // 256
+    value_bin = hsv[..., 2] * VALUE_BINS // 256
+    bins = np.where(
+        hsv[..., 1] < LOW_SATURATION,
+        HUE_BINS * SAT_BINS + value_bin,
+        hue_bin * SAT_BINS + sat_bin
+    )
+    lower_half = (np.arange(patch_h) >= patch_h // 2)[None, :, None]
+    bins = bins + lower_half * PART_BINS
+
+    # One bincount for all candidates: give each candidate its own bin range
+    flat = (bins.reshape(count, -1) + np.arange(count)[:, None] * DESCRIPTOR_SIZE).ravel()
+    hist = np.bincount(flat, minlength=count * DESCRIPTOR_SIZE).reshape(count, DESCRIPTOR_SIZE)
+    hist = hist.astype(np.float32) / (patch_w * patch_h)
+    descriptors = np.sqrt(hist)
+    descriptors[~valid] = 0.0
+    return descriptors
+
+
+class ReIDGallery:
+    """
+    Bounded set of appearance descriptors for the locked object.
+    The first descriptor (taken at lock time) is always kept; later ones are
+    added only when the object's appearance has changed, replacing the
+    oldest entry once the gallery is full.
+    """
+
+    def __init__(self, max_size=16, novelty_threshold=0.95):
+        self.max_size = max(1, int(max_size))
+        self.novelty_threshold = novelty_threshold
+        self.descriptors = np.zeros((0, DESCRIPTOR_SIZE), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.descriptors)
+
+    def reset(self):
+        self.descriptors = np.zeros((0, DESCRIPTOR_SIZE), dtype=np.float32)
+
+    def add(self, descriptor):
+        """Adds a descriptor if it is new enough; returns True if it was stored."""
+        if not descriptor.any():
+            return False
+        if len(self.descriptors) > 0 and self.match(descriptor[None, :])[0] >= self.novelty_threshold:
+            return False
+        if len(self.descriptors) >= self.max_size:
+            if self.max_size == 1:
+                return False # Only the anchor fits
+            # Drop the oldest entry after the anchor
+            self.descriptors = np.delete(self.descriptors, 1, axis=0)
+        self.descriptors = np.vstack([self.descriptors, descriptor[None, :]])
+        return True
+
+    def match(self, descriptors):
+        """
+        Returns, for every row of descriptors, its best similarity against
+        the gallery, in one matrix product.
+        """
+        if len(self.descriptors) == 0 or len(descriptors) == 0:
+            return np.zeros(len(descriptors), dtype=np.float32)
+        return (descriptors @ self.descriptors.T).max(axis=1)
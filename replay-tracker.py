@@ -0,0 +1,132 @@
+from ultralytics import YOLO
+import cv2
+import json
+import os
+import sys
+import time
+from camera_tracker import CameraTracker
+from frame_sources import FileSource
+from replay import ScriptedEvents, MqttRecorder
+
+# ----------------------------------------------------
+# --- Deterministic Replay of the Locking Loop ---
+# ----------------------------------------------------
+# Runs the same CameraTracker as object-locking-pi.py / object-locking-roi-pi.py
+# on a recorded video or image sequence instead of the camera. Lock/ROI events
+# come from a script instead of mouse clicks, and the MQTT messages that would
+# have been published are written to REPLAY_OUTPUT (JSON lines, one per message,
+# tagged with the frame index) so runs can be diffed between versions.
+#
+# Usage: python replay-tracker.py [video_or_images] [events.json] [output.jsonl]
+
+# --- Replay Configuration ---
+REPLAY_SOURCE = "recorded/test.mp4"     # .mp4 file, image folder or glob ("frames/*.jpg")
+REPLAY_EVENTS = None                    # JSON events file (see replay.py), None = no events
+REPLAY_OUTPUT = "replay_output.jsonl"
+REPLAY_FPS = None                       # None = as fast as possible, or a fixed rate like 30.0
+HEADLESS_REPLAY = True                  # False = show the overlay window while replaying
+
+# --- Model / Frame Size (same as the live trackers) ---
+MODEL_NAME = "yolov8n.pt"
+INFERENCE_IMGSZ = 640
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+
+# --- Tracker Settings Under Test (defaults in camera_tracker.DEFAULT_SETTINGS) ---
+TRACK_LOW_CONFIDENCE = 0.1
+TRACKER_SETTINGS = {
+    "MIN_SIMILARITY_MATCH": 0.80,
+    "MAX_PIXEL_SHIFT": 150,
+    "MAX_LOST_FRAMES": 150,
+    "HYBRID_MODE": True,
+    "DETECT_EVERY_N_FRAMES": 4,
+    "TRACKER_TYPE": "KCF",
+    "TRACK_LOW_CONFIDENCE": TRACK_LOW_CONFIDENCE,
+    "ROI_CONTROLS": True,               # Accept ROI events like object-locking-roi-pi.py
+    "DUTY_CYCLE": False,                # Idle timing is wall-clock based and not reproducible
+    "MOVE_COALESCE": False,             # Same for the move heartbeat/rate limit
+    "LATENCY_REPORT_INTERVAL": 1e9      # Reported once at the end instead
+}
+
+
+def run_replay(source_path, events_path, output_path):
+    try:
+        model = YOLO(MODEL_NAME)
+    except Exception as e:
+        print(f"Error loading YOLO model: {e}")
+        return None
+
+    try:
+        source = FileSource(source_path, size=(FRAME_WIDTH, FRAME_HEIGHT), fps=REPLAY_FPS, loop=False)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return None
+
+    events = ScriptedEvents.load(events_path)
+    recorder = MqttRecorder(output_path)
+    settings = dict(TRACKER_SETTINGS, HEADLESS_MODE=HEADLESS_REPLAY)
+    camera = CameraTracker("replay", model.names, recorder,
+                           frame_size=(FRAME_WIDTH, FRAME_HEIGHT), settings=settings)
+
+    print(f"Replaying {source_path} ({'max speed' if not REPLAY_FPS else f'{REPLAY_FPS} fps'}) -> {output_path}")
+    frame_index = 0
+    detector_frames = 0
+    start_time = time.time()
+
+    while True:
+        frame, capture_ts = source.read()
+        if frame is None:
+            break
+
+        recorder.frame_index = frame_index
+        for command in events.due(frame_index):
+            camera.apply_control_command(command)
+
+        detector_input = camera.begin_frame(frame, capture_ts)
+        results = None
+        if detector_input is not None:
+            images, roi_imgsz = detector_input
+            results = model(images, conf=TRACK_LOW_CONFIDENCE, imgsz=roi_imgsz or INFERENCE_IMGSZ, verbose=False)
+            detector_frames += 1
+        camera.finish_frame(results)
+
+        if camera.update_window():
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+
+        camera.end_frame()
+        frame_index += 1
+
+    elapsed = time.time() - start_time
+    source.close()
+    recorder.close()
+
+    summary = {
+        "source": source_path,
+        "events": events_path,
+        "frames": frame_index,
+        "detector_frames": detector_frames,
+        "messages": recorder.message_count,
+        "elapsed_s": round(elapsed, 3),
+        "loop_fps": round(frame_index / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency": camera.latency_telemetry.report()["stages"],
+        "settings": settings
+    }
+    summary_path = os.path.splitext(output_path)[0] + "_summary.json"
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\n--- Replay finished: {frame_index} frames ({detector_frames} detector passes) in {elapsed:.1f}s, "
+          f"{summary['loop_fps']} fps ---")
+    for stage, stats in summary["latency"].items():
+        print(f"  {stage:<22} p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms max={stats['max_ms']:.1f}ms")
+    print(f"MQTT messages: {output_path}\nSummary: {summary_path}")
+    return summary
+
+
+if __name__ == "__main__":
+    source_path = sys.argv[1] if len(sys.argv) > 1 else REPLAY_SOURCE
+    events_path = sys.argv[2] if len(sys.argv) > 2 else REPLAY_EVENTS
+    output_path = sys.argv[3] if len(sys.argv) > 3 else REPLAY_OUTPUT
+    if run_replay(source_path, events_path, output_path) is None:
+        sys.exit(1)
@@ -0,0 +1,71 @@
+import json
+
+from telemetry_codec import decode_move
+
+# ----------------------------------------------------
+# --- Deterministic Replay Helpers ---
+# ----------------------------------------------------
+# Scripted control events stand in for mouse clicks, and the MQTT messages the
+# tracker would have published are written to a JSON-lines file keyed by frame
+# index, so two runs over the same video can be diffed line by line.
+#
+# Events file: a JSON list, each entry a tracker/control command plus the
+# frame index it is applied before, e.g.
+#   [{"frame": 30, "command": "LOCK", "x": 320, "y": 240},
+#    {"frame": 200, "command": "ROI", "x1": 100, "y1": 80, "x2": 500, "y2": 400},
+#    {"frame": 400, "command": "UNLOCK"}]
+
+VOLATILE_KEYS = ("timestamp", "capture_ts") # Wall-clock fields left out of the recording
+IGNORED_TOPIC_SUFFIXES = ("tracker/diagnostics",) # Latency reports differ on every run
+
+
+class ScriptedEvents:
+    """Control commands scheduled by frame index."""
+
+    def __init__(self, events=None):
+        self.events = sorted(events or [], key=lambda event: event["frame"])
+        self.next_index = 0
+
+    @classmethod
+    def load(cls, path):
+        if not path:
+            return cls()
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def due(self, frame_index):
+        """Returns the commands (without the "frame" key) to apply before this frame."""
+        commands = []
+        while self.next_index < len(self.events) and self.events[self.next_index]["frame"] <= frame_index:
+            event = dict(self.events[self.next_index])
+            del event["frame"]
+            commands.append(event)
+            self.next_index += 1
+        return commands
+
+
+class MqttRecorder:
+    """
+    Drop-in publish_fn for CameraTracker that writes every message to a
+    JSON-lines file instead of a broker. Set frame_index before each frame.
+    """
+
+    def __init__(self, path, keep_volatile=False):
+        self.file = open(path, "w")
+        self.keep_volatile = keep_volatile
+        self.frame_index = 0
+        self.message_count = 0
+
+    def __call__(self, topic, payload_json):
+        if topic.endswith(IGNORED_TOPIC_SUFFIXES):
+            return
+        payload = decode_move(payload_json) if isinstance(payload_json, bytes) else json.loads(payload_json)
+        if not self.keep_volatile and isinstance(payload, dict):
+            for key in VOLATILE_KEYS:
+                payload.pop(key, None)
+        record = {"frame": self.frame_index, "topic": topic, "payload": payload}
+        self.file.write(json.dumps(record, sort_keys=True) + "\n")
+        self.message_count += 1
+
+    def close(self):
+        self.file.close()
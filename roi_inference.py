@@ -0,0 +1,217 @@
+import json
+
+import cv2
+import numpy as np
+
+# ----------------------------------------------------
+# --- Region-of-Interest Inference ---
+# ----------------------------------------------------
+# Runs the detector on one or more ROIs instead of the full frame. Each ROI is
+# cut out of the frame and padded (bottom/right) to a square imgsz bucket
+# instead of being letterboxed, so YOLO sees the pixels 1:1 and a detection
+# maps back to the frame with a plain offset. All crops of a frame go through
+# the model in one batched call, and the boxes of all ROIs are mapped back in
+# one vectorized step:
+#
+#   batch = CropBatch(frame, rois)
+#   results = model(batch.images, imgsz=batch.imgsz)
+#   boxes, class_ids, confs = batch.detections(results, model.names, TARGET_CLASSES, 0.1)
+#
+# ROIs can be rectangles or polygons (pixels outside the polygon are masked
+# out) and are stored in a JSON file:
+#   [{"name": "door", "box": [100, 80, 420, 400]},
+#    {"name": "desk", "polygon": [[400, 200], [630, 220], [630, 470], [380, 470]]}]
+
+IMGSZ_BUCKETS = (160, 224, 320, 416, 480, 640)     # Multiples of 32; crops above 640 are scaled down
+PAD_VALUE = 114                                     # Same gray YOLO uses for letterbox padding
+ROI_NMS_IOU = 0.5                                   # Merges duplicates where ROIs overlap (same class only)
+
+
+def imgsz_bucket(width, height):
+    """Smallest bucket that holds a width x height crop without scaling (or the largest bucket)."""
+    size = max(width, height)
+    for bucket in IMGSZ_BUCKETS:
+        if size <= bucket:
+            return bucket
+    return IMGSZ_BUCKETS[-1]
+
+
+def cross_roi_nms(boxes, class_ids, confs, roi_index, iou_threshold=ROI_NMS_IOU):
+    """
+    Indices of the boxes to keep. A box is only suppressed by a more confident
+    box of the same class from another ROI: YOLO already ran NMS inside each
+    crop, so overlapping boxes from one crop are different objects.
+    """
+    order = np.argsort(-confs, kind="stable")
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    kept = []
+    for i in order:
+        if suppressed[i]:
+            continue
+        kept.append(i)
+        top_left = np.maximum(boxes[i, :2], boxes[:, :2])
+        bottom_right = np.minimum(boxes[i, 2:], boxes[:, 2:])
+        inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+        iou = inter / np.maximum(areas[i] + areas - inter, 1e-6)
+        suppressed |= (iou > iou_threshold) & (class_ids == class_ids[i]) & (roi_index != roi_index[i])
+    return np.array(sorted(kept), dtype=int)
+
+
+class RegionOfInterest:
+    """A rectangular (box) or polygon ROI in full-frame pixel coordinates."""
+
+    def __init__(self, name="roi", box=None, polygon=None):
+        self.name = name
+        self.polygon = None
+        if polygon is not None:
+            self.polygon = np.array(polygon, dtype=np.int32).reshape(-1, 2)
+            x1, y1 = self.polygon.min(axis=0)
+            x2, y2 = self.polygon.max(axis=0) + 1
+            box = (x1, y1, x2, y2)
+        if box is None:
+            raise ValueError(f"ROI '{name}' needs a box or a polygon")
+        x1, y1, x2, y2 = (int(v) for v in box)
+        self.box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        self._mask = None
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("name", "roi"), box=data.get("box"), polygon=data.get("polygon"))
+
+    def to_dict(self):
+        if self.polygon is not None:
+            return {"name": self.name, "polygon": self.polygon.tolist()}
+        return {"name": self.name, "box": list(self.box)}
+
+    def clamped_box(self, frame_width, frame_height):
+        """The box clipped to the frame, or None if nothing of it is left."""
+        x1, y1, x2, y2 = self.box
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(frame_width, x2), min(frame_height, y2)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2, y2
+
+    def mask(self):
+        """uint8 mask over self.box (255 = inside the polygon), None for rectangles."""
+        if self.polygon is None:
+            return None
+        if self._mask is None:
+            x1, y1, x2, y2 = self.box
+            self._mask = np.zeros((y2 - y1, x2 - x1), np.uint8)
+            cv2.fillPoly(self._mask, [self.polygon - np.array([x1, y1], np.int32)], 255)
+        return self._mask
+
+    def contains(self, x, y):
+        x1, y1, x2, y2 = self.box
+        if not (x1 <= x < x2 and y1 <= y < y2):
+            return False
+        return self.polygon is None or self.mask()[int(y) - y1, int(x) - x1] > 0
+
+    def draw(self, frame, color, thickness=2):
+        if self.polygon is not None:
+            cv2.polylines(frame, [self.polygon], True, color, thickness)
+        else:
+            cv2.rectangle(frame, self.box[:2], self.box[2:], color, thickness)
+
+
+def load_rois(path):
+    with open(path, "r") as f:
+        return [RegionOfInterest.from_dict(data) for data in json.load(f)]
+
+
+def save_rois(path, rois):
+    with open(path, "w") as f:
+        json.dump([roi.to_dict() for roi in rois], f, indent=2)
+
+
+class CropBatch:
+    """
+    The padded crops of all ROIs of one frame, plus what is needed to map
+    detections on them back to the frame. imgsz is the bucket of the
+    largest ROI; smaller crops are padded up to it, never scaled.
+    """
+
+    def __init__(self, frame, rois):
+        frame_height, frame_width = frame.shape[:2]
+        self.rois = []
+        boxes = []
+        for roi in rois:
+            box = roi.clamped_box(frame_width, frame_height)
+            if box is not None:
+                self.rois.append(roi)
+                boxes.append(box)
+
+        self.boxes = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+        sizes = self.boxes[:, 2:] - self.boxes[:, :2]
+        self.imgsz = max((imgsz_bucket(int(w), int(h)) for w, h in sizes), default=IMGSZ_BUCKETS[0])
+        # Crops larger than the biggest bucket are scaled down, everything else is 1:1
+        self.scales = np.minimum(1.0, self.imgsz / np.maximum(sizes.max(axis=1, initial=1), 1)).astype(np.float32)
+        self.images = [self._padded_crop(frame, roi, box, scale) for roi, box, scale in zip(self.rois, boxes, self.scales)]
+
+    def __len__(self):
+        return len(self.images)
+
+    def _padded_crop(self, frame, roi, box, scale):
+        x1, y1, x2, y2 = box
+        crop = frame[y1:y2, x1:x2]
+        mask = roi.mask()
+        if mask is not None:
+            # Polygon: blank out everything outside it (the mask covers the unclamped box)
+            rx1, ry1 = roi.box[:2]
+            mask = mask[y1 - ry1:y2 - ry1, x1 - rx1:x2 - rx1]
+        if scale < 1.0:
+            size = (max(1, round((x2 - x1) * scale)), max(1, round((y2 - y1) * scale)))
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+            if mask is not None:
+                mask = cv2.resize(mask, size, interpolation=cv2.INTER_NEAREST)
+
+        padded = np.full((self.imgsz, self.imgsz) + crop.shape[2:], PAD_VALUE, dtype=crop.dtype)
+        padded[:crop.shape[0], :crop.shape[1]] = crop
+        if mask is not None:
+            padded[:mask.shape[0], :mask.shape[1]][mask == 0] = PAD_VALUE
+        return padded
+
+    def detections(self, results, class_names, target_classes, min_confidence):
+        """
+        (boxes, class_ids, confs) in full-frame coordinates for the results of
+        model(self.images), in the same format as detections_from_results().
+        """
+        target_ids = [class_id for class_id, name in class_names.items() if name in target_classes]
+        boxes, class_ids, confs, roi_index = [], [], [], []
+        for index, result in enumerate(results or []):
+            if index >= len(self.rois) or len(result.boxes) == 0:
+                continue
+            boxes.append(result.boxes.xyxy.cpu().numpy())
+            class_ids.append(result.boxes.cls.cpu().numpy().astype(int))
+            confs.append(result.boxes.conf.cpu().numpy())
+            roi_index.append(np.full(len(confs[-1]), index))
+
+        if not boxes:
+            return np.zeros((0, 4), np.float32), np.zeros(0, int), np.zeros(0, np.float32)
+
+        boxes = np.concatenate(boxes).astype(np.float32)
+        class_ids = np.concatenate(class_ids)
+        confs = np.concatenate(confs).astype(np.float32)
+        roi_index = np.concatenate(roi_index)
+        keep = np.isin(class_ids, target_ids) & (confs >= min_confidence)
+        boxes, class_ids, confs, roi_index = boxes[keep], class_ids[keep], confs[keep], roi_index[keep]
+
+        # Crop -> frame for every box at once: undo the crop scale, add the ROI origin, clip to the ROI
+        roi_boxes = self.boxes[roi_index]
+        boxes = boxes / self.scales[roi_index, None] + np.tile(roi_boxes[:, :2], 2)
+        boxes = np.clip(boxes, np.tile(roi_boxes[:, :2], 2), np.tile(roi_boxes[:, 2:], 2))
+
+        # Drop boxes whose center falls outside a polygon ROI
+        centers = ((boxes[:, :2] + boxes[:, 2:]) / 2).astype(int)
+        inside = np.ones(len(boxes), dtype=bool)
+        for i in np.flatnonzero([self.rois[index].polygon is not None for index in roi_index]):
+            inside[i] = self.rois[roi_index[i]].contains(*centers[i])
+        boxes, class_ids, confs, roi_index = boxes[inside], class_ids[inside], confs[inside], roi_index[inside]
+
+        if len(self.rois) > 1 and len(boxes) > 1:
+            # The same object can be seen by two overlapping ROIs
+            kept = cross_roi_nms(boxes, class_ids, confs, roi_index)
+            boxes, class_ids, confs = boxes[kept], class_ids[kept], confs[kept]
+        return boxes, class_ids, confs
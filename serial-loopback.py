@@ -0,0 +1,124 @@
+import os
+import select
+import signal
+import struct
+import time
+import tty
+from serial_protocol import (FrameDecoder, Frame, encode_frame, encode_position, decode_position, STATUS_CODES,
+                             OP_POS, OP_PAN, OP_STEP, OP_STATUS, OP_ACK, OP_POS_NOW, BAUD_RATE)
+from telemetry_codec import PAN_CODES
+
+# ----------------------------------------------------
+# --- Gimbal Sketch Stand-in on a Pseudo-Terminal ---
+# ----------------------------------------------------
+# Lets the receiver run without an Arduino. Opens a PTY, prints its path,
+# and answers like the sketch: frames get ACKs and POS_NOW frames, text
+# lines get the sketch's text replies. Point the receiver at it:
+#
+#   python serial-loopback.py            -> "Serial stand-in on /dev/pts/3"
+#   SERIAL_PORT = '/dev/pts/3' in object-locking-mqtt-receiver-pi.py
+#
+# Every STATS_INTERVAL it prints how many commands arrived and the link time
+# they would take on a real UART at BAUD_RATE (10 bits per byte).
+
+# --- Configuration ---
+STATS_INTERVAL = 10.0
+SERVO_CENTER = 90.0
+
+STOP_REQUESTED = False
+PAN_NAMES = {code: name for name, code in PAN_CODES.items()}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+def request_stop(signum, frame):
+    global STOP_REQUESTED
+    STOP_REQUESTED = True
+
+
+class SketchStandIn:
+    """Pan/tilt state plus the sketch's replies. handle() returns the bytes to send back."""
+
+    def __init__(self):
+        self.pan = SERVO_CENTER
+        self.tilt = SERVO_CENTER
+        self.commands = 0
+        self.command_bytes = 0
+
+    def position_frame(self, seq):
+        return encode_position(OP_POS_NOW, self.pan, self.tilt, seq)
+
+    def handle_frame(self, frame):
+        if frame.opcode == OP_POS:
+            self.pan, self.tilt = (max(0.0, min(180.0, angle)) for angle in decode_position(frame.payload))
+        elif frame.opcode == OP_STEP:
+            self.pan = max(0.0, min(180.0, self.pan + struct.unpack("<b", frame.payload)[0]))
+        elif frame.opcode == OP_PAN:
+            print(f"<- {PAN_NAMES.get(frame.payload[0], '?')}")
+        elif frame.opcode == OP_STATUS:
+            status = STATUS_NAMES.get(frame.payload[0], "?")
+            print(f"<- {status}")
+            if status == "TIMEOUT":
+                self.pan = self.tilt = SERVO_CENTER
+            elif status == "FOUND":
+                return (encode_frame(OP_ACK, frame.seq) if frame.ack else b"") + self.position_frame(frame.seq)
+        return encode_frame(OP_ACK, frame.seq) if frame.ack else b""
+
+    def handle_line(self, line):
+        if line.startswith("POS "):
+            parts = line.split()
+            self.pan, self.tilt = float(parts[1]), float(parts[2])
+            return b""
+        if line == "FOUND":
+            return f"POS_NOW {self.pan:.1f} {self.tilt:.1f}\nStatus: FOUND  Tracking re-acquired.\n".encode()
+        if line == "TIMEOUT":
+            self.pan = self.tilt = SERVO_CENTER
+        return f"Command: {line}\n".encode()
+
+    def handle(self, item, size):
+        self.commands += 1
+        self.command_bytes += size
+        if isinstance(item, Frame):
+            return self.handle_frame(item)
+        return self.handle_line(item)
+
+
+def run_loopback():
+    master, slave = os.openpty()
+    tty.setraw(slave) # Bytes pass through untouched (no echo, no CR/LF mapping)
+    print(f"🔌 Serial stand-in on {os.ttyname(slave)} (Ctrl+C to stop)")
+
+    sketch = SketchStandIn()
+    decoder = FrameDecoder()
+    last_stats = time.time()
+    try:
+        while not STOP_REQUESTED:
+            readable, _, _ = select.select([master], [], [], 0.5)
+            if readable:
+                data = os.read(master, 1024)
+                for item in decoder.feed(data):
+                    if item == "":
+                        continue
+                    # Wire size: header + payload + CRC for frames, text + newline for lines
+                    size = 5 + len(item.payload) if isinstance(item, Frame) else len(item) + 1
+                    reply = sketch.handle(item, size)
+                    if reply:
+                        os.write(master, reply)
+
+            now = time.time()
+            if now - last_stats >= STATS_INTERVAL:
+                if sketch.commands:
+                    link_ms = sketch.command_bytes * 10.0 / BAUD_RATE * 1000.0 / sketch.commands
+                    print(f"[LOOPBACK] {sketch.commands} commands, {sketch.command_bytes} bytes, "
+                          f"{link_ms:.2f} ms link time per command at {BAUD_RATE} baud, "
+                          f"{decoder.crc_errors} CRC errors, pan={sketch.pan:.1f} tilt={sketch.tilt:.1f}")
+                sketch.commands = sketch.command_bytes = 0
+                last_stats = now
+    finally:
+        os.close(master)
+        os.close(slave)
+        print("🛑 Serial stand-in closed.")
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    run_loopback()
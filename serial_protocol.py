@@ -0,0 +1,170 @@
+import collections
+import struct
+import time
+
+from telemetry_codec import PAN_CODES
+
+# ----------------------------------------------------
+# --- Framed Binary Serial Protocol (Pi <-> Arduino) ---
+# ----------------------------------------------------
+# The receiver used to send newline-terminated text ("PAN_LEFT_SMALL",
+# "POS 92.4 88.0") at 9600 baud, about 15 ms of link time per command, with
+# no way to tell whether the sketch got it. A frame is:
+#
+#   0xA5 | opcode | seq | length | payload (length bytes) | CRC-8
+#
+# CRC-8 (polynomial 0x07) covers opcode..payload. Bit 7 of the opcode asks
+# the sketch to answer with an ACK frame carrying the same seq, so the host
+# can measure the round-trip time. A POS frame (pan + tilt in one frame) is
+# 9 bytes, about 0.8 ms at 115200 baud.
+#
+# The sketch still accepts the old text lines: text is ASCII and never
+# contains the 0xA5 sync byte. Text lines the sketch prints come out of
+# FrameDecoder.feed() as plain strings, so the host can read both.
+
+SYNC = 0xA5
+BAUD_RATE = 115200
+MAX_PAYLOAD = 32
+ACK_REQUEST = 0x80
+
+# --- Host -> sketch ---
+OP_POS = 0x01       # <hh pan, tilt in 1/100 degree
+OP_PAN = 0x02       # <B PAN_CODES (STOP, LEFT, RIGHT)
+OP_STEP = 0x03      # <b pan step in degrees (PAN_LEFT_SMALL = -1)
+OP_STATUS = 0x04    # <B STATUS_CODES
+
+# --- Sketch -> host ---
+OP_ACK = 0x40       # No payload; seq is the acknowledged frame
+OP_POS_NOW = 0x41   # <hh pan, tilt in 1/100 degree
+
+STATUS_CODES = {"FOUND": 1, "LOST": 2, "TIMEOUT": 3}
+STEP_COMMANDS = {"PAN_LEFT_SMALL": -1, "PAN_RIGHT_SMALL": 1}
+POS_STRUCT = struct.Struct("<hh")
+
+Frame = collections.namedtuple("Frame", "opcode seq payload ack")
+
+
+def crc8(data):
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def encode_frame(opcode, seq, payload=b"", ack=False):
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"Payload too long ({len(payload)} bytes)")
+    body = bytes([opcode | (ACK_REQUEST if ack else 0), seq & 0xFF, len(payload)]) + payload
+    return bytes([SYNC]) + body + bytes([crc8(body)])
+
+
+def _centidegrees(angle):
+    return max(-32768, min(32767, int(round(angle * 100))))
+
+
+def encode_position(opcode, pan_angle, tilt_angle, seq, ack=False):
+    return encode_frame(opcode, seq, POS_STRUCT.pack(_centidegrees(pan_angle), _centidegrees(tilt_angle)), ack)
+
+
+def decode_position(payload):
+    pan, tilt = POS_STRUCT.unpack(payload)
+    return pan / 100.0, tilt / 100.0
+
+
+def encode_command(line, seq, ack=False):
+    """Encodes one of the receiver's text commands as a frame. Raises ValueError for unknown ones."""
+    parts = line.split()
+    if len(parts) == 3 and parts[0] == "POS":
+        return encode_position(OP_POS, float(parts[1]), float(parts[2]), seq, ack)
+    if line in STATUS_CODES:
+        return encode_frame(OP_STATUS, seq, bytes([STATUS_CODES[line]]), ack)
+    if line in STEP_COMMANDS:
+        return encode_frame(OP_STEP, seq, struct.pack("<b", STEP_COMMANDS[line]), ack)
+    pan = " ".join(parts[:2])
+    if pan in PAN_CODES:
+        return encode_frame(OP_PAN, seq, bytes([PAN_CODES[pan]]), ack)
+    raise ValueError(f"No frame for command: {line}")
+
+
+def frame_to_line(frame):
+    """The text line a sketch -> host frame stands for ("POS_NOW <pan> <tilt>"), or None."""
+    if frame.opcode == OP_POS_NOW and len(frame.payload) == POS_STRUCT.size:
+        return "POS_NOW {:.2f} {:.2f}".format(*decode_position(frame.payload))
+    return None
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for a byte stream of frames mixed with text lines.
+    feed() returns a list of Frame tuples and str lines in arrival order.
+    A frame with a bad CRC or length is dropped and the search for the next
+    sync byte restarts right after the bad one.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.text = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+
+    def feed(self, data):
+        self.buffer += data
+        items = []
+        while self.buffer:
+            if self.buffer[0] != SYNC:
+                byte = self.buffer.pop(0)
+                if byte == 0x0A:
+                    items.append(self.text.decode("utf-8", "replace").strip())
+                    self.text.clear()
+                elif byte != 0x0D:
+                    self.text.append(byte)
+                continue
+            if len(self.buffer) < 4:
+                break
+            length = self.buffer[3]
+            if length > MAX_PAYLOAD:
+                self.crc_errors += 1
+                del self.buffer[0]
+                continue
+            if len(self.buffer) < 5 + length:
+                break
+            body = bytes(self.buffer[1:4 + length])
+            if crc8(body) != self.buffer[4 + length]:
+                self.crc_errors += 1
+                del self.buffer[0]
+                continue
+            del self.buffer[:5 + length]
+            self.frames += 1
+            items.append(Frame(body[0] & ~ACK_REQUEST & 0xFF, body[1], body[3:], bool(body[0] & ACK_REQUEST)))
+        return items
+
+
+class AckTracker:
+    """
+    Send times of frames that asked for an ACK. acked() returns the round
+    trip in seconds; expire() counts frames whose ACK never came. Frames are
+    not resent: a newer position supersedes a lost one.
+    """
+
+    def __init__(self, timeout=0.5):
+        self.timeout = timeout
+        self.pending = {}   # seq -> send time
+
+    def sent(self, seq, now=None):
+        self.pending[seq & 0xFF] = time.time() if now is None else now
+
+    def acked(self, seq, now=None):
+        sent_at = self.pending.pop(seq, None)
+        if sent_at is None:
+            return None
+        return (time.time() if now is None else now) - sent_at
+
+    def expire(self, now=None):
+        if now is None:
+            now = time.time()
+        lost = [seq for seq, sent_at in self.pending.items() if now - sent_at > self.timeout]
+        for seq in lost:
+            del self.pending[seq]
+        return len(lost)
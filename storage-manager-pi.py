@@ -0,0 +1,83 @@
+import time
+import signal
+from storage_manager import StorageManager, DEFAULT_STATE_FILE
+
+# ----------------------------------------------------
+# --- Storage Manager Service ---
+# ----------------------------------------------------
+# Keeps recorded/, processed/ and detected/ within their quotas and the SD
+# card from filling up (storage_manager.py). Run it next to record-pi.py and
+# process-video-pi.py from the same folder; both read STATE_FILE and back
+# off under disk pressure. Metrics are printed every REPORT_INTERVAL and
+# published on MQTT_TOPIC when a broker is reachable.
+
+# --- Configuration ---
+# quota_mb / max_age_days: None disables that limit. evict_under_pressure:
+# the oldest items may be deleted early when free space is critical.
+# recorded/ is unprocessed video: nothing there is deleted unless you set a limit.
+POLICIES = {
+    "recorded": {"quota_mb": None, "max_age_days": None, "evict_under_pressure": False},
+    "processed": {"quota_mb": 4000, "max_age_days": 14, "evict_under_pressure": True,
+                  "reencode_after_hours": 1.0},   # None: keep the recorded bitrate
+    "detected": {"quota_mb": 2000, "max_age_days": 30, "evict_under_pressure": True,
+                 "archive_after_hours": 1.0},     # None: keep frames as loose JPEGs
+}
+LOW_FREE_MB = 1024          # Below this: record-pi.py switches to triggered recording
+CRITICAL_FREE_MB = 256      # Below this: eviction, processing pauses, no background jobs
+CHECK_INTERVAL = 10.0       # Seconds between checks
+REENCODE_CRF = 30           # x264 quality for processed videos (higher = smaller)
+STATE_FILE = DEFAULT_STATE_FILE
+REPORT_INTERVAL = 60.0
+
+# --- MQTT (optional) ---
+MQTT_BROKER = "localhost"
+MQTT_PORT = 1883
+MQTT_CLIENT_ID = "Storage_Manager"
+MQTT_TOPIC = "storage/metrics"
+
+STOP_REQUESTED = False
+
+def request_stop(signum, frame):
+    global STOP_REQUESTED
+    STOP_REQUESTED = True
+
+
+def connect_mqtt():
+    try:
+        import paho.mqtt.client as mqtt
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, MQTT_CLIENT_ID)
+        client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        client.loop_start()
+        print(f"Publishing storage metrics on {MQTT_TOPIC}.")
+        return client
+    except Exception as e:
+        print(f"MQTT unavailable ({e}); metrics are printed only.")
+        return None
+
+
+def run_storage_manager():
+    manager = StorageManager(POLICIES, ".", LOW_FREE_MB, CRITICAL_FREE_MB, STATE_FILE,
+                             reencode_crf=REENCODE_CRF, report_interval=REPORT_INTERVAL)
+    client = connect_mqtt()
+    publish_fn = (lambda payload: client.publish(MQTT_TOPIC, payload, qos=0)) if client is not None else None
+    print(f"Storage manager started ({LOW_FREE_MB} MB low / {CRITICAL_FREE_MB} MB critical). Press Ctrl+C to stop.")
+
+    try:
+        while not STOP_REQUESTED:
+            manager.check() # Pressure changes and deletions are printed as they happen
+            manager.telemetry.maybe_report(publish_fn)
+            next_check = time.time() + CHECK_INTERVAL
+            while not STOP_REQUESTED and time.time() < next_check:
+                time.sleep(0.5)
+    finally:
+        manager.close()
+        if client is not None:
+            client.loop_stop()
+            client.disconnect()
+        print("Storage manager stopped.")
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    run_storage_manager()
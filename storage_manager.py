@@ -0,0 +1,360 @@
+import json
+import os
+import queue
+import shutil
+import subprocess
+import tarfile
+import threading
+import time
+
+from latency_telemetry import LatencyTelemetry
+
+# ----------------------------------------------------
+# --- Storage Manager: Retention, Tiered Compression, Backpressure ---
+# ----------------------------------------------------
+# recorded/, processed/ and detected/ otherwise grow until the SD card is
+# full and both recording and processing fail. StorageManager.check()
+# (run every few seconds by storage-manager-pi.py):
+#
+#   1. Scans each directory. A video and its companions (<video>.json
+#      manifest, <video>.activity.json sidecar) count as one item, and so
+#      does a detected/<video>/ folder.
+#   2. Retention: deletes the oldest items while a directory is over its
+#      quota_mb, and any item older than max_age_days.
+#   3. Disk pressure: below critical_free_mb of free space, evicts the oldest
+#      items of directories with evict_under_pressure until free space is
+#      back above low_free_mb.
+#   4. Background tiers (one job at a time, nice 19 / idle I/O class):
+#      processed videos older than reencode_after_hours are re-encoded to a
+#      lower bitrate with ffmpeg (kept only if smaller), and the saved frames
+#      in detected/<video>/ older than archive_after_hours are packed into
+#      frames.tar.
+#   5. Writes STATE_FILE atomically. Producers poll it with
+#      read_storage_state(): below low_free_mb record-pi.py switches to
+#      triggered recording, below critical_free_mb process-video-pi.py
+#      pauses. A missing or stale state file means no backpressure.
+#
+# recorded/ holds video that has not been processed yet, so by default it
+# has no quota, no age limit and no eviction: nothing in it is deleted.
+# Low space is handled there by backpressure instead (triggered recording).
+# Give it a quota_mb / max_age_days only if losing unprocessed video is
+# acceptable.
+#
+# Metrics go through LatencyTelemetry (source "storage"): per-directory
+# size gauges, free space, pressure, deletion/re-encode/archive counters and
+# a "storage_scan" histogram of check times.
+
+PRESSURE_OK = "ok"
+PRESSURE_LOW = "low"
+PRESSURE_CRITICAL = "critical"
+DEFAULT_STATE_FILE = "storage_state.json"
+STATE_MAX_AGE_S = 60.0          # Older state files are ignored (manager not running)
+MIN_ITEM_AGE_S = 300.0          # Never touch items modified more recently (still being written or processed)
+COMPANION_SUFFIXES = (".activity.json", ".json")   # Longest first
+WORK_DIR = ".storage-tmp"       # Hidden, so scans skip half-written re-encodes
+MB = 1024 * 1024
+
+DEFAULT_POLICIES = {
+    "recorded": {"quota_mb": None, "max_age_days": None, "evict_under_pressure": False},
+    "processed": {"quota_mb": 4000, "max_age_days": 14, "evict_under_pressure": True,
+                  "reencode_after_hours": 1.0},
+    "detected": {"quota_mb": 2000, "max_age_days": 30, "evict_under_pressure": True,
+                 "archive_after_hours": 1.0},
+}
+
+
+def read_storage_state(state_file=DEFAULT_STATE_FILE, max_age_s=STATE_MAX_AGE_S, now=None):
+    """The manager's last state, or None when there is none or it is stale."""
+    try:
+        with open(state_file) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if now is None:
+        now = time.time()
+    return state if now - state.get("timestamp", 0) <= max_age_s else None
+
+
+class StoredItem:
+    """One retention unit: a video with its companion files, or a folder."""
+
+    def __init__(self, key):
+        self.key = key
+        self.paths = []
+        self.bytes = 0
+        self.mtime = 0.0
+
+    def add(self, path, size, mtime):
+        self.paths.append(path)
+        self.bytes += size
+        self.mtime = max(self.mtime, mtime)
+
+    def delete(self):
+        for path in self.paths:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+
+
+def _group_key(name):
+    for suffix in COMPANION_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def _tree_size(path):
+    # Age comes from the files, not the folder (packing frames touches the folder)
+    total, newest = 0, None
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(folder, name))
+            except OSError:
+                continue
+            total += stat.st_size
+            newest = stat.st_mtime if newest is None else max(newest, stat.st_mtime)
+    return total, newest if newest is not None else os.path.getmtime(path)
+
+
+def scan_directory(path):
+    """StoredItems of path, oldest first. Hidden entries (.partial, work dirs) are skipped."""
+    items = {}
+    if not os.path.isdir(path):
+        return []
+    for name in os.listdir(path):
+        if name.startswith("."):
+            continue
+        full_path = os.path.join(path, name)
+        try:
+            if os.path.isdir(full_path):
+                size, mtime = _tree_size(full_path)
+            else:
+                stat = os.stat(full_path)
+                size, mtime = stat.st_size, stat.st_mtime
+        except OSError:
+            continue # Moved away mid-scan (e.g. by processing)
+        key = _group_key(name)
+        items.setdefault(key, StoredItem(key)).add(full_path, size, mtime)
+    return sorted(items.values(), key=lambda item: item.mtime)
+
+
+class StorageManager:
+    """
+    policies: {directory: {"quota_mb", "max_age_days", "evict_under_pressure",
+    "reencode_after_hours", "archive_after_hours"}} with directories relative
+    to root. disk_usage_fn is shutil.disk_usage unless a test replaces it.
+    check() returns the state dict it also writes to state_file.
+    """
+
+    def __init__(self, policies=None, root=".", low_free_mb=1024, critical_free_mb=256,
+                 state_file=DEFAULT_STATE_FILE, background=True, reencode_crf=30,
+                 report_interval=60.0, disk_usage_fn=shutil.disk_usage):
+        self.policies = policies if policies is not None else DEFAULT_POLICIES
+        self.root = root
+        self.low_free_mb = low_free_mb
+        self.critical_free_mb = critical_free_mb
+        self.state_file = state_file
+        self.reencode_crf = reencode_crf
+        self.disk_usage_fn = disk_usage_fn
+        self.telemetry = LatencyTelemetry("storage", report_interval)
+        self.compressed = set(self._previous_state().get("compressed", []))
+        self.pressure = PRESSURE_OK
+        self.ffmpeg = shutil.which("ffmpeg")
+        self._queued = set()
+        self._jobs = queue.Queue()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run_jobs, daemon=True)
+            self._thread.start()
+
+    def _previous_state(self):
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _path(self, directory):
+        return os.path.join(self.root, directory)
+
+    def free_mb(self):
+        return self.disk_usage_fn(self.root).free / MB
+
+    def _pressure(self, free_mb):
+        if free_mb < self.critical_free_mb:
+            return PRESSURE_CRITICAL
+        if free_mb < self.low_free_mb:
+            return PRESSURE_LOW
+        return PRESSURE_OK
+
+    def _delete(self, directory, item, reason):
+        item.delete()
+        self.telemetry.increment("deleted_items")
+        self.telemetry.increment("deleted_mb", round(item.bytes / MB, 1))
+        print(f"[STORAGE] Deleted {directory}/{item.key} ({item.bytes / MB:.1f} MB, {reason})")
+
+    def apply_retention(self, directory, items, now):
+        """Deletes over-quota and expired items, oldest first; returns the items kept."""
+        policy = self.policies[directory]
+        quota = policy.get("quota_mb")
+        max_age_s = policy["max_age_days"] * 86400.0 if policy.get("max_age_days") else None
+        total = sum(item.bytes for item in items)
+        kept = []
+        for item in items:
+            age = now - item.mtime
+            expired = max_age_s is not None and age > max_age_s
+            over_quota = quota is not None and total > quota * MB
+            if age < MIN_ITEM_AGE_S or not (expired or over_quota):
+                kept.append(item)
+                continue
+            self._delete(directory, item, "expired" if expired else "over quota")
+            total -= item.bytes
+        return kept
+
+    def relieve_pressure(self, scanned, now):
+        """Below critical free space: evicts the oldest evictable items until low_free_mb is free again."""
+        candidates = [(item.mtime, directory, item) for directory, items in scanned.items()
+                      if self.policies[directory].get("evict_under_pressure")
+                      for item in items if now - item.mtime >= MIN_ITEM_AGE_S]
+        for _, directory, item in sorted(candidates, key=lambda entry: entry[0]):
+            if self.free_mb() >= self.low_free_mb:
+                break
+            self._delete(directory, item, "disk pressure")
+            scanned[directory].remove(item)
+
+    def check(self, now=None):
+        if now is None:
+            now = time.time()
+        scanned = {}
+        for directory in self.policies:
+            scanned[directory] = self.apply_retention(directory, scan_directory(self._path(directory)), now)
+
+        free_mb = self.free_mb()
+        if self._pressure(free_mb) == PRESSURE_CRITICAL:
+            self.relieve_pressure(scanned, now)
+            free_mb = self.free_mb()
+        pressure = self._pressure(free_mb)
+        if pressure != self.pressure:
+            print(f"[STORAGE] Disk pressure {self.pressure} -> {pressure} ({free_mb:.0f} MB free)")
+            self.pressure = pressure
+
+        if self._thread is not None and pressure != PRESSURE_CRITICAL:
+            self._schedule_background(scanned, now)
+
+        directories = {}
+        for directory, items in scanned.items():
+            size_mb = sum(item.bytes for item in items) / MB
+            directories[directory] = {
+                "mb": round(size_mb, 1),
+                "items": len(items),
+                "oldest_age_h": round((now - items[0].mtime) / 3600.0, 1) if items else 0.0
+            }
+            self.telemetry.set_gauge(f"{directory}_mb", round(size_mb, 1))
+        self.telemetry.set_gauge("free_mb", round(free_mb))
+        self.telemetry.set_gauge("pressure", pressure)
+        self.telemetry.set_gauge("background_jobs", self._jobs.qsize())
+        self.telemetry.record("storage_scan", (time.time() - now) * 1000.0)
+
+        state = {
+            "timestamp": now,
+            "free_mb": round(free_mb),
+            "pressure": pressure,
+            "record_mode": "triggered" if pressure != PRESSURE_OK else None,
+            "pause_processing": pressure == PRESSURE_CRITICAL,
+            "directories": directories,
+            "compressed": sorted(self.compressed)
+        }
+        self._write_state(state)
+        return state
+
+    def _write_state(self, state):
+        partial = self.state_file + ".tmp"
+        with open(partial, "w") as f:
+            json.dump(state, f)
+        os.replace(partial, self.state_file)
+
+    # --- Background tiers ---
+
+    def _schedule_background(self, scanned, now):
+        for directory, items in scanned.items():
+            policy = self.policies[directory]
+            reencode_after = policy.get("reencode_after_hours")
+            archive_after = policy.get("archive_after_hours")
+            for item in items:
+                age_h = (now - item.mtime) / 3600.0
+                for path in item.paths:
+                    if path in self._queued:
+                        continue
+                    if (reencode_after is not None and age_h >= reencode_after and self.ffmpeg
+                            and os.path.isfile(path) and path.endswith((".mp4", ".h264"))
+                            and os.path.basename(path) not in self.compressed):
+                        self._queued.add(path)
+                        self._jobs.put((self._reencode, path))
+                    elif (archive_after is not None and age_h >= archive_after and os.path.isdir(path)
+                          and any(name.endswith(".jpg") for name in os.listdir(path))):
+                        self._queued.add(path)
+                        self._jobs.put((self._archive_frames, path))
+
+    def _run_jobs(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            job_fn, path = job
+            try:
+                if self.pressure != PRESSURE_CRITICAL and os.path.exists(path):
+                    job_fn(path)
+            except Exception as e:
+                print(f"[STORAGE] Background job failed for {path}: {e}")
+            finally:
+                self._queued.discard(path)
+
+    def _low_priority(self, cmd):
+        prefix = ["nice", "-n", "19"] if shutil.which("nice") else []
+        if shutil.which("ionice"):
+            prefix += ["ionice", "-c", "3"]
+        return prefix + cmd
+
+    def _reencode(self, path):
+        work_dir = os.path.join(os.path.dirname(path), WORK_DIR)
+        os.makedirs(work_dir, exist_ok=True)
+        target = os.path.join(work_dir, os.path.basename(path))
+        result = subprocess.run(self._low_priority(
+            [self.ffmpeg, "-loglevel", "error", "-y", "-i", path, "-c:v", "libx264", "-preset", "veryfast",
+             "-crf", str(self.reencode_crf), "-an", target]))
+        name = os.path.basename(path)
+        if result.returncode != 0 or not os.path.exists(target):
+            print(f"[STORAGE] Re-encode failed for {name}")
+            self.compressed.add(name) # Do not retry it every check
+            return
+        before, after = os.path.getsize(path), os.path.getsize(target)
+        if after < before and os.path.exists(path):
+            mtime = os.path.getmtime(path)
+            os.replace(target, path)
+            os.utime(path, (mtime, mtime)) # Keep its age for retention
+            self.telemetry.increment("reencoded")
+            self.telemetry.increment("reencode_saved_mb", round((before - after) / MB, 1))
+            print(f"[STORAGE] Re-encoded {name}: {before / MB:.1f} -> {after / MB:.1f} MB")
+        else:
+            os.remove(target)
+        self.compressed.add(name)
+
+    def _archive_frames(self, folder):
+        frames = sorted(name for name in os.listdir(folder) if name.endswith(".jpg"))
+        archive_path = os.path.join(folder, "frames.tar")
+        newest = max(os.path.getmtime(os.path.join(folder, name)) for name in frames)
+        with tarfile.open(archive_path, "a") as archive:
+            for name in frames:
+                archive.add(os.path.join(folder, name), arcname=name)
+        for name in frames:
+            os.remove(os.path.join(folder, name))
+        os.utime(archive_path, (newest, newest)) # Keep the folder's age for retention
+        self.telemetry.increment("frames_archived", len(frames))
+        print(f"[STORAGE] Packed {len(frames)} frames of {os.path.basename(folder)} into frames.tar")
+
+    def close(self):
+        if self._thread is not None:
+            self._jobs.put(None)
+            self._thread.join(timeout=5)
@@ -0,0 +1,123 @@
+import json
+import math
+import struct
+import time
+
+# ----------------------------------------------------
+# --- Coalesced, Compact Move Telemetry ---
+# ----------------------------------------------------
+# The tracker used to publish a JSON tracker/move message on every tracked
+# frame, even when nothing had changed. MoveEncoder only lets a message
+# through when:
+#   - the pan/tilt command changes (always sent at once, e.g. a STOP)
+#   - the offset moves more than deadband_px since the last sent message
+#   - heartbeat_s has passed since the last sent message
+# and in the last two cases no more often than max_rate_hz. Every message
+# carries a sequence number so the receiver can count what it missed.
+#
+# With binary=True the payload is a 26-byte struct instead of ~150 bytes of
+# JSON. decode_move() reads both formats, so receivers do not need a setting.
+
+PAN_CODES = {"PAN STOP": 0, "PAN LEFT": 1, "PAN RIGHT": 2}
+TILT_CODES = {"TILT STOP": 0, "TILT UP": 1, "TILT DOWN": 2}
+PAN_NAMES = {code: name for name, code in PAN_CODES.items()}
+TILT_NAMES = {code: name for name, code in TILT_CODES.items()}
+
+# version, pan | tilt << 4, seq, timestamp, capture_ts (NaN = unknown), offset_x, offset_y
+MOVE_FORMAT_VERSION = 1
+MOVE_STRUCT = struct.Struct("<BBIddhh")
+
+
+def _clamp_int16(value):
+    return max(-32768, min(32767, int(value)))
+
+
+def encode_move_binary(payload):
+    capture_ts = payload.get("capture_ts")
+    return MOVE_STRUCT.pack(
+        MOVE_FORMAT_VERSION,
+        PAN_CODES[payload["pan_command"]] | (TILT_CODES[payload["tilt_command"]] << 4),
+        payload["seq"] & 0xFFFFFFFF,
+        payload["timestamp"],
+        capture_ts if capture_ts is not None else math.nan,
+        _clamp_int16(payload["offset_x"]),
+        _clamp_int16(payload["offset_y"])
+    )
+
+
+def decode_move(data):
+    """Decodes a tracker/move payload (JSON text or the binary struct) into the JSON dict layout."""
+    if isinstance(data, str):
+        data = data.encode()
+    if data[:1] == b"{":
+        return json.loads(data.decode())
+    if len(data) != MOVE_STRUCT.size or data[0] != MOVE_FORMAT_VERSION:
+        raise ValueError(f"Unknown binary move payload ({len(data)} bytes)")
+
+    _, commands, seq, timestamp, capture_ts, offset_x, offset_y = MOVE_STRUCT.unpack(data)
+    return {
+        "timestamp": timestamp,
+        "offset_x": offset_x,
+        "offset_y": offset_y,
+        "pan_command": PAN_NAMES.get(commands & 0x0F, "PAN STOP"),
+        "tilt_command": TILT_NAMES.get(commands >> 4, "TILT STOP"),
+        "capture_ts": None if math.isnan(capture_ts) else capture_ts,
+        "seq": seq
+    }
+
+
+class MoveEncoder:
+    """
+    Deadband + heartbeat + rate limit for tracker/move. encode() returns the
+    payload to publish (str JSON or bytes) or None if it is suppressed.
+    coalesce=False sends every message (still with a sequence number).
+    """
+
+    def __init__(self, deadband_px=4, heartbeat_s=0.25, max_rate_hz=20.0, binary=False, coalesce=True):
+        self.deadband_px = deadband_px
+        self.heartbeat_s = heartbeat_s
+        self.min_interval = 1.0 / max_rate_hz if max_rate_hz else 0.0
+        self.binary = binary
+        self.coalesce = coalesce
+        self.seq = 0
+        self.last_sent = None       # (offset_x, offset_y, pan_cmd, tilt_cmd)
+        self.last_sent_time = 0.0
+        self.sent = 0
+        self.suppressed = 0
+
+    def should_send(self, offset_x, offset_y, pan_cmd, tilt_cmd, now):
+        if not self.coalesce or self.last_sent is None:
+            return True
+        last_x, last_y, last_pan, last_tilt = self.last_sent
+        if (pan_cmd, tilt_cmd) != (last_pan, last_tilt):
+            return True
+        if now - self.last_sent_time < self.min_interval:
+            return False
+        moved = max(abs(offset_x - last_x), abs(offset_y - last_y)) > self.deadband_px
+        return moved or now - self.last_sent_time >= self.heartbeat_s
+
+    def encode(self, offset_x, offset_y, pan_cmd, tilt_cmd, capture_ts=None, now=None):
+        if now is None:
+            now = time.time()
+        if not self.should_send(offset_x, offset_y, pan_cmd, tilt_cmd, now):
+            self.suppressed += 1
+            return None
+
+        self.seq += 1
+        self.sent += 1
+        self.last_sent = (offset_x, offset_y, pan_cmd, tilt_cmd)
+        self.last_sent_time = now
+        payload = {
+            "timestamp": now,
+            "offset_x": offset_x,
+            "offset_y": offset_y,
+            "pan_command": pan_cmd,
+            "tilt_command": tilt_cmd,
+            "capture_ts": capture_ts,
+            "seq": self.seq
+        }
+        return encode_move_binary(payload) if self.binary else json.dumps(payload)
+
+    def reset(self):
+        """Forgets the last message so the next one is sent (e.g. after a lock change)."""
+        self.last_sent = None
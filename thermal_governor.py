@@ -0,0 +1,173 @@
+import os
+import time
+
+from latency_telemetry import LatencyTelemetry
+
+# ----------------------------------------------------
+# --- Thermal- and Load-Aware Quality Governor ---
+# ----------------------------------------------------
+# Under sustained load the Pi throttles and the tracker loop rate drops. The
+# governor watches CPU temperature, CPU frequency, the firmware throttle flags
+# and the measured loop rate, and steps through QUALITY_LEVELS to hold
+# TARGET_LOOP_FPS: smaller inference imgsz, a longer detection stride (more
+# frames carried by the hybrid tracker) and no overlay drawing. It steps back
+# up once the Pi has cooled down and the loop has headroom again.
+#
+#   governor = QualityGovernor(SysfsReader(), target_fps=15.0)
+#   ...after every loop iteration:
+#   if governor.frame_done():
+#       camera.apply_quality(governor.level)
+#   results = model(image, imgsz=governor.level["imgsz"])
+
+# --- Quality Levels (index 0 = full quality) ---
+# detect_every_scale multiplies the configured DETECT_EVERY_N_FRAMES, so level
+# 0 always runs the stride the user set.
+QUALITY_LEVELS = [
+    {"imgsz": 640, "detect_every_scale": 1.0, "overlays": True},
+    {"imgsz": 480, "detect_every_scale": 1.5, "overlays": True},
+    {"imgsz": 416, "detect_every_scale": 2.0, "overlays": False},
+    {"imgsz": 320, "detect_every_scale": 2.5, "overlays": False},
+]
+
+# --- Decision Thresholds ---
+STEP_DOWN_FPS_RATIO = 0.9       # Step down below 90% of the target loop rate
+STEP_UP_FPS_RATIO = 1.3         # Step up only with 30% headroom ...
+STEP_UP_AFTER_CHECKS = 3        # ... held for this many checks in a row
+
+# Bits of the Raspberry Pi firmware get_throttled value that mean "right now"
+THROTTLED_NOW_MASK = 0x2 | 0x4 | 0x8   # ARM frequency capped, throttled, soft temperature limit
+
+
+class SysfsReader:
+    """
+    Reads CPU temperature, frequency and throttle state from sysfs. root can
+    point at a fake directory tree with the same layout, e.g. for tests on a
+    desktop. Every method returns None if the value is not available.
+    """
+
+    TEMP_PATH = "class/thermal/thermal_zone0/temp"                      # millidegrees C
+    FREQ_PATH = "devices/system/cpu/cpu0/cpufreq/scaling_cur_freq"      # kHz
+    THROTTLED_PATH = "devices/platform/soc/soc:firmware/get_throttled"  # hex flags (Pi only)
+
+    def __init__(self, root="/sys"):
+        self.root = root
+
+    def _read_int(self, path, base=10):
+        try:
+            with open(os.path.join(self.root, path), "r") as f:
+                return int(f.read().strip(), base)
+        except (OSError, ValueError):
+            return None
+
+    def cpu_temp_c(self):
+        value = self._read_int(self.TEMP_PATH)
+        return value / 1000.0 if value is not None else None
+
+    def cpu_freq_mhz(self):
+        value = self._read_int(self.FREQ_PATH)
+        return value / 1000.0 if value is not None else None
+
+    def throttled(self):
+        value = self._read_int(self.THROTTLED_PATH, 16)
+        return bool(value & THROTTLED_NOW_MASK) if value is not None else None
+
+
+class QualityGovernor:
+    """
+    Holds a target control-loop rate by stepping through quality levels.
+    reader is any object with cpu_temp_c(), cpu_freq_mhz() and throttled()
+    (see SysfsReader). Call frame_done() once per loop iteration; it returns
+    True when the level changed. Decisions are printed and kept in
+    self.telemetry (gauges, counters and a "control_loop" histogram).
+    """
+
+    def __init__(self, reader=None, target_fps=15.0, levels=None, check_interval=2.0,
+                 hot_temp_c=75.0, cool_temp_c=65.0, report_interval=10.0, on_change=None):
+        self.reader = reader or SysfsReader()
+        self.target_fps = target_fps
+        self.levels = levels or QUALITY_LEVELS
+        self.check_interval = check_interval
+        self.hot_temp_c = hot_temp_c        # Step down at or above this temperature
+        self.cool_temp_c = cool_temp_c      # Step up only at or below this temperature
+        self.on_change = on_change
+        self.telemetry = LatencyTelemetry("governor", report_interval)
+
+        self.level_index = 0
+        self.good_checks = 0
+        self.last_check = None
+        self.last_frame = None
+        self.frames = 0
+        self.last_decision = None
+        self.telemetry.set_gauge("quality_level", 0)
+        self.telemetry.set_gauge("imgsz", self.level["imgsz"])
+
+    @property
+    def level(self):
+        return self.levels[self.level_index]
+
+    def frame_done(self, now=None):
+        """Counts one loop iteration and re-evaluates every check_interval seconds."""
+        if now is None:
+            now = time.time()
+        if self.last_frame is not None:
+            self.telemetry.record("control_loop", (now - self.last_frame) * 1000.0)
+        self.last_frame = now
+        self.frames += 1
+
+        if self.last_check is None:
+            self.last_check = now
+            self.frames = 0
+            return False
+        if now - self.last_check < self.check_interval:
+            return False
+        return self.evaluate(now)
+
+    def evaluate(self, now):
+        loop_fps = self.frames / (now - self.last_check)
+        self.last_check = now
+        self.frames = 0
+
+        temp_c = self.reader.cpu_temp_c()
+        freq_mhz = self.reader.cpu_freq_mhz()
+        throttled = self.reader.throttled()
+        self.telemetry.set_gauge("loop_fps", round(loop_fps, 1))
+        self.telemetry.set_gauge("cpu_temp_c", temp_c)
+        self.telemetry.set_gauge("cpu_freq_mhz", freq_mhz)
+        self.telemetry.set_gauge("throttled", throttled)
+
+        step, reason = 0, None
+        if temp_c is not None and temp_c >= self.hot_temp_c:
+            step, reason = 1, f"CPU {temp_c:.1f}C >= {self.hot_temp_c:.0f}C"
+        elif throttled:
+            step, reason = 1, f"firmware throttling at {freq_mhz or 0:.0f} MHz"
+        elif loop_fps < self.target_fps * STEP_DOWN_FPS_RATIO:
+            step, reason = 1, f"loop {loop_fps:.1f} fps < target {self.target_fps:.1f} fps"
+        elif (temp_c is None or temp_c <= self.cool_temp_c) and loop_fps >= self.target_fps * STEP_UP_FPS_RATIO:
+            self.good_checks += 1
+            if self.good_checks >= STEP_UP_AFTER_CHECKS:
+                step, reason = -1, f"headroom: loop {loop_fps:.1f} fps, CPU {temp_c if temp_c is not None else '?'}C"
+        else:
+            self.good_checks = 0
+
+        new_index = min(max(self.level_index + step, 0), len(self.levels) - 1)
+        self.last_decision = {
+            "timestamp": now,
+            "loop_fps": round(loop_fps, 1),
+            "cpu_temp_c": temp_c,
+            "cpu_freq_mhz": freq_mhz,
+            "throttled": throttled,
+            "level": new_index,
+            "reason": reason
+        }
+        if new_index == self.level_index:
+            return False
+
+        self.level_index = new_index
+        self.good_checks = 0
+        self.telemetry.set_gauge("quality_level", new_index)
+        self.telemetry.set_gauge("imgsz", self.level["imgsz"])
+        self.telemetry.increment("quality_changes")
+        print(f"[GOVERNOR] {'DOWN' if step > 0 else 'UP'} to level {new_index} {self.level} ({reason})")
+        if self.on_change is not None:
+            self.on_change(self.level, reason)
+        return True
@@ -0,0 +1,113 @@
+import os
+import socket
+
+# ----------------------------------------------------
+# --- Same-Host Transport for the Control Path ---
+# ----------------------------------------------------
+# When the tracker and the gimbal receiver run on the same Pi, every offset
+# update otherwise makes two trips through the Mosquitto broker. With
+# TRANSPORT = "unix" on both ends, tracker/move and tracker/status go
+# straight to the receiver as Unix datagrams:
+#
+#   <topic> \0 <payload>            (payload bytes as published: JSON or binary move)
+#
+# One datagram per message, no broker, no connection. If the receiver is
+# not running, the tracker drops the message (the same as QoS 0 with nobody
+# subscribed). Diagnostics, detections and control stay on MQTT.
+# Pair it with MOVE_BINARY = True in the tracker to skip JSON as well.
+
+TRANSPORT_MQTT = "mqtt"
+TRANSPORT_UNIX = "unix"
+DEFAULT_SOCKET_PATH = "/tmp/ai-object-detection-gimbal.sock"
+LOCAL_TOPIC_SUFFIXES = ("tracker/move", "tracker/status")   # Also matches prefixed topics (cam1/...)
+MAX_DATAGRAM = 65536
+SEND_TIMEOUT_S = 0.01       # A full receive queue (bursts) is waited on this long before dropping
+
+
+class UnixDatagramPublisher:
+    """
+    publish(topic, payload) sends one datagram to socket_path. It waits at
+    most send_timeout when the receiver's queue is full, so the newest moves
+    of a burst are not the ones that get dropped.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, send_timeout=SEND_TIMEOUT_S):
+        self.socket_path = socket_path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.settimeout(send_timeout)
+        self.sent = 0
+        self.dropped = 0
+
+    def publish(self, topic, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        try:
+            self.sock.sendto(topic.encode() + b"\0" + payload, self.socket_path)
+            self.sent += 1
+            return True
+        except (FileNotFoundError, ConnectionRefusedError, BlockingIOError, socket.timeout):
+            # No receiver, or it stopped draining its queue: drop like QoS 0
+            self.dropped += 1
+            return False
+
+    def close(self):
+        self.sock.close()
+
+
+class UnixDatagramSubscriber:
+    """
+    Bound datagram socket for the receiver. receive() drains everything that
+    arrived without blocking; register fileno() with loop.add_reader().
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH):
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            os.unlink(socket_path) # Left over from a previous run
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(socket_path)
+        self.sock.setblocking(False)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def receive(self):
+        """Returns [(topic, payload_bytes), ...] for all pending datagrams."""
+        messages = []
+        while True:
+            try:
+                datagram = self.sock.recv(MAX_DATAGRAM)
+            except BlockingIOError:
+                return messages
+            topic, _, payload = datagram.partition(b"\0")
+            messages.append((topic.decode("utf-8", "replace"), payload))
+
+    def close(self):
+        self.sock.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class TransportRouter:
+    """
+    Drop-in publish_fn for CameraTracker. Control-path topics go over the
+    local transport when it is enabled; everything else to mqtt_publish_fn.
+    """
+
+    def __init__(self, mqtt_publish_fn, transport=TRANSPORT_MQTT, socket_path=DEFAULT_SOCKET_PATH,
+                 local_topic_suffixes=LOCAL_TOPIC_SUFFIXES):
+        if transport not in (TRANSPORT_MQTT, TRANSPORT_UNIX):
+            raise ValueError(f"Unknown transport: {transport}")
+        self.mqtt_publish_fn = mqtt_publish_fn
+        self.local = UnixDatagramPublisher(socket_path) if transport == TRANSPORT_UNIX else None
+        self.local_topic_suffixes = tuple(local_topic_suffixes)
+
+    def publish(self, topic, payload):
+        if self.local is not None and topic.endswith(self.local_topic_suffixes):
+            self.local.publish(topic, payload)
+        else:
+            self.mqtt_publish_fn(topic, payload)
+
+    def close(self):
+        if self.local is not None:
+            self.local.close()